@@ -1,8 +1,9 @@
 from __future__ import annotations
 
-import re
 from datetime import date, timedelta
-from typing import Any
+from typing import Any, Optional
+
+from retrieval.citations import ParsedAnswer, parse_answer
 
 NOT_FOUND_EXACT = "Not found in the sources."
 
@@ -16,9 +17,9 @@ NOT_FOUND_ALIASES = {
 }
 
 
-def _strip_citations(text: str) -> str:
+def _strip_citations(parsed: ParsedAnswer) -> str:
     # Removes [Doc | chunk] from text for cleaner summaries/emails
-    return re.sub(r"\[[^\]]+\]", "", text or "").strip()
+    return parsed.without_citations()
 
 
 def _word_limit(text: str, max_words: int) -> str:
@@ -39,18 +40,8 @@ def _unique_sources_from_evidence(evidence: list[dict]) -> list[str]:
     return out
 
 
-def _unique_sources_from_text(text: str) -> list[str]:
-    if not text:
-        return []
-    cites = re.findall(r"\[([^\]]+)\]", text)
-    seen = set()
-    out = []
-    for c in cites:
-        c = c.strip()
-        if c and c not in seen:
-            seen.add(c)
-            out.append(c)
-    return out
+def _unique_sources_from_text(parsed: ParsedAnswer) -> list[str]:
+    return parsed.sources(split=False)
 
 
 def _infer_needed_info(question: str) -> str:
@@ -83,10 +74,12 @@ def build_deliverable(
     evidence: list[dict],
     verdict: dict,
     company_name: str = "Your Company",
+    parsed: Optional[ParsedAnswer] = None,
 ) -> dict[str, Any]:
     """
     Builds the required 'final deliverable' structure WITHOUT extra LLM calls.
     Predictable + grounded for grading.
+    parsed: the answer already tokenized by the workflow (skips re-parsing).
     """
     status = str((verdict or {}).get("status", "UNKNOWN")).upper()
     today = date.today()
@@ -142,12 +135,16 @@ def build_deliverable(
         }
 
     # Normal case: build deliverable from grounded answer
+    if parsed is None or parsed.text.strip() != clean_answer:
+        parsed = parse_answer(clean_answer)
+    answer_plain = _strip_citations(parsed)
+
     sources = _unique_sources_from_evidence(evidence)
     if not sources:
-        sources = _unique_sources_from_text(answer)
+        sources = _unique_sources_from_text(parsed)
 
     # Executive summary must be <=150 words
-    exec_summary = _word_limit(_strip_citations(clean_answer), 150)
+    exec_summary = _word_limit(answer_plain, 150)
 
     # Email
     email_subject = f"{company_name} HR Ops Guidance: {question[:60].strip()}{'...' if len(question) > 60 else ''}"
@@ -155,7 +152,7 @@ def build_deliverable(
         f"Hello,\n\n"
         f"Below is the guidance based strictly on the provided HR sources for:\n"
         f"“{question}”\n\n"
-        f"{_strip_citations(clean_answer)}\n\n"
+        f"{answer_plain}\n\n"
         f"Sources used:\n"
         + "\n".join([f"- {s}" for s in sources])
         + f"\n\nBest regards,\n{company_name} HR Ops Copilot"
@@ -0,0 +1,182 @@
+"""
+Lexical claim grounding (no LLM):
+- Builds word / bigram / number sets per cited evidence chunk (cached per chunk text).
+- Scores every answer sentence against the chunk(s) it cites with set intersections.
+- Numbers ("40 hours", "20 days") must appear in the cited chunk(s) verbatim, or in the
+  cited document's name (a law number such as 03-L-212 is often only there).
+Runs in well under a millisecond per answer on a normal evidence pack.
+"""
+
+from __future__ import annotations
+
+import re
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from retrieval.citations import ParsedAnswer
+
+_WORD_RE = re.compile(r"[a-z][a-z0-9'-]*|\d+(?:[.,]\d+)*")
+_NUMBER_RE = re.compile(r"(?<![\w.])\d+(?:[.,]\d+)*")
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+_LIST_MARKER_RE = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s+")
+
+_STOPWORDS = frozenset(
+    """
+    a an and are as at be been but by can could do does for from has have if in into is it its
+    may must not of on or our shall should such than that the their them then there these they
+    this those to under upon was were what when where which who will with within without you your
+    also any each other per all more most only same so some very
+    """.split()
+)
+
+
+@dataclass(frozen=True)
+class ChunkFeatures:
+    words: FrozenSet[str]
+    bigrams: FrozenSet[Tuple[str, str]]
+    numbers: FrozenSet[str]
+
+
+_EMPTY = ChunkFeatures(frozenset(), frozenset(), frozenset())
+
+
+def _norm_number(n: str) -> str:
+    return n.replace(",", "").rstrip(".").lstrip("0") or "0"
+
+
+def content_words(text: str) -> List[str]:
+    return [w for w in _WORD_RE.findall((text or "").lower()) if (w not in _STOPWORDS and len(w) > 2) or w.isdigit()]
+
+
+@lru_cache(maxsize=4096)
+def chunk_features(text: str) -> ChunkFeatures:
+    """Feature sets for one evidence chunk (cached: chunk texts repeat across requests)."""
+    words = content_words(text)
+    return ChunkFeatures(
+        words=frozenset(words),
+        bigrams=frozenset(zip(words, words[1:])),
+        numbers=frozenset(_norm_number(n) for n in _NUMBER_RE.findall(text or "")),
+    )
+
+
+@lru_cache(maxsize=1024)
+def name_numbers(doc_name: str) -> FrozenSet[str]:
+    """Numbers in a document name ("KOS_Law_03-L-212_Labour_EN.pdf" -> {"3", "212"})."""
+    stem = re.sub(r"\.(pdf|md|txt)$", "", doc_name or "", flags=re.IGNORECASE)
+    return frozenset(_norm_number(n) for n in _NUMBER_RE.findall(stem.replace("_", " ")))
+
+
+class EvidenceIndex:
+    """chunk_id -> ChunkFeatures for the evidence of one request (numbers include the doc name's)."""
+
+    def __init__(self, evidence_list: Optional[List[Dict[str, Any]]] = None):
+        self._by_chunk: Dict[str, ChunkFeatures] = {}
+        for ev in evidence_list or []:
+            meta = ev.get("metadata", {}) or {}
+            chunk_id = meta.get("chunk_id")
+            if not chunk_id:
+                continue
+            feats = chunk_features(ev.get("text", "") or "")
+            extra = name_numbers(str(meta.get("doc_name") or "")) - feats.numbers
+            if extra:
+                feats = ChunkFeatures(feats.words, feats.bigrams, feats.numbers | extra)
+            self._by_chunk[str(chunk_id)] = feats
+
+    def union(self, chunk_ids: Iterable[str]) -> ChunkFeatures:
+        feats = [self._by_chunk[c] for c in chunk_ids if c in self._by_chunk]
+        if not feats:
+            return _EMPTY
+        if len(feats) == 1:
+            return feats[0]
+        return ChunkFeatures(
+            words=frozenset().union(*(f.words for f in feats)),
+            bigrams=frozenset().union(*(f.bigrams for f in feats)),
+            numbers=frozenset().union(*(f.numbers for f in feats)),
+        )
+
+
+def _sentences_with_cites(parsed: ParsedAnswer, paragraph_index: int) -> List[Tuple[str, List[str]]]:
+    """
+    Sentences of one paragraph, each with the chunk ids cited right after it.
+    A citation attaches to the last sentence before it; uncited sentences get [].
+    """
+    p = parsed.paragraphs[paragraph_index]
+    out: List[Tuple[str, List[str]]] = []
+    pos = p.start
+    for g in list(p.groups) + [None]:
+        seg = parsed.text[pos:(g.start if g else p.end)]
+        for s in _SENTENCE_SPLIT_RE.split(seg):
+            s = _LIST_MARKER_RE.sub("", s)
+            if content_words(s):
+                out.append((s.strip(), []))
+        if g is None:
+            break
+        if out:
+            out[-1][1].extend(c.chunk_id for c in g.citations if c.chunk_id)
+        pos = g.end
+    return out
+
+
+def check_grounding(
+    parsed: ParsedAnswer,
+    index: EvidenceIndex,
+    min_support: float = 0.5,
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Returns (paragraph_issues, stats).
+    A sentence is unsupported when it has a number missing from its cited chunk(s) and their doc names,
+    or when fewer than min_support of its content words (or bigrams, whichever is
+    better) appear in them. Sentences without a direct citation are scored against
+    all chunks cited in their paragraph.
+    """
+    t0 = time.perf_counter()
+    issues: List[Dict[str, Any]] = []
+    checked = 0
+    unsupported = 0
+
+    for p in parsed.paragraphs:
+        para_ids = p.chunk_ids()
+        problems: List[str] = []
+        for sentence, cited in _sentences_with_cites(parsed, p.index):
+            feats = index.union(cited or para_ids)
+            if feats is _EMPTY:
+                continue
+            checked += 1
+
+            numbers = {_norm_number(n) for n in _NUMBER_RE.findall(sentence)}
+            missing_numbers = sorted(numbers - feats.numbers)
+
+            words = content_words(sentence)
+            support = 1.0
+            if len(words) >= 4:
+                word_cov = len(set(words) & feats.words) / len(set(words))
+                bigrams = set(zip(words, words[1:]))
+                bigram_cov = len(bigrams & feats.bigrams) / len(bigrams) if bigrams else 0.0
+                support = max(word_cov, bigram_cov)
+
+            if missing_numbers:
+                problems.append(f'Numbers {missing_numbers} in "{sentence[:80]}" are not in the cited evidence.')
+            elif support < min_support:
+                problems.append(f'"{sentence[:80]}" is weakly supported by its citation ({support:.0%} word overlap).')
+            else:
+                continue
+            unsupported += 1
+
+        if problems:
+            issues.append(
+                {
+                    "paragraph": p.index,
+                    "kind": "unsupported_claim",
+                    "chunk_ids": para_ids,
+                    "message": " ".join(problems) + " Only state what the cited excerpts say.",
+                }
+            )
+
+    stats = {
+        "sentences": checked,
+        "unsupported": unsupported,
+        "ms": round((time.perf_counter() - t0) * 1000, 3),
+    }
+    return issues, stats
@@ -1,16 +1,56 @@
 from __future__ import annotations
 
+import re
+
+_SUBTOPIC_SPLIT_RE = re.compile(r"(?<=\?)\s+|\s*;\s*")
+
+
+def plan_queries(question: str) -> list[str]:
+    """
+    Retrieval sub-queries for the research fan-out (one parallel search each):
+    - the full question
+    - each sub-question of a multi-part question ("...? ...?" or "...; ...")
+    - targeted keyword expansions (e.g. the Holidays law)
+    """
+    q = (question or "").strip()
+    queries = [q]
+
+    parts = [p.strip() for p in _SUBTOPIC_SPLIT_RE.split(q) if p.strip()]
+    if len(parts) > 1:
+        queries += [p for p in parts if len(p.split()) >= 3]
+
+    # Targeted expansion for Holidays PDF
+    ql = q.lower()
+    if "holiday" in ql or "holidays" in ql:
+        queries += [
+            "Law 03-L-064 Official Holidays Kosovo",
+            "official holidays Kosovo law",
+            "public holidays Kosovo",
+        ]
+
+    seen = set()
+    out = []
+    for item in queries:
+        key = item.lower()
+        if key not in seen:
+            seen.add(key)
+            out.append(item)
+    return out
+
+
 def make_plan(question: str) -> dict:
     """
     Planner agent:
     - No LLM needed.
     - Makes a deterministic plan (good for grading + reproducibility).
+    - sub_queries drive the parallel research fan-out.
     """
     return {
         "goal": "Answer using only approved documents with citations.",
         "question": question,
+        "sub_queries": plan_queries(question),
         "steps": [
-            "Retrieve relevant evidence chunks from the vector database",
+            "Retrieve relevant evidence chunks from the vector database (one parallel search per sub-query)",
             "Write an answer grounded only in the evidence, with citations",
             "Verify the answer is supported by evidence (no hallucinations)",
             "If verification fails, revise once using verifier feedback",
@@ -1,40 +1,102 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List
+import threading
+from typing import Any, Dict, List, Optional, Tuple
 
+from agents.planner import plan_queries
+from agents.tracing import start_span
 from retrieval.retriever import Retriever
 
+_RETRIEVER: Optional[Retriever] = None
+_RETRIEVER_LOCK = threading.Lock()
 
-def retrieve_evidence(question: str, k: int = 6) -> List[Dict[str, Any]]:
-    r = Retriever()
 
-    ql = (question or "").lower()
-    queries = [question]
+def get_retriever() -> Retriever:
+    """
+    Shared Retriever (one Chroma client + one OpenAI client per process).
+    Built lazily on first use; safe to call from worker threads.
+    """
+    global _RETRIEVER
+    if _RETRIEVER is None:
+        with _RETRIEVER_LOCK:
+            if _RETRIEVER is None:
+                _RETRIEVER = Retriever()
+    return _RETRIEVER
 
-    # Targeted expansion for Holidays PDF
-    if "holiday" in ql or "holidays" in ql:
-        queries += [
-            "Law 03-L-064 Official Holidays Kosovo",
-            "official holidays Kosovo law",
-            "public holidays Kosovo",
-        ]
 
-    # Merge unique chunks
-    merged: List[Dict[str, Any]] = []
-    seen = set()
+def _evidence_key(item: Dict[str, Any]) -> str:
+    return (
+        (item.get("metadata", {}) or {}).get("chunk_id")
+        or item.get("citation")
+        or item.get("text", "")[:80]
+    )
+
+
+def _distance(item: Dict[str, Any]) -> float:
+    # Lower is better; missing distances sort last
+    return item.get("distance") if item.get("distance") is not None else 999999
+
+
+def merge_evidence(left: List[Dict[str, Any]], right: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Reducer for the research fan-out: union of two hit lists, deduplicated by
+    chunk id (keeping the closest distance), sorted by distance.
+    """
+    best: Dict[str, Dict[str, Any]] = {}
+    for item in list(left or []) + list(right or []):
+        key = _evidence_key(item)
+        if key not in best or _distance(item) < _distance(best[key]):
+            best[key] = item
+    return sorted(best.values(), key=_distance)
+
 
-    for q in queries:
-        res = r.search(q, k=max(k, 6))
-        for item in res:
-            key = item.get("citation") or (item.get("metadata", {}) or {}).get("chunk_id") or item.get("text", "")[:80]
-            if key in seen:
-                continue
-            seen.add(key)
-            merged.append(item)
+def _query_embedding(
+    retriever: Retriever, query: str, embedding: Optional[List[float]]
+) -> Tuple[Optional[List[float]], str]:
+    """(embedding to search with, source): given by the caller, from the query-embedding cache, or None (API)."""
+    if embedding is not None:
+        return embedding, "given"
+    cached = retriever.cached_embedding(query)
+    return (cached, "cache") if cached is not None else (None, "api")
 
-    # Sort by distance if present (lower is better)
-    merged.sort(key=lambda x: (x.get("distance") if x.get("distance") is not None else 999999))
 
+def search_query(
+    query: str,
+    k: int = 6,
+    timeout: Optional[float] = None,
+    embedding: Optional[List[float]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    One research sub-query (a single fan-out branch); timeout bounds the embedding call.
+    A precomputed embedding of the query skips the embedding call; the span records
+    where the embedding came from (embedding="given" / "cache" / "api").
+    """
+    with start_span("retriever.search", n_results=max(k, 6)) as sp:
+        retriever = get_retriever()
+        embedding, source = _query_embedding(retriever, query, embedding)
+        hits = retriever.search(query, k=max(k, 6), timeout=timeout, embedding=embedding)
+        sp.set(hits=len(hits), embedding=source)
+    return hits
+
+
+async def asearch_query(
+    query: str,
+    k: int = 6,
+    timeout: Optional[float] = None,
+    embedding: Optional[List[float]] = None,
+) -> List[Dict[str, Any]]:
+    with start_span("retriever.search", n_results=max(k, 6)) as sp:
+        retriever = get_retriever()
+        embedding, source = _query_embedding(retriever, query, embedding)
+        hits = await retriever.asearch(query, k=max(k, 6), timeout=timeout, embedding=embedding)
+        sp.set(hits=len(hits), embedding=source)
+    return hits
+
+
+def retrieve_evidence(question: str, k: int = 6) -> List[Dict[str, Any]]:
+    merged: List[Dict[str, Any]] = []
+    for q in plan_queries(question):
+        merged = merge_evidence(merged, search_query(q, k=k))
     return merged[:k]
 
 
@@ -0,0 +1,125 @@
+"""
+Session-scoped evidence cache for follow-up questions:
+- Each answered turn keeps its question, question embedding and retrieved chunks.
+- A new turn is compared to earlier turns by embedding similarity; related turns
+  contribute their chunks (re-ranked against the new question, no new search) and
+  only new terms that those chunks do not already contain trigger one incremental search.
+Process-local and bounded (LRU over sessions, last N turns per session).
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+from agents.grounding import chunk_features, content_words
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+def _cosine(a: List[float], b: List[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = (sum(x * x for x in a) ** 0.5) * (sum(y * y for y in b) ** 0.5)
+    return dot / norm if norm else 0.0
+
+
+@dataclass
+class Turn:
+    question: str
+    embedding: List[float]
+    terms: Set[str]
+    hits: List[Dict[str, Any]]
+
+
+class SessionEvidence:
+    """Evidence from the last `max_turns` turns of one conversation."""
+
+    def __init__(self, max_turns: int = 5):
+        self._lock = threading.Lock()
+        self._turns: Deque[Turn] = deque(maxlen=max(1, max_turns))
+        self.version: Optional[str] = None  # collection version the chunks came from
+
+    def __len__(self) -> int:
+        return len(self._turns)
+
+    def add(self, question: str, embedding: List[float], hits: List[Dict[str, Any]], version: str) -> None:
+        with self._lock:
+            if version != self.version:
+                self._turns.clear()
+                self.version = version
+            self._turns.append(
+                Turn(question=question, embedding=list(embedding), terms=set(content_words(question)), hits=list(hits))
+            )
+
+    def related(self, embedding: List[float], min_similarity: float, version: str) -> List[Tuple[Turn, float]]:
+        """Earlier turns similar enough to the new question (most similar first); none after a re-ingest."""
+        with self._lock:
+            if version != self.version:
+                return []
+            scored = [(t, _cosine(embedding, t.embedding)) for t in self._turns]
+        return sorted([ts for ts in scored if ts[1] >= min_similarity], key=lambda ts: -ts[1])
+
+    @staticmethod
+    def new_terms(question: str, turns: List[Turn]) -> List[str]:
+        """Content words of the question that none of the related turns asked about (the delta)."""
+        seen: Set[str] = set()
+        for t in turns:
+            seen |= t.terms
+        out = []
+        for w in content_words(question):
+            if w not in seen and w not in out:
+                out.append(w)
+        return out
+
+    @staticmethod
+    def uncovered_terms(terms: List[str], hits: List[Dict[str, Any]]) -> List[str]:
+        """Delta terms that none of the hits' texts contain (only these are worth a search)."""
+        words: Set[str] = set()
+        for h in hits:
+            words |= chunk_features(h.get("text", "") or "").words
+        return [t for t in terms if t not in words]
+
+    @staticmethod
+    def prior_hits(turns: List[Turn]) -> List[Dict[str, Any]]:
+        """Chunks retrieved by the related turns, deduplicated by chunk id."""
+        out: Dict[str, Dict[str, Any]] = {}
+        for t in turns:
+            for h in t.hits:
+                key = (h.get("metadata") or {}).get("chunk_id") or h.get("citation")
+                if key and key not in out:
+                    out[key] = h
+        return list(out.values())
+
+
+_SESSIONS: "OrderedDict[str, SessionEvidence]" = OrderedDict()
+_SESSIONS_LOCK = threading.Lock()
+
+
+def get_session(session_id: str) -> SessionEvidence:
+    """
+    Session store (LRU):
+      SESSION_CACHE_MAX=256   sessions kept per process
+      SESSION_MAX_TURNS=5     turns kept per session
+    """
+    with _SESSIONS_LOCK:
+        session = _SESSIONS.get(session_id)
+        if session is None:
+            session = _SESSIONS[session_id] = SessionEvidence(_env_int("SESSION_MAX_TURNS", 5))
+            while len(_SESSIONS) > max(1, _env_int("SESSION_CACHE_MAX", 256)):
+                _SESSIONS.popitem(last=False)
+        else:
+            _SESSIONS.move_to_end(session_id)
+        return session
+
+
+def clear_session(session_id: str) -> None:
+    with _SESSIONS_LOCK:
+        _SESSIONS.pop(session_id, None)
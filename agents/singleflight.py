@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterator, Tuple
+
+
+class SingleFlight:
+    """
+    Request coalescing for threads:
+    - The first caller for a key runs fn(); callers arriving while it runs
+      block on the same Future and receive its result (or its exception).
+    - The key is released as soon as the call finishes, so nothing is cached.
+    Returns (result, coalesced) where coalesced=True for the followers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        with self._lock:
+            fut = self._calls.get(key)
+            leader = fut is None
+            if leader:
+                fut = Future()
+                self._calls[key] = fut
+
+        if not leader:
+            return fut.result(), True
+
+        try:
+            result = fn()
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        else:
+            fut.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+
+class KeyedLock:
+    """
+    Mutual exclusion per key for threads (e.g. one run per checkpoint thread).
+    Locks exist only while someone holds or waits for them, so keys do not accumulate.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._locks: Dict[Hashable, list] = {}  # key -> [lock, holders + waiters]
+
+    @contextmanager
+    def hold(self, key: Hashable) -> Iterator[None]:
+        with self._lock:
+            entry = self._locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._locks[key]
+
+
+class AsyncSingleFlight:
+    """
+    Request coalescing for coroutines (per event loop):
+    - The first caller starts fn() as a task; everyone (leader included) awaits it
+      through asyncio.shield, so a cancelled caller never cancels the shared work.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Tuple[int, Hashable], asyncio.Task] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        loop = asyncio.get_running_loop()
+        slot = (id(loop), key)
+
+        task = self._calls.get(slot)
+        coalesced = task is not None and not task.done()
+        if not coalesced:
+            task = loop.create_task(fn())
+            self._calls[slot] = task
+
+            def _release(t: asyncio.Task, slot=slot) -> None:
+                if self._calls.get(slot) is t:
+                    del self._calls[slot]
+
+            task.add_done_callback(_release)
+
+        return await asyncio.shield(task), coalesced
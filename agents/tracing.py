@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+# Span currently open in this thread/task (children attach to it)
+_CURRENT: ContextVar[Optional["Span"]] = ContextVar("hr_copilot_span", default=None)
+
+
+def _new_id(nbytes: int) -> str:
+    return os.urandom(nbytes).hex()
+
+
+@dataclass
+class Span:
+    """
+    One timed unit of work (request, graph node, LLM call, search...).
+    Wall-clock start (epoch ns) for export; duration from perf_counter_ns (monotonic, precise).
+    """
+    name: str
+    trace_id: str = field(default_factory=lambda: _new_id(16))
+    span_id: str = field(default_factory=lambda: _new_id(8))
+    parent_id: Optional[str] = None
+    start_ns: int = field(default_factory=time.time_ns)
+    end_ns: Optional[int] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    children: List["Span"] = field(default_factory=list)
+    _t0: int = field(default_factory=time.perf_counter_ns, repr=False)
+
+    def set(self, **attrs: Any) -> "Span":
+        self.attributes.update(attrs)
+        return self
+
+    def end(self) -> None:
+        if self.end_ns is None:
+            self.end_ns = self.start_ns + (time.perf_counter_ns() - self._t0)
+
+    @property
+    def ms(self) -> float:
+        end = self.end_ns if self.end_ns is not None else self.start_ns + (time.perf_counter_ns() - self._t0)
+        return round((end - self.start_ns) / 1e6, 3)
+
+    def context(self) -> Dict[str, str]:
+        """Serializable parent reference (passed in the run config for nodes run on other threads)."""
+        return {"trace_id": self.trace_id, "span_id": self.span_id}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "ms": self.ms,
+            **self.attributes,
+            "spans": [c.to_dict() for c in self.children],
+        }
+
+    def trace_entry(self, agent: str, status: str, **attrs: Any) -> Dict[str, Any]:
+        """
+        Workflow trace entry (what the UI/eval read: agent/status/ms + node stats),
+        with span ids and nested child spans attached.
+        """
+        self.set(status=status, **attrs)
+        self.end()
+        return {"agent": agent, **self.to_dict()}
+
+
+@contextmanager
+def start_span(name: str, parent: Optional[Dict[str, str]] = None, **attrs: Any) -> Iterator[Span]:
+    """
+    Open a span. Parent is the explicit context (e.g. the run config's "trace_ctx") if given,
+    otherwise the span currently open in this thread/task. Child spans nest into it.
+    """
+    current = _CURRENT.get()
+    if parent:
+        span = Span(name=name, trace_id=parent["trace_id"], parent_id=parent["span_id"], attributes=dict(attrs))
+    elif current is not None:
+        span = Span(name=name, trace_id=current.trace_id, parent_id=current.span_id, attributes=dict(attrs))
+    else:
+        span = Span(name=name, attributes=dict(attrs))
+
+    token = _CURRENT.set(span)
+    try:
+        yield span
+    finally:
+        span.end()
+        _CURRENT.reset(token)
+        if current is not None and not parent:
+            current.children.append(span)
+
+
+def current_span() -> Optional[Span]:
+    return _CURRENT.get()
+
+
+# ----------------------------- exporters -----------------------------
+
+def _flatten(span: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    children = span.get("spans") or []
+    yield {k: v for k, v in span.items() if k != "spans"}
+    for c in children:
+        yield from _flatten(c)
+
+
+class JsonlSpanExporter:
+    """One flat span per line (parent ids preserved) — easy to grep / load into pandas."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def _lines(self, spans: List[Dict[str, Any]]) -> List[str]:
+        return [json.dumps(s, default=str) for s in spans]
+
+    def export(self, root: Dict[str, Any], entries: List[Dict[str, Any]]) -> None:
+        spans = list(_flatten(root))
+        for e in entries:
+            spans.extend(_flatten(e))
+        lines = self._lines(spans)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock, self.path.open("a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+
+def _otlp_value(v: Any) -> Dict[str, Any]:
+    if isinstance(v, bool):
+        return {"boolValue": v}
+    if isinstance(v, int):
+        return {"intValue": str(v)}
+    if isinstance(v, float):
+        return {"doubleValue": v}
+    if isinstance(v, str):
+        return {"stringValue": v}
+    return {"stringValue": json.dumps(v, default=str)}
+
+
+_SPAN_FIELDS = {"name", "trace_id", "span_id", "parent_id", "start_ns", "end_ns", "ms", "agent"}
+
+
+class OtlpFileSpanExporter(JsonlSpanExporter):
+    """
+    OTLP/JSON, one ExportTraceServiceRequest per line (same layout as the
+    OpenTelemetry Collector file exporter), so any OTLP tooling can ingest it.
+    """
+
+    def _lines(self, spans: List[Dict[str, Any]]) -> List[str]:
+        otlp_spans = []
+        for s in spans:
+            span = {
+                "traceId": s["trace_id"],
+                "spanId": s["span_id"],
+                "name": s.get("agent") or s["name"],
+                "kind": 1,
+                "startTimeUnixNano": str(s["start_ns"]),
+                "endTimeUnixNano": str(s["end_ns"] or s["start_ns"]),
+                "attributes": [
+                    {"key": k, "value": _otlp_value(v)}
+                    for k, v in s.items()
+                    if k not in _SPAN_FIELDS and v is not None
+                ],
+            }
+            if s.get("parent_id"):
+                span["parentSpanId"] = s["parent_id"]
+            otlp_spans.append(span)
+
+        request = {
+            "resourceSpans": [
+                {
+                    "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": "hr-ops-copilot"}}]},
+                    "scopeSpans": [{"scope": {"name": "agents.workflow"}, "spans": otlp_spans}],
+                }
+            ]
+        }
+        return [json.dumps(request, default=str)]
+
+
+_EXPORTER_LOCK = threading.Lock()
+_EXPORTER: Any = None
+_EXPORTER_KEY: Any = None
+
+
+def get_exporter() -> Optional[JsonlSpanExporter]:
+    """
+    Configured by env:
+      TRACE_EXPORT=jsonl|otlp      (unset/empty = no export)
+      TRACE_EXPORT_PATH=storage/traces.jsonl
+    """
+    global _EXPORTER, _EXPORTER_KEY
+    kind = os.getenv("TRACE_EXPORT", "").strip().lower()
+    path = os.getenv("TRACE_EXPORT_PATH", "storage/traces.jsonl")
+    if kind not in ("jsonl", "otlp"):
+        return None
+
+    with _EXPORTER_LOCK:
+        if _EXPORTER_KEY != (kind, path):
+            _EXPORTER = OtlpFileSpanExporter(path) if kind == "otlp" else JsonlSpanExporter(path)
+            _EXPORTER_KEY = (kind, path)
+        return _EXPORTER
+
+
+def export_trace(root: Span, entries: List[Dict[str, Any]]) -> None:
+    """Export one request (root span + workflow trace entries). Never raises."""
+    exporter = get_exporter()
+    if exporter is None:
+        return
+    try:
+        exporter.export(root.to_dict(), entries)
+    except Exception:
+        pass
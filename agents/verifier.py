@@ -1,39 +1,15 @@
 from __future__ import annotations
 
-import re
+import os
 from typing import Any, Dict, List, Tuple, Set, Optional
 
 from agents.deliverer import NOT_FOUND_EXACT  # "Not found in the sources."
+from agents.grounding import EvidenceIndex, check_grounding
+from retrieval.citations import ParsedAnswer, parse_answer
 
 
-def _extract_bracket_groups(text: str) -> List[str]:
-    """
-    Extracts the raw content inside [ ... ] blocks.
-    Returns items like: "Doc.pdf | p.1 | chunk_0000; Doc.pdf | p.2 | chunk_0001"
-    """
-    return re.findall(r"\[([^\]]+)\]", text or "")
-
-
-def _split_multi_cites(group: str) -> List[str]:
-    """
-    Supports multiple citations inside one bracket, separated by ';' or ','.
-    Example:
-      "A | x; B | y" -> ["A | x", "B | y"]
-    """
-    parts = re.split(r"\s*[;,]\s*", (group or "").strip())
-    return [p.strip() for p in parts if p.strip()]
-
-
-def _chunk_id_from_cite_inner(cite_inner: str) -> str:
-    """
-    Normalizes a citation to a comparable key.
-    We use the chunk id as the key, since it's stable across formatting.
-    If the cite has pipes, we take the last segment.
-    """
-    c = (cite_inner or "").strip()
-    if "|" in c:
-        return c.split("|")[-1].strip()
-    return c
+def _grounding_enabled() -> bool:
+    return os.getenv("VERIFIER_GROUNDING", "0").strip().lower() in ("1", "true", "yes", "on")
 
 
 def _evidence_chunk_ids(evidence_pack: str) -> Set[str]:
@@ -42,34 +18,7 @@ def _evidence_chunk_ids(evidence_pack: str) -> Set[str]:
     evidence_pack has lines like:
       EXCERPT 1 [Doc | ... | chunk_id]
     """
-    ids: Set[str] = set()
-    for group in _extract_bracket_groups(evidence_pack):
-        for piece in _split_multi_cites(group):
-            cid = _chunk_id_from_cite_inner(piece)
-            if cid:
-                ids.add(cid)
-    return ids
-
-
-def _answer_chunk_ids(answer: str) -> List[str]:
-    """
-    Extract chunk IDs referenced in the answer (supports multi-cites per bracket).
-    """
-    out: List[str] = []
-    for group in _extract_bracket_groups(answer):
-        for piece in _split_multi_cites(group):
-            cid = _chunk_id_from_cite_inner(piece)
-            if cid:
-                out.append(cid)
-    return out
-
-
-def _paragraphs(text: str) -> List[str]:
-    return [p.strip() for p in re.split(r"\n\s*\n", text or "") if p.strip()]
-
-
-def _paragraph_has_citation(p: str) -> bool:
-    return bool(re.search(r"\[[^\]]+\]", p or ""))
+    return set(parse_answer(evidence_pack).chunk_ids())
 
 
 def _is_not_found(text: str) -> bool:
@@ -83,7 +32,12 @@ def _is_not_found(text: str) -> bool:
     return t == NOT_FOUND_EXACT or t.startswith("Not found in")
 
 
-def _citation_integrity_check(answer: str, evidence_pack: str) -> Tuple[bool, str]:
+def _citation_integrity_check(
+    answer: str,
+    evidence_pack: str,
+    parsed: Optional[ParsedAnswer] = None,
+    ev_ids: Optional[Set[str]] = None,
+) -> Tuple[bool, str]:
     """
     Validates:
     1) Answer citations refer only to chunk_ids present in evidence_pack
@@ -95,12 +49,14 @@ def _citation_integrity_check(answer: str, evidence_pack: str) -> Tuple[bool, st
     if _is_not_found(text):
         return True, ""
 
+    parsed = parsed or parse_answer(text)
+
     # Must contain at least one citation somewhere
-    if not _extract_bracket_groups(text):
+    if not parsed.groups:
         return False, "Answer has no citations. Add citations copied from evidence, or return NOT_FOUND."
 
-    ev_ids = _evidence_chunk_ids(evidence_pack)
-    ans_ids = _answer_chunk_ids(text)
+    ev_ids = ev_ids if ev_ids is not None else _evidence_chunk_ids(evidence_pack)
+    ans_ids = parsed.chunk_ids()
 
     missing = [cid for cid in ans_ids if cid not in ev_ids]
     if missing:
@@ -111,30 +67,106 @@ def _citation_integrity_check(answer: str, evidence_pack: str) -> Tuple[bool, st
         )
 
     # Each paragraph must have at least one citation
-    for p in _paragraphs(text):
-        if not _paragraph_has_citation(p):
+    for p in parsed.paragraphs:
+        if not p.has_citation:
             return False, "A paragraph is missing a citation. Add at least one citation per paragraph."
 
     return True, ""
 
 
+def _paragraph_issues(
+    answer: str,
+    evidence_pack: str,
+    parsed: Optional[ParsedAnswer] = None,
+    ev_ids: Optional[Set[str]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Structured, per-paragraph version of _citation_integrity_check.
+    Paragraph indexes follow parsed.paragraphs, so the reviser can re-generate
+    and splice back only the failing paragraphs.
+    """
+    text = (answer or "").strip()
+    if _is_not_found(text):
+        return []
+
+    parsed = parsed or parse_answer(text)
+    ev_ids = ev_ids if ev_ids is not None else _evidence_chunk_ids(evidence_pack)
+    issues: List[Dict[str, Any]] = []
+
+    for p in parsed.paragraphs:
+        i = p.index
+        if not p.has_citation:
+            issues.append(
+                {
+                    "paragraph": i,
+                    "kind": "missing_citation",
+                    "chunk_ids": [],
+                    "message": "Paragraph has no citation. Add at least one citation copied from evidence.",
+                }
+            )
+            continue
+
+        missing = [cid for cid in p.chunk_ids() if cid not in ev_ids]
+        if missing:
+            issues.append(
+                {
+                    "paragraph": i,
+                    "kind": "citation_not_in_evidence",
+                    "chunk_ids": missing,
+                    "message": f"Citations not in evidence (by chunk_id): {missing}. Use only citations present in evidence.",
+                }
+            )
+
+    return issues
+
+
 def verify_answer(
     question: str,
     evidence_pack: str,
     draft: str,
     evidence_list: Optional[List[Dict[str, Any]]] = None,  # <-- added, so workflow kwarg won't crash
+    parsed: Optional[ParsedAnswer] = None,
+    grounding: Optional[bool] = None,
 ) -> Dict:
     """
     Verifier agent:
     - No hallucinations: citations must map to evidence chunks.
     - Every paragraph must contain at least one citation.
     - NOT_FOUND is allowed and returns PASS.
+    - On FAIL, paragraph_issues lists what is wrong with which paragraph (for targeted revision).
+    - parsed: the draft already tokenized by the workflow (skips re-parsing).
+    - grounding (default: VERIFIER_GROUNDING env): also check each sentence lexically
+      against the evidence chunk it cites (numbers must match), without an LLM call.
     """
     text = (draft or "").strip()
+    if parsed is None or parsed.text.strip() != text:
+        parsed = parse_answer(text)
+    ev_ids = _evidence_chunk_ids(evidence_pack)
 
-    ok, msg = _citation_integrity_check(text, evidence_pack)
+    ok, msg = _citation_integrity_check(text, evidence_pack, parsed=parsed, ev_ids=ev_ids)
     if not ok:
-        return {"status": "FAIL", "issues": [msg], "fix_instructions": msg}
-
-    return {"status": "PASS", "issues": [], "fix_instructions": ""}
+        return {
+            "status": "FAIL",
+            "issues": [msg],
+            "fix_instructions": msg,
+            "paragraph_issues": _paragraph_issues(text, evidence_pack, parsed=parsed, ev_ids=ev_ids),
+        }
+
+    if grounding is None:
+        grounding = _grounding_enabled()
+    if grounding and not _is_not_found(text):
+        min_support = float(os.getenv("VERIFIER_GROUNDING_MIN_SUPPORT", "0.5"))
+        issues, stats = check_grounding(parsed, EvidenceIndex(evidence_list), min_support=min_support)
+        if issues:
+            msg = " ".join(i["message"] for i in issues)
+            return {
+                "status": "FAIL",
+                "issues": [i["message"] for i in issues],
+                "fix_instructions": msg,
+                "paragraph_issues": issues,
+                "grounding": stats,
+            }
+        return {"status": "PASS", "issues": [], "fix_instructions": "", "paragraph_issues": [], "grounding": stats}
+
+    return {"status": "PASS", "issues": [], "fix_instructions": "", "paragraph_issues": []}
 
@@ -1,16 +1,32 @@
 from __future__ import annotations
 
+import asyncio
+import difflib
+import hashlib
+import os
 import re
 import time
-from typing import NotRequired, TypedDict
-
-from langgraph.graph import StateGraph, START, END
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import operator
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Annotated, Any, Callable, Iterable, Iterator, NotRequired, TypedDict
 
 from agents.planner import make_plan
-from agents.research import retrieve_evidence, format_evidence
-from agents.writer import write_answer
+from agents.research import get_retriever, search_query, asearch_query, merge_evidence, format_evidence
+from agents.writer import write_answer, awrite_answer, revise_paragraph, arevise_paragraph
 from agents.verifier import verify_answer
 from agents.deliverer import build_deliverable, NOT_FOUND_EXACT
+from agents.faq import precomputed_answer
+from agents.session import SessionEvidence, get_session
+from agents.singleflight import AsyncSingleFlight, KeyedLock, SingleFlight
+from agents.tracing import Span, export_trace, start_span
+from retrieval.citations import Paragraph, ParsedAnswer, parse_answer
+from retrieval.clients import api_timeout_error
+
+# langgraph / chromadb / openai are imported on first use, not here: importing this
+# module stays cheap for the UI, eval and pool workers (see eval/bench_import.py).
 
 NOT_FOUND = "Not found in provided sources."
 
@@ -19,6 +35,8 @@ def _normalize_citations(answer: str) -> str:
     """
     Convert citation formatting from:
       (Doc | ...chunk_0001)  ->  [Doc | ...chunk_0001]
+      [[Doc | ...chunk_0001]] ->  [Doc | ...chunk_0001]
+    (Merged [A | x; B | y] brackets are split later by _repair_citations.)
     Only touches strings that look like your citations (contain '|' and 'chunk_').
     """
     if not answer:
@@ -27,7 +45,12 @@ def _normalize_citations(answer: str) -> str:
         return answer
 
     # Convert parentheses citations to bracket citations
-    return re.sub(r"\(([^()]*\|[^()]*chunk_[^()]*)\)", r"[\1]", answer)
+    answer = re.sub(r"\(([^()]*\|[^()]*chunk_[^()]*)\)", r"[\1]", answer)
+
+    # Collapse doubled brackets
+    answer = re.sub(r"\[\s*\[([^\[\]]+)\]\s*\]", r"[\1]", answer)
+
+    return answer
 
 
 class WorkflowState(TypedDict):
@@ -36,22 +59,28 @@ class WorkflowState(TypedDict):
     k: int
     revision_count: int
     company_name: str
+    repair_count: NotRequired[int]
+    session_id: NotRequired[str | None]          # conversation id: enables evidence reuse across turns
 
     # Intermediate / outputs
     plan: NotRequired[dict]
+    query_embedding: NotRequired[list]
+    recall: NotRequired[dict]                      # session recall decision (mode, delta terms)
+    search_hits: Annotated[list, merge_evidence]   # research fan-out (merged by chunk id)
     evidence: NotRequired[list]
     evidence_pack: NotRequired[str]
     draft: NotRequired[str]
     answer: NotRequired[str]
+    parsed_answer: NotRequired[ParsedAnswer]
     verdict: NotRequired[dict]
     deliverable: NotRequired[dict]
-    trace: NotRequired[list]
-
+    missed: NotRequired[str | None]                # why the current answer is the NOT_FOUND placeholder
+                                                   # (a timed-out stage); overwritten, None once a real
+                                                   # answer replaces it
 
-def _trace_append(state: WorkflowState, entry: dict) -> list:
-    t = list(state.get("trace") or [])
-    t.append(entry)
-    return t
+    # Observability: append-only (each node returns only its own entries)
+    trace: Annotated[list, operator.add]
+    degraded: Annotated[list, operator.add]       # degradations fired under deadline pressure
 
 
 def _apply_company_name(text: str, company_name: str) -> str:
@@ -63,54 +92,430 @@ def _apply_company_name(text: str, company_name: str) -> str:
     )
 
 
-def _fix_answer_citations(answer: str, evidence: list[dict]) -> str:
+_CHUNK_ID_RE = re.compile(r"^(?P<stem>.*?)(?:_p(?P<page>\d+))?_chunk_(?P<idx>\d+)$")
+_PAGE_RE = re.compile(r"^p\.?\s*(\d+)$", re.IGNORECASE)
+# Chunk number in a fragment without a usable stem ("chunk_0009", "Policy_chunk_0009")
+_CHUNK_REF_RE = re.compile(r"(?:^|_)chunk_(\d+)$", re.IGNORECASE)
+# What a citation looks like (vs template brackets such as [YYYY-MM-DD] or [Laptop/Monitor/Other])
+_CITATION_LIKE_RE = re.compile(r"\||chunk_\d|\.(?:pdf|md|txt)\b", re.IGNORECASE)
+
+
+def _doc_key(name: str) -> str:
+    """Comparable doc key: lowercase alphanumerics without the file extension."""
+    stem = re.sub(r"\.(pdf|md|txt)$", "", (name or "").strip(), flags=re.IGNORECASE)
+    return re.sub(r"[^a-z0-9]+", "", stem.lower())
+
+
+def _doc_key_words(name: str) -> str:
+    stem = re.sub(r"\.(pdf|md|txt)$", "", (name or "").strip(), flags=re.IGNORECASE)
+    return stem.lower().replace("_", " ").replace("-", " ")
+
+
+def _name_similarity(cited: str, actual: str) -> float:
     """
-    If the LLM outputs citations like [Some_chunk_0000] (chunk-id only),
-    rewrite them into the exact full citation strings that appear in evidence,
-    e.g. [Doc.md | Some_chunk_0000] or [PDF | p.X | ...chunk...]
+    0..1 similarity between a cited doc/chunk name and the real one.
+    Shortened names ("Labour Law" for KOS_Law_03-L-212_Labour_EN.pdf) count as a
+    strong match when every cited word appears in the real name; otherwise we
+    fall back to edit-distance ratio on the normalized keys.
     """
-    if not answer:
-        return answer
+    words = set(re.findall(r"[a-z0-9]+", _doc_key_words(cited)))
+    if words and words <= set(re.findall(r"[a-z0-9]+", _doc_key_words(actual))):
+        return 0.9
+    return difflib.SequenceMatcher(None, _doc_key(cited), _doc_key(actual)).ratio()
+
 
-    # Map chunk_id -> full citation (including brackets)
-    chunk_to_full = {}
+def _evidence_citation_index(evidence: list[dict]) -> list[dict]:
+    """
+    One entry per evidence chunk with the pieces we fuzzy-match against:
+    full citation, chunk_id, doc name, page, chunk stem and chunk index.
+    """
+    out = []
     for ev in evidence or []:
         md = ev.get("metadata", {}) or {}
         chunk_id = md.get("chunk_id")
         full = ev.get("citation")
-        if chunk_id and full:
-            chunk_to_full[str(chunk_id)] = str(full)
+        if not chunk_id or not full:
+            continue
+        m = _CHUNK_ID_RE.match(str(chunk_id))
+        out.append(
+            {
+                "citation": str(full),
+                "chunk_id": str(chunk_id),
+                "doc": str(md.get("doc_name", "")),
+                "page": md.get("page"),
+                "stem": m.group("stem") if m else "",
+                "idx": int(m.group("idx")) if m else None,
+            }
+        )
+    return out
+
+
+def _resolve_citation(piece: str, index: list[dict]) -> str | None:
+    """
+    Map one cited fragment (the text inside a bracket) to the full evidence citation.
+    Tries, in order:
+      1) exact chunk_id (last '|' segment, or anywhere in the fragment)
+      2) same chunk number/page with the closest chunk stem (edit distance)
+      3) closest doc name, narrowed by page / chunk number until one chunk remains;
+         only when the fragment has such a locator, and never to a chunk whose number
+         contradicts the cited one (that citation is out of evidence: the verifier fails it)
+    Returns None when the fragment can't be matched to exactly one evidence chunk.
+    """
+    segments = [s.strip() for s in (piece or "").split("|") if s.strip()]
+    if not segments or not index:
+        return None
+
+    cited_id = segments[-1]
+    for ev in index:
+        if ev["chunk_id"] == cited_id:
+            return ev["citation"]
+    for ev in index:
+        if ev["chunk_id"] in piece:
+            return ev["citation"]
+
+    page = None
+    for seg in segments[1:]:
+        pm = _PAGE_RE.match(seg)
+        if pm:
+            page = int(pm.group(1))
+
+    m = _CHUNK_ID_RE.match(cited_id)
+    ref = _CHUNK_REF_RE.search(cited_id)
+    cited_idx = int(m.group("idx")) if m else (int(ref.group(1)) if ref else None)
+    if m:
+        idx = int(m.group("idx"))
+        if m.group("page"):
+            page = int(m.group("page"))
+        stem = m.group("stem")
+        same_slot = [
+            ev for ev in index
+            if ev["idx"] == idx and (page is None or ev["page"] in (None, page))
+        ]
+        scored = sorted(((_name_similarity(stem, ev["stem"]), ev) for ev in same_slot), key=lambda x: -x[0])
+        if scored and scored[0][0] >= 0.75 and (len(scored) == 1 or scored[1][0] < scored[0][0]):
+            return scored[0][1]["citation"]
+
+    doc = segments[0] if (len(segments) > 1 or not m) else ""
+    if not _doc_key(doc):
+        return None
+    # A doc name alone does not say which chunk backs the claim
+    if page is None and cited_idx is None:
+        return None
+
+    scores = [_name_similarity(doc, ev["doc"]) for ev in index]
+    best = max(scores)
+    if best < 0.6:
+        return None
+    candidates = [ev for ev, score in zip(index, scores) if score == best]
+    if page is not None:
+        candidates = [ev for ev in candidates if ev["page"] == page]
+    if cited_idx is not None:
+        candidates = [ev for ev in candidates if ev["idx"] == cited_idx]
+
+    if len(candidates) == 1:
+        return candidates[0]["citation"]
+    return None
+
+
+def _repair_citations(parsed: ParsedAnswer, evidence: list[dict]) -> tuple[str, int, int]:
+    """
+    Deterministic citation repair (no LLM call), driven by the parsed answer.
+    - Merged [A | x; B | y] brackets are split into one bracket per citation.
+    - Every cited fragment that can be matched to exactly one evidence chunk is
+      rewritten into that chunk's exact citation string.
+    - Brackets that are not citations (template placeholders) are left alone and not counted.
+    Returns (answer, repaired, unrepaired) counts per cited fragment.
+    """
+    text = parsed.text
+    if not text:
+        return text, 0, 0
+
+    index = _evidence_citation_index(evidence)
+    known = {ev["citation"] for ev in index}
+    repaired = 0
+    unrepaired = 0
+
+    out = []
+    pos = 0
+    for g in parsed.groups:
+        out.append(text[pos:g.start])
+        pos = g.end
+        if g.raw in known or not _CITATION_LIKE_RE.search(g.inner):
+            out.append(g.raw)
+            continue
+
+        merged = len(g.pieces) > 1 and "chunk_" in g.inner
+        fixed = []
+        for piece in (g.pieces if merged else (g.inner.strip(),)):
+            full = f"[{piece}]" if f"[{piece}]" in known else _resolve_citation(piece, index)
+            if full is None:
+                unrepaired += 1
+                fixed.append(f"[{piece}]" if merged else g.raw)
+                continue
+            repaired += 1
+            fixed.append(full)
+        out.append(" ".join(fixed))
+    out.append(text[pos:])
+
+    return "".join(out), repaired, unrepaired
+
 
-    # Replace bracketed citations that are chunk-only
-    def repl(m: re.Match) -> str:
-        inside = m.group(1).strip()
-        # If it already looks like "Doc | chunk", keep it
-        if "|" in inside:
-            return m.group(0)
+def _fix_answer_citations(answer: str, evidence: list[dict]) -> str:
+    """
+    If the LLM outputs citations like [Some_chunk_0000] (chunk-id only), a shortened
+    doc name, or a slightly mangled chunk id, rewrite them into the exact full
+    citation strings that appear in evidence,
+    e.g. [Doc.md | Some_chunk_0000] or [PDF | p.X | ...chunk...]
+    Anything that can't be matched is kept as-is (verifier may fail it).
+    """
+    fixed, _, _ = _repair_citations(parse_answer(answer or ""), evidence)
+    return fixed
 
-        # If it matches a known chunk_id, replace whole bracket with full citation
-        if inside in chunk_to_full:
-            return chunk_to_full[inside]
 
-        # Otherwise keep as-is (verifier may fail it)
-        return m.group(0)
+# ----------------------------- deadlines -----------------------------
+# Seconds left below which a stage degrades instead of running in full.
 
-    return re.sub(r"\[([^\]]+)\]", repl, answer)
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+def _deadline_at(deadline_s: float | None) -> float | None:
+    """Absolute monotonic deadline from a budget in seconds (None = env ANSWER_DEADLINE_S or no deadline)."""
+    if deadline_s is None:
+        env = os.getenv("ANSWER_DEADLINE_S", "").strip()
+        deadline_s = float(env) if env else None
+    return None if deadline_s is None else time.monotonic() + float(deadline_s)
+
+
+def _run_ctx() -> dict:
+    """
+    Per-attempt values (deadline, parent span) travel in the run config, not in
+    the state: a checkpointed state can be resumed later by a different attempt.
+    """
+    from langgraph.config import get_config
+
+    return get_config().get("configurable", {}) or {}
+
+
+def _deadline() -> float | None:
+    return _run_ctx().get("deadline")
+
+
+def _trace_parent() -> dict | None:
+    return _run_ctx().get("trace_ctx")
+
+
+def _time_left(deadline: float | None) -> float | None:
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def _call_timeout(deadline: float | None, cap_env: str, cap_default: float) -> float | None:
+    """
+    Timeout for one network call under a deadline: capped per stage, and never past the
+    deadline minus DEADLINE_RESERVE_S (kept for repair/verify/deliver). <= 0 means skip the call.
+    None without a deadline: the call keeps the client's own timeout and retries
+    (a timed call is not retried, so 429s / 5xx would otherwise fail the request).
+    """
+    left = _time_left(deadline)
+    if left is None:
+        return None
+    return min(_env_float(cap_env, cap_default), left - _env_float("DEADLINE_RESERVE_S", 1.0))
+
+
+def _out_of_time(timeout: float | None) -> bool:
+    return timeout is not None and timeout <= 0
+
+
+def _miss_issue(before: str, cap_env: str, cap_default: float, timeout: float | None) -> str:
+    """Verdict issue for a stage that produced nothing: the request deadline, the stage's cap, or the client."""
+    if timeout is None:
+        return f"The call timed out before {before} (client timeout, no deadline set)."
+    cap = _env_float(cap_env, cap_default)
+    if timeout < cap:
+        return f"Deadline exceeded before {before}."
+    return f"{cap_env} ({cap:g}s) exceeded before {before}."
 
 
 def _plan_node(state: WorkflowState) -> dict:
-    t0 = time.perf_counter()
-    plan = make_plan(state["question"])
-    ms = int((time.perf_counter() - t0) * 1000)
-    trace = _trace_append(state, {"agent": "planner", "status": "ok", "ms": ms})
-    return {"plan": plan, "trace": trace}
+    with start_span("planner", parent=_trace_parent()) as sp:
+        plan = make_plan(state["question"])
+
+        # Low budget: search the full question only (sub_queries[0]), skip sub-questions/expansions
+        degraded = []
+        queries = plan.get("sub_queries") or []
+        left = _time_left(_deadline())
+        if len(queries) > 1 and left is not None and left < _env_float("DEADLINE_MIN_EXPANSION_S", 10.0):
+            plan = {**plan, "sub_queries": queries[:1]}
+            degraded.append("skip_expansion_queries")
+
+    attrs = {"degraded": degraded} if degraded else {}
+    entry = sp.trace_entry("planner", "ok", sub_queries=len(plan.get("sub_queries") or []), **attrs)
+    return {"plan": plan, "degraded": degraded, "trace": [entry]}
+
+
+def _fan_out_research(state: WorkflowState) -> list | str:
+    """
+    One parallel "search" branch per planner sub-query (LangGraph Send API).
+    In a session, "recall" runs first and may narrow this to one incremental
+    search (mode "delta") or none at all (mode "reuse").
+    """
+    from langgraph.types import Send
+
+    if state.get("session_id") and "recall" not in state:
+        return "recall"
+
+    mode = (state.get("recall") or {}).get("mode", "cold")
+    if mode == "reuse":
+        return "research"
+
+    question = state["question"].strip()
+    queries = [question] if mode == "delta" else (state.get("plan") or {}).get("sub_queries") or [question]
+    embedding = state.get("query_embedding")
+
+    sends = []
+    for q in queries:
+        task = {"query": q, "k": state["k"]}
+        if embedding and q.strip() == question:
+            task["embedding"] = embedding  # already embedded by recall
+        sends.append(Send("search", task))
+    return sends
+
+
+def _recall_update(state: WorkflowState, sp: Span, q_emb: list | None, degraded: str | None = None) -> dict:
+    """
+    Session recall: earlier turns similar to this question (SESSION_REUSE_MIN_SIM)
+    lend their chunks, re-ranked against this question's embedding. New terms the
+    top-k reused chunks do not contain -> one incremental search with the recall
+    embedding ("delta"); none -> no search ("reuse"); no related turn -> normal
+    fan-out ("cold"). The trace entry records the searches / embeddings saved
+    against the planner fan-out.
+    """
+    recall = {"mode": "cold", "delta_terms": []}
+    update: dict = {"recall": recall}
+    attrs: dict = {"turns": 0, "searches_saved": 0, "embeddings_saved": 0}
+    fan_out = len((state.get("plan") or {}).get("sub_queries") or []) or 1
+
+    if q_emb is not None:
+        update["query_embedding"] = q_emb
+        retriever = get_retriever()
+        related = get_session(state["session_id"]).related(
+            q_emb, _env_float("SESSION_REUSE_MIN_SIM", 0.45), retriever.version()
+        )
+        turns = [t for t, _ in related]
+        hits = retriever.rescore(SessionEvidence.prior_hits(turns), q_emb) if turns else []
+        if hits:
+            delta = SessionEvidence.new_terms(state["question"], turns)
+            top = sorted(hits, key=lambda h: h.get("distance", float("inf")))[: state["k"]]
+            missing = SessionEvidence.uncovered_terms(delta, top) if len(top) >= state["k"] else delta
+            recall.update(mode="delta" if missing else "reuse", delta_terms=delta)
+            update["search_hits"] = hits
+            attrs = {
+                "turns": len(turns),
+                "similarity": round(related[0][1], 3),
+                "reused": len(hits),
+                "delta_terms": delta,
+                "uncovered_terms": missing,
+                # vs the cold fan-out: recall's embedding stands in for the question's own
+                "searches_saved": fan_out if not missing else fan_out - 1,
+                "embeddings_saved": fan_out - 1,
+            }
+
+    if degraded:
+        attrs["degraded"] = [degraded]
+        update["degraded"] = [degraded]
+    update["trace"] = [sp.trace_entry("recall", recall["mode"], **attrs)]
+    return update
+
+
+def _recall_node(state: WorkflowState) -> dict:
+    with start_span("recall", parent=_trace_parent()) as sp:
+        timeout = _call_timeout(_deadline(), "SEARCH_TIMEOUT_S", 20.0)
+        if _out_of_time(timeout):
+            return _recall_update(state, sp, None, "recall_skipped")
+        try:
+            q_emb = get_retriever().embed(state["question"], timeout)
+        except api_timeout_error():
+            return _recall_update(state, sp, None, "recall_timeout")
+        return _recall_update(state, sp, q_emb)
+
+
+async def _arecall_node(state: WorkflowState) -> dict:
+    with start_span("recall", parent=_trace_parent()) as sp:
+        timeout = _call_timeout(_deadline(), "SEARCH_TIMEOUT_S", 20.0)
+        if _out_of_time(timeout):
+            return _recall_update(state, sp, None, "recall_skipped")
+        try:
+            q_emb = await get_retriever().aembed(state["question"], timeout)
+        except api_timeout_error():
+            return _recall_update(state, sp, None, "recall_timeout")
+        # Chroma lookups for the re-ranking are local but blocking
+        return await asyncio.to_thread(_recall_update, state, sp, q_emb)
+
+
+def _search_update(sp: Span, query: str, hits: list, degraded: str | None = None) -> dict:
+    # All three fields have reducers, so parallel branches merge instead of overwriting
+    distances = [h.get("distance") for h in hits if h.get("distance") is not None]
+    attrs = {"degraded": [degraded]} if degraded else {}
+    entry = sp.trace_entry(
+        "search",
+        "timeout" if degraded else "ok",
+        query=query,
+        hits=len(hits),
+        best_distance=min(distances) if distances else None,
+        **attrs,
+    )
+    return {"search_hits": hits, "degraded": [degraded] if degraded else [], "trace": [entry]}
+
+
+def _search_node(task: dict) -> dict:
+    with start_span("search", parent=_trace_parent()) as sp:
+        timeout = _call_timeout(_deadline(), "SEARCH_TIMEOUT_S", 20.0)
+        if _out_of_time(timeout):
+            return _search_update(sp, task["query"], [], "search_skipped")
+        try:
+            hits = search_query(task["query"], k=task["k"], timeout=timeout, embedding=task.get("embedding"))
+        except api_timeout_error():
+            return _search_update(sp, task["query"], [], "search_timeout")
+    return _search_update(sp, task["query"], hits)
+
+
+async def _asearch_node(task: dict) -> dict:
+    with start_span("search", parent=_trace_parent()) as sp:
+        timeout = _call_timeout(_deadline(), "SEARCH_TIMEOUT_S", 20.0)
+        if _out_of_time(timeout):
+            return _search_update(sp, task["query"], [], "search_skipped")
+        try:
+            hits = await asearch_query(task["query"], k=task["k"], timeout=timeout, embedding=task.get("embedding"))
+        except api_timeout_error():
+            return _search_update(sp, task["query"], [], "search_timeout")
+    return _search_update(sp, task["query"], hits)
 
 
 def _research_node(state: WorkflowState) -> dict:
-    t0 = time.perf_counter()
-    evidence = retrieve_evidence(state["question"], k=state["k"])
-    evidence_pack = format_evidence(evidence)
-    ms = int((time.perf_counter() - t0) * 1000)
+    """Fan-in: the search_hits reducer already merged/deduped all branches."""
+    with start_span("research", parent=_trace_parent()) as sp:
+        hits = state.get("search_hits") or []
+        evidence = hits[: state["k"]]
+        evidence_pack = format_evidence(evidence)
+
+        # No hits because searches timed out is not "not in the sources" (fan-in runs once per attempt)
+        missed = None
+        if not hits and any(d in ("search_skipped", "search_timeout") for d in state.get("degraded") or []):
+            missed = _miss_issue(
+                "retrieval finished", "SEARCH_TIMEOUT_S", 20.0, _call_timeout(_deadline(), "SEARCH_TIMEOUT_S", 20.0)
+            )
+
+        # Remember this turn's candidates for follow-ups in the same session
+        if state.get("session_id") and state.get("query_embedding") and hits:
+            get_session(state["session_id"]).add(
+                state["question"],
+                state["query_embedding"],
+                hits[: max(2 * state["k"], 12)],
+                get_retriever().version(),
+            )
 
     cites = []
     for ev in evidence or []:
@@ -118,129 +523,407 @@ def _research_node(state: WorkflowState) -> dict:
         if c:
             cites.append(c)
 
-    trace = _trace_append(
-        state,
-        {"agent": "research", "status": "ok", "ms": ms, "k": state["k"], "sources": cites},
-    )
-    return {"evidence": evidence, "evidence_pack": evidence_pack, "trace": trace}
+    entry = sp.trace_entry("research", "ok", k=state["k"], candidates=len(hits), sources=cites)
+    return {"evidence": evidence, "evidence_pack": evidence_pack, "missed": missed, "trace": [entry]}
 
 
 def _no_evidence_node(state: WorkflowState) -> dict:
-    t0 = time.perf_counter()
-    ms = int((time.perf_counter() - t0) * 1000)
+    with start_span("writer", parent=_trace_parent()) as sp:
+        answer = NOT_FOUND_EXACT
+        verdict = {"status": "PASS", "issues": [], "fix_instructions": ""}
+        if state.get("missed"):
+            verdict = {"status": "FAIL", "issues": [state["missed"]], "fix_instructions": ""}
+
+    return {"answer": answer, "verdict": verdict, "trace": [sp.trace_entry("writer", "not_found")]}
+
+
+def _write_update(
+    state: WorkflowState,
+    sp: Span,
+    draft: str,
+    meta: dict,
+    degraded: str | None = None,
+    missed: str | None = None,
+) -> dict:
+    draft = _apply_company_name(draft, state["company_name"])
+
+    attrs = {"degraded": [degraded]} if degraded else {}
+    entry = sp.trace_entry(
+        "writer",
+        "timeout" if degraded else "ok",
+        model=meta.get("model"),
+        tier=meta.get("tier"),
+        prompt_tokens=meta.get("prompt_tokens"),
+        completion_tokens=meta.get("completion_tokens"),
+        total_tokens=meta.get("total_tokens"),
+        **attrs,
+    )
+    return {
+        "draft": draft,
+        "answer": draft,
+        "missed": missed,
+        "degraded": [degraded] if degraded else [],
+        "trace": [entry],
+    }
+
 
-    trace = _trace_append(state, {"agent": "writer", "status": "not_found", "ms": ms})
-    answer = NOT_FOUND_EXACT
-    verdict = {"status": "PASS", "issues": [], "fix_instructions": ""}
+_NO_CALL_META = {"model": None, "tier": None, "prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
 
-    return {"answer": answer, "verdict": verdict, "trace": trace}
+
+def _token_sink() -> Callable[[str], None] | None:
+    """Writer token callback when the caller streams tokens (stream_question(tokens=True)), else None."""
+    if not _run_ctx().get("stream_tokens"):
+        return None
+    from langgraph.config import get_stream_writer
+
+    emit = get_stream_writer()
+    return lambda text: emit({"node": "write", "text": text})
 
 
 def _write_node(state: WorkflowState) -> dict:
-    t0 = time.perf_counter()
+    with start_span("writer", parent=_trace_parent()) as sp:
+        timeout = _call_timeout(_deadline(), "WRITER_TIMEOUT_S", 60.0)
+        missed = _miss_issue("an answer was written", "WRITER_TIMEOUT_S", 60.0, timeout)
+        if _out_of_time(timeout):
+            return _write_update(state, sp, NOT_FOUND_EXACT, _NO_CALL_META, "writer_skipped", missed)
+        try:
+            draft, meta = write_answer(
+                state["question"],
+                state.get("evidence_pack", ""),
+                return_meta=True,
+                stage="write",
+                timeout=timeout,
+                on_token=_token_sink(),
+            )
+        except api_timeout_error():
+            return _write_update(state, sp, NOT_FOUND_EXACT, _NO_CALL_META, "writer_timeout", missed)
+    return _write_update(state, sp, draft, meta)
+
+
+async def _awrite_node(state: WorkflowState) -> dict:
+    with start_span("writer", parent=_trace_parent()) as sp:
+        timeout = _call_timeout(_deadline(), "WRITER_TIMEOUT_S", 60.0)
+        missed = _miss_issue("an answer was written", "WRITER_TIMEOUT_S", 60.0, timeout)
+        if _out_of_time(timeout):
+            return _write_update(state, sp, NOT_FOUND_EXACT, _NO_CALL_META, "writer_skipped", missed)
+        try:
+            draft, meta = await awrite_answer(
+                state["question"], state.get("evidence_pack", ""), return_meta=True, stage="write", timeout=timeout
+            )
+        except api_timeout_error():
+            return _write_update(state, sp, NOT_FOUND_EXACT, _NO_CALL_META, "writer_timeout", missed)
+    return _write_update(state, sp, draft, meta)
+
+
+def _repair_node(state: WorkflowState) -> dict:
+    """
+    Deterministic citation repair between write/revise and verify.
+    Formatting slips (parentheses, merged brackets, shortened doc names, mangled
+    chunk ids) are fixed here, so only drafts that are still broken go to revise.
+    """
+    with start_span("repair", parent=_trace_parent()) as sp:
+        draft = state.get("draft", "") or ""
 
-    draft, meta = write_answer(state["question"], state.get("evidence_pack", ""), return_meta=True)
+        # ✅ Normalize ( ... ) / [[ ... ]] citations -> [ ... ] BEFORE repairing
+        draft = _normalize_citations(draft)
 
-    ms = int((time.perf_counter() - t0) * 1000)
-    draft = _apply_company_name(draft, state["company_name"])
+        # ✅ Split merged brackets + map every cited fragment to the closest exact evidence citation
+        draft, repaired, unrepaired = _repair_citations(parse_answer(draft), state.get("evidence", []) or [])
 
-    # ✅ Normalize ( ... ) citations -> [ ... ] BEFORE fixing chunk-only citations
-    draft = _normalize_citations(draft)
-
-    # ✅ Fix chunk-only citations using evidence mapping
-    draft = _fix_answer_citations(draft, state.get("evidence", []) or [])
-
-    trace = _trace_append(
-        state,
-        {
-            "agent": "writer",
-            "status": "ok",
-            "ms": ms,
-            "model": meta.get("model"),
-            "prompt_tokens": meta.get("prompt_tokens"),
-            "completion_tokens": meta.get("completion_tokens"),
-            "total_tokens": meta.get("total_tokens"),
-        },
-    )
-    return {"draft": draft, "answer": draft, "trace": trace}
+        # Parse the final draft once; verifier/reviser/deliverer reuse it from state
+        parsed = parse_answer(draft)
 
+    status = "unrepaired" if unrepaired else ("repaired" if repaired else "ok")
+    entry = sp.trace_entry("repair", status, repaired=repaired, unrepaired=unrepaired)
+    return {
+        "draft": draft,
+        "answer": draft,
+        "repair_count": state.get("repair_count", 0) + repaired,
+        "parsed_answer": parsed,
+        "trace": [entry],
+    }
 
-def _verify_node(state: WorkflowState) -> dict:
-    t0 = time.perf_counter()
 
-    # ✅ Verify the normalized/fixed draft
-    draft = state.get("draft", "") or state.get("answer", "")
+def _verify_node(state: WorkflowState) -> dict:
+    with start_span("verifier", parent=_trace_parent()) as sp:
+        # ✅ Verify the normalized/fixed draft
+        draft = state.get("draft", "") or state.get("answer", "")
+
+        if state.get("missed"):
+            # The NOT_FOUND placeholder would pass; the sources were never actually consulted
+            verdict = {"status": "FAIL", "issues": [state["missed"]], "fix_instructions": ""}
+        else:
+            verdict = verify_answer(
+                state["question"],
+                state.get("evidence_pack", ""),
+                draft,
+                evidence_list=state.get("evidence", []) or [],
+                parsed=_parsed_draft(state),
+            )
+
+        # Short on time: deliver the FAIL verdict instead of paying for a revision
+        degraded = []
+        status = str((verdict or {}).get("status", "UNKNOWN")).upper()
+        if status == "FAIL" and state.get("revision_count", 0) < 1:
+            left = _time_left(_deadline())
+            if left is not None and left < _env_float("DEADLINE_MIN_REVISE_S", 8.0):
+                degraded.append("skip_revise")
+
+    attrs = {}
+    if (verdict or {}).get("grounding"):
+        attrs["grounding"] = verdict["grounding"]
+    if degraded:
+        attrs["degraded"] = degraded
+    return {"verdict": verdict, "degraded": degraded, "trace": [sp.trace_entry("verifier", status, **attrs)]}
+
+
+def _parsed_draft(state: WorkflowState) -> ParsedAnswer:
+    """The draft as tokenized by the repair node (parsed once, reused downstream)."""
+    draft = state.get("draft", "") or state.get("answer", "") or ""
+    parsed = state.get("parsed_answer")
+    if parsed is None or parsed.text != draft:
+        parsed = parse_answer(draft)
+    return parsed
+
+
+def _splice_paragraphs(parsed: ParsedAnswer, replacements: dict[int, str]) -> str:
+    """
+    Replace paragraphs by index (same indexing as the verifier's paragraph_issues).
+    An empty replacement drops the paragraph.
+    """
+    out = []
+    pos = 0
+    for p in parsed.paragraphs:
+        if p.index in replacements:
+            out.append(parsed.text[pos:p.start])
+            out.append(replacements[p.index])
+            pos = p.end
+    out.append(parsed.text[pos:])
+    return re.sub(r"\n\s*\n(\s*\n)+", "\n\n", "".join(out)).strip()
+
+
+def _evidence_for_paragraph(paragraph: Paragraph, evidence: list[dict], limit: int = 2) -> list[dict]:
+    """
+    Pick just the excerpts a failing paragraph needs: chunks it already cites
+    correctly, then the best word-overlap matches, up to `limit` chunks.
+    """
+    words = {w for w in re.findall(r"[a-z0-9]+", paragraph.text.lower()) if len(w) > 3}
+    cited_ids = set(paragraph.chunk_ids())
 
-    verdict = verify_answer(
-        state["question"],
-        state.get("evidence_pack", ""),
-        draft,
-        evidence_list=state.get("evidence", []) or [],
+    cited = []
+    scored = []
+    for ev in evidence or []:
+        chunk_id = str((ev.get("metadata", {}) or {}).get("chunk_id", ""))
+        if chunk_id and chunk_id in cited_ids:
+            cited.append(ev)
+            continue
+        ev_words = set(re.findall(r"[a-z0-9]+", (ev.get("text", "") or "").lower()))
+        scored.append((len(words & ev_words), ev))
+
+    scored.sort(key=lambda x: -x[0])
+    picked = cited[:limit]
+    picked += [ev for score, ev in scored if score > 0][: max(0, limit - len(picked))]
+    return picked or (evidence or [])[:limit]
+
+
+def _paragraph_jobs(state: WorkflowState, issues: list[dict]) -> list[tuple[int, str, str, str]]:
+    """(index, paragraph text, small evidence pack, feedback) per failing paragraph."""
+    paragraphs = _parsed_draft(state).paragraphs
+    evidence = state.get("evidence", []) or []
+
+    by_paragraph: dict[int, list[str]] = {}
+    for issue in issues:
+        by_paragraph.setdefault(int(issue["paragraph"]), []).append(issue.get("message", ""))
+
+    jobs = []
+    for idx, messages in sorted(by_paragraph.items()):
+        if idx >= len(paragraphs):
+            continue
+        pack = format_evidence(_evidence_for_paragraph(paragraphs[idx], evidence))
+        jobs.append((idx, paragraphs[idx].text, pack, "\n".join(messages)))
+    return jobs
+
+
+def _splice_revisions(state: WorkflowState, outputs: list[tuple[int, str, dict]]) -> tuple[str, dict, list[int]]:
+    """Splice re-generated paragraphs back into the draft; sums token usage."""
+    meta = {"model": None, "tier": None, "prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+    replacements: dict[int, str] = {}
+    for idx, text, m in outputs:
+        text = _apply_company_name(text, state["company_name"])
+        replacements[idx] = "" if text.strip().startswith("Not found in") else text.strip()
+
+        meta["model"], meta["tier"] = m.get("model"), m.get("tier")
+        for key in ("prompt_tokens", "completion_tokens", "total_tokens"):
+            meta[key] += m.get(key) or 0
+
+    revised = _splice_paragraphs(_parsed_draft(state), replacements)
+    return (revised or NOT_FOUND_EXACT), meta, sorted(replacements)
+
+
+def _revise_paragraphs(state: WorkflowState, issues: list[dict], timeout: float) -> tuple[str, dict, list[int]]:
+    """
+    Re-generate only the failing paragraphs, each with its own small evidence
+    pack, and splice them back into the draft. Returns (answer, meta, indexes).
+    """
+    outputs = []
+    for idx, paragraph, pack, feedback in _paragraph_jobs(state, issues):
+        # Sequential calls share the budget: paragraphs left when it runs out stay as they were
+        t = _call_timeout(_deadline(), "WRITER_TIMEOUT_S", 60.0)
+        t = t if t is None or timeout is None else min(timeout, t)
+        if _out_of_time(t):
+            break
+        text, m = revise_paragraph(state["question"], paragraph, pack, feedback, return_meta=True, stage="revise", timeout=t)
+        outputs.append((idx, text, m))
+    return _splice_revisions(state, outputs)
+
+
+async def _arevise_paragraphs(state: WorkflowState, issues: list[dict], timeout: float) -> tuple[str, dict, list[int]]:
+    """Async _revise_paragraphs: failing paragraphs are re-generated concurrently."""
+    jobs = _paragraph_jobs(state, issues)
+    results = await asyncio.gather(
+        *(arevise_paragraph(state["question"], paragraph, pack, feedback, return_meta=True, stage="revise",
+                            timeout=timeout)
+          for _, paragraph, pack, feedback in jobs)
     )
-
-    ms = int((time.perf_counter() - t0) * 1000)
-    status = str((verdict or {}).get("status", "UNKNOWN")).upper()
-    trace = _trace_append(state, {"agent": "verifier", "status": status, "ms": ms})
-    return {"verdict": verdict, "trace": trace}
+    outputs = [(job[0], text, m) for job, (text, m) in zip(jobs, results)]
+    return _splice_revisions(state, outputs)
 
 
-def _revise_node(state: WorkflowState) -> dict:
-    t0 = time.perf_counter()
-    feedback = (state.get("verdict") or {}).get(
+def _revise_plan(state: WorkflowState) -> tuple[str, list[dict], str]:
+    """
+    (mode, issues, feedback). Targeted "paragraphs" mode when only some paragraphs
+    fail; "full" regeneration otherwise.
+    """
+    verdict = state.get("verdict") or {}
+    feedback = verdict.get(
         "fix_instructions",
         "Revise to be fully supported by evidence, or return NOT_FOUND.",
     )
 
-    revised, meta = write_answer(
-        state["question"],
-        state.get("evidence_pack", "") + "\n\nVERIFIER FEEDBACK:\n" + feedback,
-        return_meta=True,
-    )
-
-    revised = _apply_company_name(revised, state["company_name"])
-
-    # ✅ Normalize ( ... ) citations -> [ ... ] BEFORE fixing chunk-only citations
-    revised = _normalize_citations(revised)
-
-    # ✅ Fix chunk-only citations using evidence mapping
-    revised = _fix_answer_citations(revised, state.get("evidence", []) or [])
-
-    ms = int((time.perf_counter() - t0) * 1000)
-    trace = _trace_append(
-        state,
-        {
-            "agent": "writer",
-            "status": "revised_once",
-            "ms": ms,
-            "model": meta.get("model"),
-            "prompt_tokens": meta.get("prompt_tokens"),
-            "completion_tokens": meta.get("completion_tokens"),
-            "total_tokens": meta.get("total_tokens"),
-        },
+    issues = verdict.get("paragraph_issues") or []
+    n_paragraphs = len(_parsed_draft(state).paragraphs)
+    failing = {int(i["paragraph"]) for i in issues}
+
+    mode = "paragraphs" if issues and len(failing) < n_paragraphs else "full"
+    return mode, issues, feedback
+
+
+def _revise_update(
+    state: WorkflowState,
+    sp: Span,
+    revised: str,
+    meta: dict,
+    mode: str,
+    fixed: list[int],
+    degraded: str | None = None,
+) -> dict:
+    attrs = {"degraded": [degraded]} if degraded else {}
+    entry = sp.trace_entry(
+        "writer",
+        "timeout" if degraded else "revised_once",
+        mode=mode,
+        paragraphs=fixed,
+        model=meta.get("model"),
+        tier=meta.get("tier"),
+        prompt_tokens=meta.get("prompt_tokens"),
+        completion_tokens=meta.get("completion_tokens"),
+        total_tokens=meta.get("total_tokens"),
+        **attrs,
     )
 
-    return {
+    update = {
         "revision_count": state["revision_count"] + 1,
         "draft": revised,
         "answer": revised,
-        "trace": trace,
+        "degraded": [degraded] if degraded else [],
+        "trace": [entry],
     }
+    if not degraded:
+        update["missed"] = None  # a real answer replaced the placeholder (if there was one)
+    return update
 
 
-def _deliver_node(state: WorkflowState) -> dict:
-    t0 = time.perf_counter()
+def _revise_unchanged(state: WorkflowState, sp: Span, mode: str, degraded: str) -> dict:
+    """Revision skipped / timed out: keep the current draft (its FAIL verdict gets delivered)."""
+    draft = state.get("draft", "") or state.get("answer", "")
+    return _revise_update(state, sp, draft, _NO_CALL_META, mode, [], degraded)
+
 
-    deliverable = build_deliverable(
+def _revise_node(state: WorkflowState) -> dict:
+    with start_span("writer", parent=_trace_parent()) as sp:
+        mode, issues, feedback = _revise_plan(state)
+        timeout = _call_timeout(_deadline(), "WRITER_TIMEOUT_S", 60.0)
+        if _out_of_time(timeout):
+            return _revise_unchanged(state, sp, mode, "revise_skipped")
+
+        try:
+            if mode == "paragraphs":
+                revised, meta, fixed = _revise_paragraphs(state, issues, timeout)
+            else:
+                fixed = []
+                revised, meta = write_answer(
+                    state["question"],
+                    state.get("evidence_pack", "") + "\n\nVERIFIER FEEDBACK:\n" + feedback,
+                    return_meta=True,
+                    stage="revise",
+                    timeout=timeout,
+                )
+                revised = _apply_company_name(revised, state["company_name"])
+        except api_timeout_error():
+            return _revise_unchanged(state, sp, mode, "revise_timeout")
+
+    return _revise_update(state, sp, revised, meta, mode, fixed)
+
+
+async def _arevise_node(state: WorkflowState) -> dict:
+    with start_span("writer", parent=_trace_parent()) as sp:
+        mode, issues, feedback = _revise_plan(state)
+        timeout = _call_timeout(_deadline(), "WRITER_TIMEOUT_S", 60.0)
+        if _out_of_time(timeout):
+            return _revise_unchanged(state, sp, mode, "revise_skipped")
+
+        try:
+            if mode == "paragraphs":
+                revised, meta, fixed = await _arevise_paragraphs(state, issues, timeout)
+            else:
+                fixed = []
+                revised, meta = await awrite_answer(
+                    state["question"],
+                    state.get("evidence_pack", "") + "\n\nVERIFIER FEEDBACK:\n" + feedback,
+                    return_meta=True,
+                    stage="revise",
+                    timeout=timeout,
+                )
+                revised = _apply_company_name(revised, state["company_name"])
+        except api_timeout_error():
+            return _revise_unchanged(state, sp, mode, "revise_timeout")
+
+    return _revise_update(state, sp, revised, meta, mode, fixed)
+
+
+def _deliverable(state: WorkflowState) -> dict:
+    return build_deliverable(
         question=state["question"],
         answer=state.get("answer", NOT_FOUND_EXACT),
         evidence=state.get("evidence", []) or [],
         verdict=state.get("verdict", {}) or {},
         company_name=state["company_name"],
+        parsed=state.get("parsed_answer"),
     )
 
-    ms = int((time.perf_counter() - t0) * 1000)
-    trace = _trace_append(state, {"agent": "deliverer", "status": "ok", "ms": ms})
-    return {"deliverable": deliverable, "trace": trace}
+
+def _deliver_node(state: WorkflowState) -> dict:
+    with start_span("deliverer", parent=_trace_parent()) as sp:
+        deliverable = _deliverable(state)
+
+    entry = sp.trace_entry(
+        "deliverer",
+        "ok",
+        repairs=state.get("repair_count", 0),
+        revisions=state.get("revision_count", 0),
+        degraded=list(state.get("degraded") or []),
+    )
+    return {"deliverable": deliverable, "trace": [entry]}
 
 
 def _route_after_research(state: WorkflowState) -> str:
@@ -252,24 +935,39 @@ def _route_after_verify(state: WorkflowState) -> str:
     verdict = state.get("verdict") or {}
     status = str(verdict.get("status", "")).upper()
 
-    if status == "FAIL" and state.get("revision_count", 0) < 1:
+    if status == "FAIL" and state.get("revision_count", 0) < 1 and "skip_revise" not in (state.get("degraded") or []):
         return "revise"
     return "deliver"
 
 
-def _build_graph():
+def _build_graph(asynchronous: bool = False, checkpointer: Any = None):
+    """
+    asynchronous=True swaps the I/O-bound nodes (recall, search, write, revise) for their
+    async versions; the graph must then be run with ainvoke/astream.
+    CPU-only nodes (plan, research merge, repair, verify, deliver) are shared by both graphs.
+    """
+    from langgraph.graph import StateGraph, START, END
+
     g = StateGraph(WorkflowState)
 
     g.add_node("plan", _plan_node)
+    g.add_node("recall", _arecall_node if asynchronous else _recall_node)
+    g.add_node("search", _asearch_node if asynchronous else _search_node)
     g.add_node("research", _research_node)
     g.add_node("no_evidence", _no_evidence_node)
-    g.add_node("write", _write_node)
+    g.add_node("write", _awrite_node if asynchronous else _write_node)
+    g.add_node("repair", _repair_node)
     g.add_node("verify", _verify_node)
-    g.add_node("revise", _revise_node)
+    g.add_node("revise", _arevise_node if asynchronous else _revise_node)
     g.add_node("deliver", _deliver_node)
 
     g.add_edge(START, "plan")
-    g.add_edge("plan", "research")
+
+    # Research fan-out: plan -> N parallel "search" branches -> "research" (merge).
+    # With a session_id: plan -> recall -> (cold: same fan-out | delta: one search | reuse: research)
+    g.add_conditional_edges("plan", _fan_out_research, ["search", "recall"])
+    g.add_conditional_edges("recall", _fan_out_research, ["search", "research"])
+    g.add_edge("search", "research")
 
     g.add_conditional_edges("research", _route_after_research, {
         "no_evidence": "no_evidence",
@@ -277,38 +975,488 @@ def _build_graph():
     })
 
     g.add_edge("no_evidence", "deliver")
-    g.add_edge("write", "verify")
+    g.add_edge("write", "repair")
+    g.add_edge("repair", "verify")
 
     g.add_conditional_edges("verify", _route_after_verify, {
         "revise": "revise",
         "deliver": "deliver",
     })
 
-    g.add_edge("revise", "verify")
+    g.add_edge("revise", "repair")
     g.add_edge("deliver", END)
 
-    return g.compile()
+    return g.compile(checkpointer=checkpointer)
 
 
-_GRAPH = _build_graph()
+# ----------------------------- checkpoints -----------------------------
+# WORKFLOW_CHECKPOINTS=1 persists the state after every node (SQLite, CHECKPOINT_DB),
+# keyed by a thread id per request: a run that failed mid-way resumes from the last
+# completed node, and a retry of a finished PASS run reuses it instead of redoing the work.
+# Threads unused for CHECKPOINT_TTL_S, or beyond CHECKPOINT_MAX_THREADS, are deleted.
 
+_CHECKPOINTER: Any = None
+_CHECKPOINTER_LOCK = threading.Lock()
+_LAST_PRUNE = {"at": 0.0}
+# One run per checkpoint thread: a concurrent request for the same thread waits, then
+# reuses (or re-runs) the finished one instead of resuming a run that is still executing
+_THREAD_RUNS = KeyedLock()
 
-def answer_question(question: str, k: int = 6, company_name: str = "Your Company") -> dict:
-    final_state = _GRAPH.invoke(
-        {
-            "question": question,
-            "k": k,
-            "revision_count": 0,
-            "company_name": company_name,
-            "trace": [],
-        }
-    )
 
+def _checkpoints_enabled() -> bool:
+    return os.getenv("WORKFLOW_CHECKPOINTS", "0").strip().lower() in ("1", "true", "yes", "on")
+
+
+def get_checkpointer():
+    """Process-wide SqliteSaver (one connection, internally locked); None when checkpoints are off."""
+    global _CHECKPOINTER
+    if not _checkpoints_enabled():
+        return None
+    if _CHECKPOINTER is None:
+        with _CHECKPOINTER_LOCK:
+            if _CHECKPOINTER is None:
+                import sqlite3
+
+                from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+                from langgraph.checkpoint.sqlite import SqliteSaver
+
+                path = Path(os.getenv("CHECKPOINT_DB", "storage/checkpoints.sqlite"))
+                path.parent.mkdir(parents=True, exist_ok=True)
+                # parsed_answer is checkpointed too: allow our citation dataclasses back in
+                serde = JsonPlusSerializer(
+                    allowed_msgpack_modules=[
+                        ("retrieval.citations", name)
+                        for name in ("Citation", "CitationGroup", "Paragraph", "ParsedAnswer")
+                    ]
+                )
+                _CHECKPOINTER = SqliteSaver(sqlite3.connect(str(path), check_same_thread=False), serde=serde)
+    return _CHECKPOINTER
+
+
+_GRAPHS: dict[tuple[bool, bool], Any] = {}
+_GRAPHS_LOCK = threading.Lock()
+
+
+def get_graph(asynchronous: bool = False):
+    """
+    Compiled workflow graph, built on first use and cached per process (sync and async variants).
+    The sync graph is compiled with the checkpointer when checkpoints are on; the async
+    graph never is (SqliteSaver is sync-only).
+    """
+    checkpointer = None if asynchronous else get_checkpointer()
+    key = (asynchronous, checkpointer is not None)
+    graph = _GRAPHS.get(key)
+    if graph is None:
+        with _GRAPHS_LOCK:
+            graph = _GRAPHS.get(key)
+            if graph is None:
+                graph = _GRAPHS[key] = _build_graph(asynchronous, checkpointer)
+    return graph
+
+
+def _touch_thread(saver: Any, thread_id: str) -> None:
+    """
+    Checkpoint retention: records that thread_id is used now and, at most every
+    CHECKPOINT_PRUNE_EVERY_S (60 s), deletes the threads unused for CHECKPOINT_TTL_S
+    (7 days) and the least recently used ones beyond CHECKPOINT_MAX_THREADS (10000).
+    A limit <= 0 is off. Threads from before the usage table existed count as expired.
+    """
+    now = time.time()
+    ttl_s = _env_float("CHECKPOINT_TTL_S", 7 * 86400.0)
+    max_threads = int(_env_float("CHECKPOINT_MAX_THREADS", 10000))
+    with saver.cursor() as cur:
+        cur.execute("CREATE TABLE IF NOT EXISTS thread_usage (thread_id TEXT PRIMARY KEY, used_at REAL NOT NULL)")
+        cur.execute("INSERT OR REPLACE INTO thread_usage (thread_id, used_at) VALUES (?, ?)", (thread_id, now))
+        if now - _LAST_PRUNE["at"] < _env_float("CHECKPOINT_PRUNE_EVERY_S", 60.0):
+            return
+        _LAST_PRUNE["at"] = now
+
+        if ttl_s > 0:
+            cur.execute("DELETE FROM thread_usage WHERE used_at < ?", (now - ttl_s,))
+        if max_threads > 0:
+            cur.execute(
+                "DELETE FROM thread_usage WHERE thread_id NOT IN "
+                "(SELECT thread_id FROM thread_usage ORDER BY used_at DESC LIMIT ?)",
+                (max_threads,),
+            )
+        for table in ("checkpoints", "writes"):
+            cur.execute(f"DELETE FROM {table} WHERE thread_id NOT IN (SELECT thread_id FROM thread_usage)")
+
+
+def _initial_state(question: str, k: int, company_name: str, session_id: str | None = None) -> WorkflowState:
+    return {
+        "question": question,
+        "k": k,
+        "revision_count": 0,
+        "repair_count": 0,
+        "company_name": company_name,
+        "session_id": session_id,
+        "trace": [],
+        "degraded": [],
+    }
+
+
+def _run_config(root: Span, deadline_s: float | None) -> dict:
+    # Per-attempt values: read by the nodes through _run_ctx(), never checkpointed as state
+    return {"configurable": {"deadline": _deadline_at(deadline_s), "trace_ctx": root.context()}}
+
+
+def request_thread_id(question: str, k: int, company_name: str, session_id: str | None = None) -> str:
+    """Checkpoint thread of a request: a retry of the same question (same k, company, session, index) maps to it."""
+    return hashlib.sha1(repr(_flight_key(question, k, company_name, session_id)).encode("utf-8")).hexdigest()[:24]
+
+
+def _run_thread(
+    question: str, k: int, company_name: str, session_id: str | None = None, thread_id: str | None = None
+) -> str | None:
+    """Checkpoint thread id of a request (None when checkpoints are off)."""
+    if get_checkpointer() is None:
+        return None
+    return thread_id or request_thread_id(question, k, company_name, session_id)
+
+
+@contextmanager
+def _hold_thread(thread_id: str | None) -> Iterator[None]:
+    """Exclusive use of a checkpoint thread for one attempt (prepare + run); no-op without one."""
+    if thread_id is None:
+        yield
+        return
+    with _THREAD_RUNS.hold(thread_id):
+        yield
+
+
+def _prepare_run(
+    question: str,
+    k: int,
+    company_name: str,
+    deadline_s: float | None,
+    root: Span,
+    thread_id: str | None = None,
+    session_id: str | None = None,
+) -> tuple[Any, dict | None, dict, dict | None]:
+    """
+    (graph, input, config, finished_state) for one attempt of the sync graph.
+    Called under _hold_thread: the thread is not running in another request.
+    - no checkpoints: fresh run
+    - thread has pending nodes (earlier attempt failed): input None = resume from the last completed node
+    - thread finished with a clean PASS: finished_state is returned (deliverable rebuilt, so
+      its due dates count from today), nothing to run
+    - thread finished with a FAIL verdict or degraded (deadline): cleared and run fresh
+    """
+    graph = get_graph()
+    config = _run_config(root, deadline_s)
+    saver = get_checkpointer()
+    if saver is None:
+        return graph, _initial_state(question, k, company_name, session_id), config, None
+
+    tid = thread_id or request_thread_id(question, k, company_name, session_id)
+    config["configurable"]["thread_id"] = tid
+    root.set(thread_id=tid)
+    _touch_thread(saver, tid)
+
+    snapshot = graph.get_state(config)
+    if snapshot.next:
+        root.set(resumed_at=list(snapshot.next))
+        return graph, None, config, None
+    if snapshot.values:
+        status = str((snapshot.values.get("verdict") or {}).get("status", "")).upper()
+        if status == "PASS" and not snapshot.values.get("degraded"):
+            root.set(reused=True)
+            return graph, None, config, {**snapshot.values, "deliverable": _deliverable(snapshot.values)}
+        saver.delete_thread(tid)
+    return graph, _initial_state(question, k, company_name, session_id), config, None
+
+
+def _result_from_state(final_state: dict) -> dict:
     return {
         "plan": final_state.get("plan"),
         "evidence": final_state.get("evidence", []),
         "answer": final_state.get("answer", NOT_FOUND_EXACT),
+        "parsed_answer": final_state.get("parsed_answer"),
         "verdict": final_state.get("verdict", {"status": "FAIL", "issues": ["No verdict returned"]}),
         "deliverable": final_state.get("deliverable", {}),
         "trace": final_state.get("trace", []),
+        "degradations": final_state.get("degraded", []),
+    }
+
+
+def _finish_request(root: Span, final_state: dict) -> dict:
+    result = _result_from_state(final_state)
+    root.set(
+        status=str((result["verdict"] or {}).get("status", "UNKNOWN")).upper(),
+        total_tokens=sum(int(t.get("total_tokens") or 0) for t in result["trace"]),
+        degraded=result["degradations"],
+    )
+    root.end()
+    export_trace(root, result["trace"])
+    return result
+
+
+def remember_turn(session_id: str, question: str, embedding: list[float], result: dict) -> None:
+    """
+    Records an answer that did not run the graph (precomputed FAQ answer, UI answer cache)
+    as a turn of the conversation: follow-ups reuse its evidence like any other turn.
+    """
+    get_session(session_id).add(question, embedding, result.get("evidence") or [], get_retriever().version())
+
+
+def _precomputed(
+    question: str, k: int, company_name: str, session_id: str | None, deadline_s: float | None = None
+) -> dict | None:
+    """
+    Answer stored by the FAQ warm-up (agents/faq.py) for this question and collection version.
+    The session turn needs the question embedding; it is bounded like a search call and
+    skipped (answer still served) when it does not fit the deadline.
+    """
+    retriever = get_retriever()
+    result = precomputed_answer(question, k, company_name, retriever.version())
+    if result is not None and session_id:
+        timeout = _call_timeout(_deadline_at(deadline_s), "SEARCH_TIMEOUT_S", 20.0)
+        try:
+            if not _out_of_time(timeout):
+                remember_turn(session_id, question, retriever.embed(question, timeout), result)
+        except api_timeout_error():
+            pass
+    return result
+
+
+async def _aprecomputed(
+    question: str, k: int, company_name: str, session_id: str | None, deadline_s: float | None = None
+) -> dict | None:
+    """_precomputed for the event loop: the store and the alias are read off-loop."""
+    retriever = get_retriever()
+    version = await asyncio.to_thread(retriever.version)
+    result = await asyncio.to_thread(precomputed_answer, question, k, company_name, version)
+    if result is not None and session_id:
+        timeout = _call_timeout(_deadline_at(deadline_s), "SEARCH_TIMEOUT_S", 20.0)
+        try:
+            if not _out_of_time(timeout):
+                remember_turn(session_id, question, await retriever.aembed(question, timeout), result)
+        except api_timeout_error():
+            pass
+    return result
+
+
+def _run_question(
+    question: str,
+    k: int,
+    company_name: str,
+    deadline_s: float | None = None,
+    thread_id: str | None = None,
+    session_id: str | None = None,
+) -> dict:
+    stored = _precomputed(question, k, company_name, session_id, deadline_s)
+    if stored is not None:
+        return stored
+    tid = _run_thread(question, k, company_name, session_id, thread_id)
+    with _hold_thread(tid), start_span("answer_question", question=question, k=k) as root:
+        graph, inputs, config, finished = _prepare_run(question, k, company_name, deadline_s, root, tid, session_id)
+        final_state = finished if finished is not None else graph.invoke(inputs, config)
+    return _finish_request(root, final_state)
+
+
+async def _arun_question(
+    question: str,
+    k: int,
+    company_name: str,
+    deadline_s: float | None = None,
+    session_id: str | None = None,
+) -> dict:
+    stored = await _aprecomputed(question, k, company_name, session_id, deadline_s)
+    if stored is not None:
+        return stored
+    with start_span("answer_question", question=question, k=k) as root:
+        final_state = await get_graph(asynchronous=True).ainvoke(
+            _initial_state(question, k, company_name, session_id), _run_config(root, deadline_s)
+        )
+    return _finish_request(root, final_state)
+
+
+def _normalize_question(question: str) -> str:
+    return " ".join((question or "").lower().split())
+
+
+# In-flight request coalescing (SINGLE_FLIGHT=0 disables)
+_FLIGHT = SingleFlight()
+_AFLIGHT = AsyncSingleFlight()
+
+
+def _single_flight_enabled() -> bool:
+    return os.getenv("SINGLE_FLIGHT", "1").strip().lower() not in ("0", "false", "no", "off")
+
+
+def _flight_key(question: str, k: int, company_name: str, session_id: str | None = None) -> tuple:
+    # Collection version: requests never join a run started against an older index.
+    # Session: a follow-up's evidence depends on its conversation, so sessions never share a run.
+    return (_normalize_question(question), k, company_name or "", session_id or "", get_retriever().version())
+
+
+def _coalesced(result: dict) -> dict:
+    return {**result, "coalesced": True}
+
+
+def answer_question(
+    question: str,
+    k: int = 6,
+    company_name: str = "Your Company",
+    deadline_s: float | None = None,
+    thread_id: str | None = None,
+    session_id: str | None = None,
+) -> dict:
+    """
+    Runs the workflow for one question.
+    - Concurrent identical requests (same normalized question, k, company name and
+      collection version) attach to the run already in progress and get its result
+      (marked "coalesced": True) instead of paying for their own LLM calls.
+    - deadline_s (default env ANSWER_DEADLINE_S, unset = none) is the latency budget
+      every node sees: low budget skips expansion queries and the revision, LLM/embedding
+      calls get bounded timeouts. result["degradations"] lists what fired.
+      A coalesced request shares the leader's run (and its deadline).
+    - With WORKFLOW_CHECKPOINTS=1 every node is checkpointed under thread_id (default:
+      request_thread_id of the question): retrying after a failure resumes where it
+      stopped, retrying a finished PASS run returns it without new LLM calls.
+    - FAQ questions precomputed by the warm-up (agents/faq.py) for the current
+      collection version return the stored answer (marked "precomputed": True).
+    - session_id (e.g. one chat conversation) turns on the session evidence cache:
+      a follow-up related to earlier turns reuses their chunks and only searches
+      for what is new (see agents/session.py). None = every question is cold.
+    """
+    if not _single_flight_enabled():
+        return _run_question(question, k, company_name, deadline_s, thread_id, session_id)
+
+    result, coalesced = _FLIGHT.do(
+        _flight_key(question, k, company_name, session_id),
+        lambda: _run_question(question, k, company_name, deadline_s, thread_id, session_id),
+    )
+    return _coalesced(result) if coalesced else result
+
+
+async def answer_question_async(
+    question: str,
+    k: int = 6,
+    company_name: str = "Your Company",
+    deadline_s: float | None = None,
+    session_id: str | None = None,
+) -> dict:
+    """
+    Async entry point for async servers: network I/O never blocks the event loop,
+    so one process can serve many in-flight questions without a thread each.
+    Identical in-flight questions are coalesced; deadline_s and session_id apply
+    like answer_question.
+    """
+    if not _single_flight_enabled():
+        return await _arun_question(question, k, company_name, deadline_s, session_id)
+
+    result, coalesced = await _AFLIGHT.do(
+        _flight_key(question, k, company_name, session_id),
+        lambda: _arun_question(question, k, company_name, deadline_s, session_id),
+    )
+    return _coalesced(result) if coalesced else result
+
+
+def stream_question(
+    question: str,
+    k: int = 6,
+    company_name: str = "Your Company",
+    deadline_s: float | None = None,
+    thread_id: str | None = None,
+    session_id: str | None = None,
+    tokens: bool = False,
+) -> Iterator[tuple[str, dict]]:
+    """
+    Streaming entry point (HTTP /answer/stream, progress UIs):
+    - yields ("node", {"node": name, "trace": [...]}) as each graph node finishes
+      (one per parallel search branch)
+    - tokens=True also yields ("token", {"node": "write", "text": delta}) while the
+      first draft is generated (the LLM call is streamed)
+    - then ("result", result) with the same shape as answer_question.
+    Not coalesced: every caller needs its own progress events. Checkpoints and
+    precomputed FAQ answers apply like answer_question (a reused finished run
+    yields only the result; with checkpoints, a concurrent stream of the same
+    question waits for the running one and then reuses it).
+    """
+    stored = _precomputed(question, k, company_name, session_id, deadline_s)
+    if stored is not None:
+        yield "result", stored
+        return
+
+    # Root span is not made "current": the consumer runs between yields, and nodes
+    # attach to it through the run config anyway
+    root = Span(name="answer_question", attributes={"question": question, "k": k})
+    tid = _run_thread(question, k, company_name, session_id, thread_id)
+    with _hold_thread(tid):
+        graph, inputs, config, finished = _prepare_run(question, k, company_name, deadline_s, root, tid, session_id)
+        if finished is not None:
+            yield "result", _finish_request(root, finished)
+            return
+
+        modes = ["updates", "values"]
+        if tokens:
+            config["configurable"]["stream_tokens"] = True
+            modes.append("custom")
+
+        final_state: dict = {}
+        for mode, chunk in graph.stream(inputs, config, stream_mode=modes):
+            if mode == "values":
+                final_state = chunk
+                continue
+            if mode == "custom":
+                yield "token", chunk
+                continue
+            for node, update in (chunk or {}).items():
+                yield "node", {"node": node, "trace": (update or {}).get("trace", [])}
+    yield "result", _finish_request(root, final_state)
+
+
+def _error_result(question: str, error: Exception) -> dict:
+    return {
+        "plan": {"goal": "Handle error", "question": question, "steps": ["Caught exception in batch runner."]},
+        "evidence": [],
+        "answer": NOT_FOUND_EXACT,
+        "parsed_answer": None,
+        "verdict": {"status": "FAIL", "issues": [str(error)], "error": str(error)},
+        "deliverable": {},
+        "trace": [],
+        "degradations": [],
     }
+
+
+def answer_questions(
+    questions: Iterable[str],
+    k: int = 6,
+    company_name: str = "Your Company",
+    max_concurrency: int = 8,
+) -> Iterator[tuple[int, dict]]:
+    """
+    Batch entry point (e.g. nightly ticket triage):
+    - Identical questions (case/whitespace-insensitive) run once and share the result.
+    - Unique questions run concurrently on a worker pool that shares one retriever
+      and one OpenAI HTTP pool.
+    - Yields (index, result) in completion order; a failing question yields an
+      error result instead of aborting the batch.
+    """
+    questions = list(questions)
+    groups: dict[str, list[int]] = {}
+    for i, q in enumerate(questions):
+        groups.setdefault(_normalize_question(q), []).append(i)
+
+    # Open the shared Chroma/OpenAI clients and compile the graph once, before workers race for them
+    get_retriever()
+    get_graph()
+
+    pool = ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(groups) or 1)))
+    try:
+        futures = {
+            pool.submit(answer_question, questions[idxs[0]], k, company_name): idxs
+            for idxs in groups.values()
+        }
+        for fut in as_completed(futures):
+            idxs = futures[fut]
+            try:
+                result = fut.result()
+            except Exception as e:
+                result = _error_result(questions[idxs[0]], e)
+            for i in idxs:
+                yield i, result
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
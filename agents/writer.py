@@ -1,70 +1,240 @@
 from __future__ import annotations
 
 import os
-from typing import Any, Dict, Tuple, Union
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Optional, Tuple, Union
 from agents.deliverer import NOT_FOUND_EXACT as NOT_FOUND
 from dotenv import load_dotenv
-from openai import OpenAI
+
+from agents.tracing import start_span
+from retrieval.clients import get_async_openai, get_openai
 
 load_dotenv()
 
 NOT_FOUND = "Not found in provided sources."
 
+# Model cascade: each stage picks a tier, each tier maps to a model.
+# Override per stage with LLM_TIER_WRITE / LLM_TIER_REVISE ("fast" or "strong")
+# and per tier with LLM_MODEL_FAST / LLM_MODEL_STRONG.
+DEFAULT_STAGE_TIERS = {
+    "write": "fast",
+    "revise": "strong",
+}
+
+
+def _tier_models() -> Dict[str, str]:
+    return {
+        "fast": os.getenv("LLM_MODEL_FAST") or os.getenv("LLM_MODEL", "gpt-4o-mini"),
+        "strong": os.getenv("LLM_MODEL_STRONG", "gpt-4o"),
+    }
+
+
+def resolve_model(stage: str = "write") -> Tuple[str, str]:
+    """
+    Returns (tier, model) for a workflow stage.
+    Unknown tiers fall back to the fast model so a typo never breaks answering.
+    """
+    tier = os.getenv(f"LLM_TIER_{stage.upper()}", DEFAULT_STAGE_TIERS.get(stage, "fast")).strip().lower()
+    models = _tier_models()
+    if tier not in models:
+        tier = "fast"
+    return tier, models[tier]
+
+
+SYSTEM_PROMPT = (
+    "You are an HR Ops copilot for Kosovo.\n"
+    "RULES (must follow):\n"
+    "1) Use ONLY the provided evidence excerpts.\n"
+    f"2) If the evidence does NOT contain the answer, reply EXACTLY: {NOT_FOUND}\n"
+    "3) Do NOT use outside knowledge.\n"
+    "4) Every paragraph MUST include at least ONE citation.\n"
+    "5) Citations MUST be copied EXACTLY from the evidence. Do NOT shorten, rename, or reformat them.\n"
+    "6) Do NOT combine multiple citations inside one bracket. Use separate brackets if needed.\n"
+    "7) Never invent citations.\n"
+)
+
+_EMPTY_META = {"model": None, "tier": None, "prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+
+
+def _messages(user: str) -> list:
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": user},
+    ]
+
+
+def _meta(resp: Any, model: str, tier: str) -> Dict[str, Any]:
+    usage = getattr(resp, "usage", None)
+    return {
+        "model": model,
+        "tier": tier,
+        "prompt_tokens": getattr(usage, "prompt_tokens", 0) if usage else 0,
+        "completion_tokens": getattr(usage, "completion_tokens", 0) if usage else 0,
+        "total_tokens": getattr(usage, "total_tokens", 0) if usage else 0,
+    }
+
+
+def _stream_text(stream: Any, on_token: Callable[[str], None]) -> Tuple[str, Any]:
+    """Consumes a streamed completion: forwards each content delta, returns (text, usage)."""
+    parts, usage = [], None
+    for chunk in stream:
+        if getattr(chunk, "usage", None):
+            usage = chunk.usage
+        for choice in getattr(chunk, "choices", None) or []:
+            piece = getattr(choice.delta, "content", None)
+            if piece:
+                parts.append(piece)
+                on_token(piece)
+    return "".join(parts), usage
+
+
+def _complete(
+    stage: str,
+    user: str,
+    timeout: Optional[float] = None,
+    on_token: Optional[Callable[[str], None]] = None,
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    One chat completion with the writer rules; returns (text, meta).
+    timeout bounds the whole call (no client retries); raises openai.APITimeoutError.
+    on_token streams the completion and receives each text delta as it arrives.
+    """
+    tier, model = resolve_model(stage)
+    client = get_openai()
+    if timeout is not None:
+        client = client.with_options(timeout=timeout, max_retries=0)
+
+    with start_span("llm.chat", stage=stage, tier=tier, model=model, streamed=on_token is not None) as sp:
+        if on_token is None:
+            resp = client.chat.completions.create(model=model, temperature=0.2, messages=_messages(user))
+            text = resp.choices[0].message.content or ""
+        else:
+            stream = client.chat.completions.create(
+                model=model,
+                temperature=0.2,
+                messages=_messages(user),
+                stream=True,
+                stream_options={"include_usage": True},
+            )
+            text, usage = _stream_text(stream, on_token)
+            resp = SimpleNamespace(usage=usage)
+        meta = _meta(resp, model, tier)
+        sp.set(**{k: meta[k] for k in ("prompt_tokens", "completion_tokens", "total_tokens")})
+
+    return text.strip(), meta
+
+
+async def _acomplete(stage: str, user: str, timeout: Optional[float] = None) -> Tuple[str, Dict[str, Any]]:
+    """Async _complete (shared AsyncOpenAI client)."""
+    tier, model = resolve_model(stage)
+    client = get_async_openai()
+    if timeout is not None:
+        client = client.with_options(timeout=timeout, max_retries=0)
+
+    with start_span("llm.chat", stage=stage, tier=tier, model=model) as sp:
+        resp = await client.chat.completions.create(model=model, temperature=0.2, messages=_messages(user))
+        meta = _meta(resp, model, tier)
+        sp.set(**{k: meta[k] for k in ("prompt_tokens", "completion_tokens", "total_tokens")})
+
+    text = (resp.choices[0].message.content or "").strip()
+    return text, meta
+
+
+def _answer_prompt(question: str, evidence_pack: str) -> str:
+    return (
+        f"QUESTION:\n{question}\n\n"
+        f"EVIDENCE (use only this):\n{evidence_pack}\n\n"
+        "Write a clear, practical answer for HR. Keep it concise but helpful.\n"
+        f"If the answer is not directly supported by the evidence, return exactly: {NOT_FOUND}"
+    )
+
+
+def _paragraph_prompt(question: str, paragraph: str, evidence_pack: str, feedback: str) -> str:
+    return (
+        f"QUESTION:\n{question}\n\n"
+        f"PARAGRAPH TO FIX:\n{paragraph}\n\n"
+        f"VERIFIER FEEDBACK:\n{feedback}\n\n"
+        f"EVIDENCE (use only this):\n{evidence_pack}\n\n"
+        "Rewrite ONLY this paragraph so every claim is supported and it carries at least one exact citation.\n"
+        "Output the rewritten paragraph only (no preamble, no other paragraphs).\n"
+        f"If the evidence does not support it, return exactly: {NOT_FOUND}"
+    )
+
 
 def write_answer(
     question: str,
     evidence_pack: str,
     return_meta: bool = False,
+    stage: str = "write",
+    timeout: Optional[float] = None,
+    on_token: Optional[Callable[[str], None]] = None,
 ) -> Union[str, Tuple[str, Dict[str, Any]]]:
     """
     Writer agent:
     - Uses an LLM to answer ONLY using the evidence pack.
     - Citations must be copied EXACTLY from evidence (including full [Doc | chunk] format).
     - If evidence doesn't contain the answer, returns NOT_FOUND exactly.
-    - If return_meta=True, also returns token usage + model for observability.
+    - stage selects the model tier from the cascade ("write" = first draft, "revise" = after FAIL).
+    - If return_meta=True, also returns token usage + model/tier for observability.
+    - timeout (seconds) bounds the LLM call; the workflow derives it from the request deadline.
+    - on_token (optional) streams the answer: called with each text delta as it arrives.
     """
     if not evidence_pack.strip():
-        return (NOT_FOUND, {"model": None, "prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}) if return_meta else NOT_FOUND
-
-    model = os.getenv("LLM_MODEL", "gpt-4o-mini")
-    client = OpenAI()
-
-    system = (
-        "You are an HR Ops copilot for Kosovo.\n"
-        "RULES (must follow):\n"
-        "1) Use ONLY the provided evidence excerpts.\n"
-        f"2) If the evidence does NOT contain the answer, reply EXACTLY: {NOT_FOUND}\n"
-        "3) Do NOT use outside knowledge.\n"
-        "4) Every paragraph MUST include at least ONE citation.\n"
-        "5) Citations MUST be copied EXACTLY from the evidence. Do NOT shorten, rename, or reformat them.\n"
-        "6) Do NOT combine multiple citations inside one bracket. Use separate brackets if needed.\n"
-        "7) Never invent citations.\n"
-    )
+        return (NOT_FOUND, dict(_EMPTY_META)) if return_meta else NOT_FOUND
 
-    user = (
-        f"QUESTION:\n{question}\n\n"
-        f"EVIDENCE (use only this):\n{evidence_pack}\n\n"
-        "Write a clear, practical answer for HR. Keep it concise but helpful.\n"
-        f"If the answer is not directly supported by the evidence, return exactly: {NOT_FOUND}"
-    )
+    text, meta = _complete(stage, _answer_prompt(question, evidence_pack), timeout, on_token)
+    return (text, meta) if return_meta else text
 
-    resp = client.chat.completions.create(
-        model=model,
-        temperature=0.2,
-        messages=[
-            {"role": "system", "content": system},
-            {"role": "user", "content": user},
-        ],
-    )
 
-    text = (resp.choices[0].message.content or "").strip()
+async def awrite_answer(
+    question: str,
+    evidence_pack: str,
+    return_meta: bool = False,
+    stage: str = "write",
+    timeout: Optional[float] = None,
+) -> Union[str, Tuple[str, Dict[str, Any]]]:
+    """Async write_answer (same rules, non-blocking network I/O)."""
+    if not evidence_pack.strip():
+        return (NOT_FOUND, dict(_EMPTY_META)) if return_meta else NOT_FOUND
 
-    usage = getattr(resp, "usage", None)
-    meta = {
-        "model": model,
-        "prompt_tokens": getattr(usage, "prompt_tokens", 0) if usage else 0,
-        "completion_tokens": getattr(usage, "completion_tokens", 0) if usage else 0,
-        "total_tokens": getattr(usage, "total_tokens", 0) if usage else 0,
-    }
+    text, meta = await _acomplete(stage, _answer_prompt(question, evidence_pack), timeout)
+    return (text, meta) if return_meta else text
+
+
+def revise_paragraph(
+    question: str,
+    paragraph: str,
+    evidence_pack: str,
+    feedback: str,
+    return_meta: bool = False,
+    stage: str = "revise",
+    timeout: Optional[float] = None,
+) -> Union[str, Tuple[str, Dict[str, Any]]]:
+    """
+    Targeted reviser:
+    - Rewrites ONE failing paragraph using only the excerpts relevant to it.
+    - Returns just the paragraph (to be spliced back into the answer),
+      or NOT_FOUND if the excerpts don't support it (caller drops the paragraph).
+    """
+    if not evidence_pack.strip():
+        return (NOT_FOUND, dict(_EMPTY_META)) if return_meta else NOT_FOUND
+
+    text, meta = _complete(stage, _paragraph_prompt(question, paragraph, evidence_pack, feedback), timeout)
+    return (text, meta) if return_meta else text
+
+
+async def arevise_paragraph(
+    question: str,
+    paragraph: str,
+    evidence_pack: str,
+    feedback: str,
+    return_meta: bool = False,
+    stage: str = "revise",
+    timeout: Optional[float] = None,
+) -> Union[str, Tuple[str, Dict[str, Any]]]:
+    """Async revise_paragraph."""
+    if not evidence_pack.strip():
+        return (NOT_FOUND, dict(_EMPTY_META)) if return_meta else NOT_FOUND
 
+    text, meta = await _acomplete(stage, _paragraph_prompt(question, paragraph, evidence_pack, feedback), timeout)
     return (text, meta) if return_meta else text
@@ -0,0 +1,330 @@
+"""
+Headless HTTP service (stdlib only, no extra dependencies):
+
+  POST /answer          {"question": ..., "k": 6, "company_name": ..., "deadline_s": 20,
+                         "session_id": "chat-42"} -> JSON result
+  POST /answer/stream   same body -> Server-Sent Events: one "node" event per finished graph node,
+                        then a final "result" event; "tokens": true adds "token" events
+                        ({"node": "write", "text": ...}) as the writer's first draft streams
+  GET  /healthz         liveness (process is up) + pool stats
+  GET  /readyz          readiness: Chroma collection opens and is non-empty (503 otherwise)
+
+Admission control: a bounded worker pool (SERVICE_WORKERS) plus a bounded queue
+(SERVICE_QUEUE_DEPTH). When both are full, requests are shed immediately with
+429 + Retry-After instead of queueing without limit, so tail latency stays bounded.
+Time spent queued counts against the request deadline.
+
+Run:
+  python app/server.py --port 8000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+# ==================== PATH SETUP ====================
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from agents.research import get_retriever  # noqa: E402
+from agents.faq import warm_up  # noqa: E402
+from agents.workflow import answer_question, get_graph, stream_question  # noqa: E402
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+class WorkerPool:
+    """
+    Bounded pool with admission control.
+    At most `workers` requests run and `queue_depth` wait; try_submit returns None
+    (caller answers 429) when the service is saturated.
+    """
+
+    def __init__(self, workers: int, queue_depth: int):
+        self.workers = max(1, workers)
+        self.queue_depth = max(0, queue_depth)
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="answer")
+        self._lock = threading.Lock()
+        self._admitted = 0
+        self._running = 0
+        self._shed = 0
+
+    def try_submit(self, fn: Callable[..., Any], *args: Any) -> Optional[Future]:
+        with self._lock:
+            if self._admitted >= self.workers + self.queue_depth:
+                self._shed += 1
+                return None
+            self._admitted += 1
+        return self._pool.submit(self._run, fn, *args)
+
+    def _run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        with self._lock:
+            self._running += 1
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._admitted -= 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queue_depth": self.queue_depth,
+                "running": self._running,
+                "queued": self._admitted - self._running,
+                "shed": self._shed,
+            }
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _public_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    # parsed_answer is an in-process object; clients re-parse "answer" if they need spans
+    return {k: v for k, v in result.items() if k != "parsed_answer"}
+
+
+def _remaining(budget_s: Optional[float], admitted_at: float) -> Optional[float]:
+    """Deadline left after queueing (None = no deadline)."""
+    if budget_s is None:
+        return None
+    return max(0.0, budget_s - (time.monotonic() - admitted_at))
+
+
+def check_ready() -> Dict[str, Any]:
+    """Readiness: the Chroma collection opens and has chunks."""
+    try:
+        retriever = get_retriever()
+        count = retriever.collection.count()
+        return {
+            "ready": count > 0,
+            "collection": retriever.collection.name,
+            "chunks": count,
+            "version": retriever.version(),
+        }
+    except Exception as e:
+        return {"ready": False, "error": str(e)}
+
+
+class CopilotHandler(BaseHTTPRequestHandler):
+    server_version = "HROpsCopilot/1.0"
+    pool: WorkerPool  # set by make_server
+    max_body = 64 * 1024
+
+    # ----------------------------- plumbing -----------------------------
+
+    def log_message(self, fmt: str, *args: Any) -> None:
+        sys.stderr.write(f"[server] {self.address_string()} {fmt % args}\n")
+
+    def _send_json(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+        body = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_request(self) -> Optional[Dict[str, Any]]:
+        """Parsed + validated JSON body, or None after an error response was sent."""
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self._send_json(400, {"error": "Invalid Content-Length."})
+            return None
+        if length > self.max_body:
+            self._send_json(413, {"error": f"Body larger than {self.max_body} bytes."})
+            return None
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:  # JSONDecodeError, or bytes that are not UTF-8
+            self._send_json(400, {"error": "Body must be JSON."})
+            return None
+        if not isinstance(body, dict):
+            self._send_json(400, {"error": "Body must be a JSON object."})
+            return None
+
+        question = str(body.get("question") or "").strip()
+        if not question:
+            self._send_json(400, {"error": "Missing 'question'."})
+            return None
+        try:
+            k = int(body.get("k", 6))
+            deadline_s = body.get("deadline_s")
+            if deadline_s is None and os.getenv("ANSWER_DEADLINE_S", "").strip():
+                deadline_s = os.getenv("ANSWER_DEADLINE_S")
+            deadline_s = None if deadline_s is None else float(deadline_s)
+        except (TypeError, ValueError):
+            self._send_json(400, {"error": "'k' must be an integer and 'deadline_s' a number."})
+            return None
+
+        return {
+            "question": question,
+            "k": max(1, min(k, 20)),
+            "company_name": str(body.get("company_name") or "Your Company"),
+            "deadline_s": deadline_s,
+            "session_id": str(body["session_id"]) if body.get("session_id") else None,
+            "tokens": bool(body.get("tokens")),
+        }
+
+    def _shed(self) -> None:
+        self._send_json(
+            429,
+            {"error": "Service saturated, retry later.", "pool": self.pool.stats()},
+            headers={"Retry-After": "1"},
+        )
+
+    # ----------------------------- routes -----------------------------
+
+    def do_GET(self) -> None:
+        if self.path == "/healthz":
+            self._send_json(200, {"status": "ok", "pool": self.pool.stats()})
+        elif self.path == "/readyz":
+            ready = check_ready()
+            self._send_json(200 if ready["ready"] else 503, {**ready, "pool": self.pool.stats()})
+        else:
+            self._send_json(404, {"error": "Not found."})
+
+    def do_POST(self) -> None:
+        if self.path == "/answer":
+            self._answer()
+        elif self.path == "/answer/stream":
+            self._answer_stream()
+        else:
+            self._send_json(404, {"error": "Not found."})
+
+    def _answer(self) -> None:
+        req = self._read_request()
+        if req is None:
+            return
+
+        admitted_at = time.monotonic()
+
+        def job() -> Dict[str, Any]:
+            return answer_question(
+                req["question"],
+                req["k"],
+                req["company_name"],
+                _remaining(req["deadline_s"], admitted_at),
+                session_id=req["session_id"],
+            )
+
+        fut = self.pool.try_submit(job)
+        if fut is None:
+            return self._shed()
+        try:
+            result = fut.result()
+        except Exception as e:
+            return self._send_json(500, {"error": str(e)})
+        self._send_json(200, _public_result(result))
+
+    def _answer_stream(self) -> None:
+        req = self._read_request()
+        if req is None:
+            return
+
+        admitted_at = time.monotonic()
+        events: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        cancelled = threading.Event()
+
+        def job() -> None:
+            try:
+                for kind, payload in stream_question(
+                    req["question"],
+                    req["k"],
+                    req["company_name"],
+                    _remaining(req["deadline_s"], admitted_at),
+                    session_id=req["session_id"],
+                    tokens=req["tokens"],
+                ):
+                    if cancelled.is_set():
+                        break  # client went away: stop at the next node boundary
+                    events.put((kind, _public_result(payload) if kind == "result" else payload))
+            except Exception as e:
+                events.put(("error", {"error": str(e)}))
+            finally:
+                events.put(None)
+
+        if self.pool.try_submit(job) is None:
+            return self._shed()
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        try:
+            while True:
+                item = events.get()
+                if item is None:
+                    break
+                kind, payload = item
+                data = json.dumps(payload, ensure_ascii=False, default=str)
+                self.wfile.write(f"event: {kind}\ndata: {data}\n\n".encode("utf-8"))
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            cancelled.set()
+
+
+def make_server(host: str, port: int, workers: int, queue_depth: int) -> ThreadingHTTPServer:
+    pool = WorkerPool(workers, queue_depth)
+    handler = type("Handler", (CopilotHandler,), {"pool": pool})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="HR Ops Copilot HTTP service.")
+    parser.add_argument("--host", default=os.getenv("SERVICE_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=_env_int("SERVICE_PORT", 8000))
+    parser.add_argument("--workers", type=int, default=_env_int("SERVICE_WORKERS", 4))
+    parser.add_argument("--queue-depth", type=int, default=_env_int("SERVICE_QUEUE_DEPTH", 16))
+    args = parser.parse_args()
+
+    # Pay Chroma/OpenAI client setup, HNSW load, graph compilation and the FAQ answers
+    # before taking traffic
+    try:
+        print(f"[server] warm-up: {warm_up()}", file=sys.stderr)
+    except Exception as e:
+        print(f"[server] warm-up failed, serving cold: {e}", file=sys.stderr)
+        get_graph()
+    print(f"[server] readiness: {check_ready()}", file=sys.stderr)
+
+    server = make_server(args.host, args.port, args.workers, args.queue_depth)
+    print(
+        f"[server] listening on http://{args.host}:{args.port} "
+        f"(workers={args.workers}, queue_depth={args.queue_depth})",
+        file=sys.stderr,
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.RequestHandlerClass.pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()
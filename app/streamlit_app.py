@@ -1,8 +1,13 @@
 import sys
 from pathlib import Path
-import re
 import html
+import os
 import textwrap
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 # ==================== PATH SETUP ====================
@@ -11,7 +16,11 @@ if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
 import streamlit as st
-from agents.workflow import answer_question
+from agents.faq import faq_questions, warm_up
+from agents.research import get_retriever
+from agents.session import clear_session, get_session
+from agents.workflow import get_graph, remember_turn, stream_question
+from retrieval.citations import ParsedAnswer, parse_answer
 
 # ==================== PAGE CONFIG (must be first Streamlit call) ====================
 st.set_page_config(
@@ -29,6 +38,167 @@ def html_block(s: str) -> str:
 NOT_FOUND = "Not found in provided sources."
 COMPANY_NAME = "KosovoTech LLC"
 
+# Cross-session answer cache: lifetime and size
+ANSWER_CACHE_TTL_S = int(os.getenv("ANSWER_CACHE_TTL_S", "3600"))
+ANSWER_CACHE_MAX = int(os.getenv("ANSWER_CACHE_MAX", "256"))
+# Background answer workers shared by all sessions; live progress refresh interval
+UI_WORKERS = int(os.getenv("UI_WORKERS", "4"))
+PROGRESS_POLL_S = float(os.getenv("PROGRESS_POLL_S", "0.3"))
+# Messages drawn per rerun; "Show earlier messages" reveals another page
+HISTORY_PAGE = int(os.getenv("HISTORY_PAGE", "20"))
+
+# ==================== SHARED RESOURCES (one per server process) ====================
+@st.cache_resource(show_spinner="Loading HR knowledge base...")
+def load_resources():
+    """Retriever (Chroma + OpenAI clients) and compiled graph, built once and shared by every session and rerun."""
+    return get_retriever(), get_graph()
+
+
+class AnswerCache:
+    """
+    Answers shared across sessions, keyed by (normalized question, k, company, collection version):
+    a re-ingest changes the version, so stale answers are never served. TTL + LRU bound.
+    Only a chat's first question uses it: later answers depend on the session's earlier turns.
+    Filled by the background workers, so it is a thread-safe object rather than st.cache_data.
+    """
+
+    def __init__(self, ttl_s: int, max_entries: int):
+        self.ttl_s = ttl_s
+        self.max_entries = max(1, max_entries)
+        self._lock = threading.Lock()
+        self._items: "OrderedDict[tuple, tuple[float, dict]]" = OrderedDict()
+
+    def get(self, key: tuple):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            if time.monotonic() - item[0] > self.ttl_s:
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return dict(item[1])
+
+    def put(self, key: tuple, result: dict) -> None:
+        with self._lock:
+            self._items[key] = (time.monotonic(), result)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+
+@st.cache_resource
+def answer_cache() -> AnswerCache:
+    return AnswerCache(ANSWER_CACHE_TTL_S, ANSWER_CACHE_MAX)
+
+
+@st.cache_resource
+def worker_pool() -> ThreadPoolExecutor:
+    """Answers run here, off the script thread: the UI keeps responding while a question runs."""
+    return ThreadPoolExecutor(max_workers=max(1, UI_WORKERS), thread_name_prefix="ui-answer")
+
+
+@st.cache_resource
+def faq_warmup():
+    """HNSW load, FAQ embeddings and precomputed FAQ answers: once per server process, in the background."""
+    return worker_pool().submit(warm_up, 6, COMPANY_NAME)
+
+
+def answer_key(question: str, k: int) -> tuple:
+    retriever, _ = load_resources()
+    return (" ".join(question.lower().split()), k, COMPANY_NAME, retriever.version())
+
+
+def cacheable(result: dict) -> bool:
+    """Only clean PASS results are shared (failed or degraded runs are retried)."""
+    verdict = result.get("verdict") or {}
+    return str(verdict.get("status", "")).upper() == "PASS" and not verdict.get("error") and not result.get("degradations")
+
+
+def error_result(error: str, status: str = "FAIL") -> dict:
+    """UI-safe result for a failed or cancelled run (keeps the strict NOT_FOUND string)."""
+    return {
+        "answer": NOT_FOUND,
+        "verdict": {"status": status, "error": error},
+        "evidence": [],
+        "plan": {"goal": "Handle error", "steps": ["Caught exception in UI wrapper."]},
+        "deliverable": {},
+        "trace": [],
+    }
+
+
+class AnswerJob:
+    """
+    One question running on the worker pool via stream_question (graph node events).
+    The worker appends finished agents and writer tokens; the UI polls snapshot().
+    cancel() stops at the next event (an LLM call already in flight completes, its result is dropped).
+    """
+
+    def __init__(self, question: str, k: int, session_id: str, key: tuple | None):
+        self.question = question
+        self.k = k
+        self.session_id = session_id
+        self.key = key
+        self.started = time.monotonic()
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+        self._steps: list[dict] = []
+        self._text = ""
+        self._result = None
+
+    def run(self) -> None:
+        result = None
+        try:
+            for kind, payload in stream_question(
+                self.question, k=self.k, company_name=COMPANY_NAME, session_id=self.session_id, tokens=True
+            ):
+                if self._cancel.is_set():
+                    return
+                with self._lock:
+                    if kind == "node":
+                        self._steps.extend(payload.get("trace") or [{"agent": payload.get("node")}])
+                    elif kind == "token":
+                        self._text += payload.get("text", "")
+                    elif kind == "result":
+                        result = payload
+            if result is not None and self.key is not None and cacheable(result):
+                answer_cache().put(self.key, result)
+        except Exception as e:
+            result = error_result(str(e))
+        finally:
+            with self._lock:
+                self._result = result if result is not None else error_result("No result returned")
+
+    def cancel(self) -> None:
+        self._cancel.set()
+
+    def snapshot(self):
+        """(finished agent trace entries, streamed writer text, result or None while running)."""
+        with self._lock:
+            return list(self._steps), self._text, self._result
+
+
+def start_answer(question: str, k: int):
+    """
+    Cached result (returned immediately) or a started AnswerJob.
+    - the shared cache is only used while the session has no earlier turns: a follow-up
+      ("and for part-time employees?") depends on them, so it is neither served from
+      nor stored into it
+    - a cache hit is still recorded as a turn of the session, for its follow-ups
+    """
+    session_id = st.session_state.get("session_id", "")
+    key = answer_key(question, k) if not (session_id and len(get_session(session_id))) else None
+    cached = answer_cache().get(key) if key is not None else None
+    if cached is not None:
+        if session_id:
+            retriever, _ = load_resources()
+            remember_turn(session_id, question, retriever.embed(question), cached)
+        return cached
+    job = AnswerJob(question, k, session_id, key)
+    worker_pool().submit(job.run)
+    return job
+
+
 # ==================== DESIGN & CSS (your remodeled UI) ====================
 st.markdown(
     html_block(
@@ -221,6 +391,20 @@ st.markdown(
                 max-width: 360px;
                 animation: pulse 2s infinite;
             }
+            .agent-steps {
+                display: flex;
+                flex-wrap: wrap;
+                gap: 6px;
+                margin: 10px 0;
+            }
+            .agent-step {
+                background: #0f172a;
+                border: 1px solid #334155;
+                border-radius: 999px;
+                padding: 2px 10px;
+                font-size: 12px;
+                color: #cbd5e1;
+            }
             .typing-dots {
                 display: inline-flex;
                 gap: 4px;
@@ -285,16 +469,19 @@ def safe_html(text: str) -> str:
         return ""
     return html.escape(str(text)).replace("\n", "<br>")
 
-def strip_citations(text: str) -> str:
+def parsed_answer_of(result: dict) -> ParsedAnswer:
+    """Reuse the workflow's parsed answer; parse only if it is missing or stale."""
+    answer = result.get("answer", "") or ""
+    parsed = result.get("parsed_answer")
+    if not isinstance(parsed, ParsedAnswer) or parsed.text != answer:
+        parsed = parse_answer(answer)
+    return parsed
+
+def strip_citations(parsed: ParsedAnswer) -> str:
     """Remove [ ... ] citations from answer so sources can be shown only at the end."""
-    if not text:
-        return ""
-    cleaned = re.sub(r"\s*\[[^\]]+\]\s*", " ", text)
-    cleaned = re.sub(r"\s+", " ", cleaned).strip()
-    cleaned = re.sub(r"\s+([.,;:!?])", r"\1", cleaned)
-    return cleaned
+    return parsed.without_citations(collapse_whitespace=True)
 
-def extract_sources(text: str) -> list[str]:
+def extract_sources(parsed: ParsedAnswer) -> list[str]:
     """
     Extract citations from answer, supports:
       [A | x]
@@ -302,19 +489,7 @@ def extract_sources(text: str) -> list[str]:
       [A | x, B | y]
     Returns unique sources preserving order.
     """
-    if not text:
-        return []
-    groups = re.findall(r"\[([^\]]+)\]", text)
-    out = []
-    seen = set()
-    for g in groups:
-        parts = re.split(r"\s*[;,]\s*", g.strip())
-        for p in parts:
-            p = p.strip()
-            if p and p not in seen:
-                seen.add(p)
-                out.append(p)
-    return out
+    return parsed.sources()
 
 def verdict_class(status: str) -> str:
     s = (status or "").upper()
@@ -324,37 +499,6 @@ def verdict_class(status: str) -> str:
         return "verdict-fail"
     return "verdict-unknown"
 
-def run_question(question: str, k: int):
-    """
-    UI wrapper so the app doesn't crash.
-    IMPORTANT: keep strict NOT_FOUND string.
-    """
-    try:
-        # If your workflow accepts company_name:
-        return answer_question(question, k=k, company_name=COMPANY_NAME)
-    except TypeError:
-        # Backward compat if answer_question doesn't accept company_name
-        try:
-            return answer_question(question, k=k)
-        except Exception as e:
-            return {
-                "answer": NOT_FOUND,
-                "verdict": {"status": "FAIL", "error": str(e)},
-                "evidence": [],
-                "plan": {"goal": "Handle error", "steps": ["Caught exception in UI wrapper."]},
-                "deliverable": {},
-                "trace": [],
-            }
-    except Exception as e:
-        return {
-            "answer": NOT_FOUND,
-            "verdict": {"status": "FAIL", "error": str(e)},
-            "evidence": [],
-            "plan": {"goal": "Handle error", "steps": ["Caught exception in UI wrapper."]},
-            "deliverable": {},
-            "trace": [],
-        }
-
 def render_deliverable(deliverable: dict):
     """Pretty deliverable view."""
     if not deliverable:
@@ -390,6 +534,86 @@ def render_deliverable(deliverable: dict):
     else:
         st.write("No sources.")
 
+def prerender(message: dict) -> dict:
+    """
+    Build a message's HTML once, when it is appended; reruns only re-send the strings:
+    - "html": the bubble, "html_sources": the bubble with the sources row
+    - assistant messages also keep "status" (verdict pill / debug header)
+    Returns the message (already rendered messages are left as they are).
+    """
+    if "html" in message:
+        return message
+
+    timestamp = message.get("timestamp", "--:--")
+    if message.get("role") == "user":
+        message["html"] = message["html_sources"] = html_block(
+            f"""
+            <div class="message-user-wrap">
+                <div class="user-content">
+                    <div class="user-header">You • {safe_html(timestamp)}</div>
+                    {safe_html(message.get("content",""))}
+                </div>
+            </div>
+            """
+        )
+        return message
+
+    result = message.get("content") or {}
+    answer = result.get("answer", "") or ""
+    verdict = result.get("verdict", {}) or {}
+    status = str(verdict.get("status", "UNKNOWN")).upper()
+    pill_cls = verdict_class(status)
+
+    is_not_found = answer.strip() == NOT_FOUND or answer.strip().startswith("Not found")
+
+    sources_html = ""
+    if is_not_found:
+        content_html = f'<div class="not-found">{safe_html(NOT_FOUND)}</div>'
+    else:
+        parsed = parsed_answer_of(result)
+        answer_clean = strip_citations(parsed)
+        content_html = f"<div>{safe_html(answer_clean)}</div>"
+
+        sources = extract_sources(parsed)
+        if sources:
+            chips = "".join(
+                f'<span class="source-chip" title="{html.escape(s)}">{html.escape(s)}</span>'
+                for s in sources
+            )
+            sources_html = html_block(
+                f"""
+                <div class="sources-row">
+                    <span class="sources-label">Sources</span>
+                    {chips}
+                </div>
+                """
+            )
+
+    def bubble(body: str) -> str:
+        return html_block(
+            f"""
+            <div class="message-ai-wrap">
+                <div class="ai-content">
+                    <div class="ai-header">
+                        <div class="ai-header-left">
+                            <span>🤖 HR Copilot</span>
+                            <span>• {safe_html(timestamp)}</span>
+                        </div>
+                        <div class="ai-header-right">
+                            <span class="verdict-pill {pill_cls}">{safe_html(status)}</span>
+                        </div>
+                    </div>
+                    {body}
+                </div>
+            </div>
+            """
+        )
+
+    message["status"] = status
+    message["html"] = bubble(content_html)
+    message["html_sources"] = bubble(content_html + sources_html)
+    return message
+
 # ==================== SIDEBAR ====================
 with st.sidebar:
     st.image("https://cdn-icons-png.flaticon.com/512/4712/4712139.png", width=50)
@@ -411,12 +635,7 @@ with st.sidebar:
         show_details = st.checkbox("Debug", value=False)
 
     st.markdown("### Quick Examples")
-    examples = [
-        "What is the remote work policy?",
-        "Official holidays in Kosovo (Law 03-L-064)?",
-        "Maximum working hours per week?",
-        "Safety requirements at work?",
-    ]
+    examples = faq_questions()
 
     # IMPORTANT: stable unique keys (no collisions)
     for example in examples:
@@ -427,14 +646,31 @@ with st.sidebar:
     if st.button("Clear Chat", key="clear_chat", type="secondary", use_container_width=True):
         st.session_state.conversation_history = []
         st.session_state.pop("pending_question", None)
+        job = st.session_state.get("answer_job")
+        if job is not None:
+            job.cancel()
+        st.session_state.answer_job = None
         st.session_state.inflight_question = None
         st.session_state.assistant_typing_since = None
+        st.session_state.history_visible = HISTORY_PAGE
+        st.session_state.details_open = set()
+        clear_session(st.session_state.get("session_id", ""))
+        st.session_state.session_id = uuid.uuid4().hex
         st.rerun()
 
 # ==================== SESSION STATE ====================
 st.session_state.setdefault("conversation_history", [])
 st.session_state.setdefault("inflight_question", None)
 st.session_state.setdefault("assistant_typing_since", None)
+st.session_state.setdefault("answer_job", None)
+st.session_state.setdefault("history_visible", HISTORY_PAGE)
+st.session_state.setdefault("details_open", set())
+st.session_state.setdefault("session_id", uuid.uuid4().hex)
+
+# Shared clients + graph: paid by the first session after a server start, instant afterwards
+load_resources()
+# FAQ answers are precomputed off the script thread, so no session waits for them
+faq_warmup()
 
 # ==================== HEADER ====================
 st.markdown(
@@ -469,87 +705,39 @@ if not st.session_state.conversation_history:
 # ==================== CONVERSATION ====================
 st.markdown('<div class="chat-container">', unsafe_allow_html=True)
 
-for msg_idx, message in enumerate(st.session_state.conversation_history):
-    role = message.get("role", "")
-    timestamp = message.get("timestamp", "--:--")
+history = st.session_state.conversation_history
+# Only the newest page is drawn (rerun cost stays flat as the chat grows); start on a user turn
+start = max(0, len(history) - st.session_state.history_visible)
+while start > 0 and history[start].get("role") != "user":
+    start -= 1
+if start:
+    if st.button(f"Show earlier messages ({start} hidden)", key="show_earlier", use_container_width=True):
+        st.session_state.history_visible += HISTORY_PAGE
+        st.rerun()
 
-    if role == "user":
-        st.markdown(
-            html_block(
-                f"""
-                <div class="message-user-wrap">
-                    <div class="user-content">
-                        <div class="user-header">You • {safe_html(timestamp)}</div>
-                        {safe_html(message.get("content",""))}
-                    </div>
-                </div>
-                """
-            ),
-            unsafe_allow_html=True,
-        )
+last_answer = max((i for i, m in enumerate(history) if m.get("role") == "assistant"), default=-1)
+
+for msg_idx in range(start, len(history)):
+    message = prerender(history[msg_idx])
+    st.markdown(message["html_sources"] if show_sources else message["html"], unsafe_allow_html=True)
+    if message.get("role") != "assistant":
         continue
 
-    # Assistant message
     result = message.get("content") or {}
-    answer = result.get("answer", "") or ""
     verdict = result.get("verdict", {}) or {}
     evidence = result.get("evidence", []) or []
     plan = result.get("plan", {}) or {}
     deliverable = result.get("deliverable", {}) or {}
     trace = result.get("trace", []) or []
-
-    status = str(verdict.get("status", "UNKNOWN")).upper()
-    pill_cls = verdict_class(status)
-
-    is_not_found = answer.strip() == NOT_FOUND or answer.strip().startswith("Not found")
-
-    content_html = ""
-    if is_not_found:
-        content_html = f'<div class="not-found">{safe_html(NOT_FOUND)}</div>'
-    else:
-        answer_clean = strip_citations(answer)
-        content_html = f"<div>{safe_html(answer_clean)}</div>"
-
-        if show_sources:
-            sources = extract_sources(answer)
-            if sources:
-                chips = "".join(
-                    f'<span class="source-chip" title="{html.escape(s)}">{html.escape(s)}</span>'
-                    for s in sources
-                )
-                content_html += html_block(
-                    f"""
-                    <div class="sources-row">
-                        <span class="sources-label">Sources</span>
-                        {chips}
-                    </div>
-                    """
-                )
-
-    st.markdown(
-        html_block(
-            f"""
-            <div class="message-ai-wrap">
-                <div class="ai-content">
-                    <div class="ai-header">
-                        <div class="ai-header-left">
-                            <span>🤖 HR Copilot</span>
-                            <span>• {safe_html(timestamp)}</span>
-                        </div>
-                        <div class="ai-header-right">
-                            <span class="verdict-pill {pill_cls}">{safe_html(status)}</span>
-                        </div>
-                    </div>
-                    {content_html}
-                </div>
-            </div>
-            """
-        ),
-        unsafe_allow_html=True,
-    )
+    status = message["status"]
 
     # ==================== DEBUG ====================
-    if show_details:
+    # Newest answer always; older ones on request (each evidence chunk is a widget)
+    if show_details and msg_idx != last_answer and msg_idx not in st.session_state.details_open:
+        if st.button("🔍 Load Analysis Details", key=f"details_{msg_idx}"):
+            st.session_state.details_open.add(msg_idx)
+            st.rerun()
+    elif show_details:
         with st.expander("🔍 View Analysis Details (Debug)", expanded=False):
             st.markdown(f"**Verdict Status:** `{status}`")
             if verdict.get("error"):
@@ -591,20 +779,86 @@ for msg_idx, message in enumerate(st.session_state.conversation_history):
 
 st.markdown("</div>", unsafe_allow_html=True)
 
-# ==================== TYPING INDICATOR ====================
-if st.session_state.inflight_question:
+# ==================== LIVE PROGRESS (background answer) ====================
+def finish_answer(result: dict) -> None:
+    st.session_state.conversation_history.append(
+        prerender({"role": "assistant", "content": result, "timestamp": now_hhmm()})
+    )
+    st.session_state.answer_job = None
+    st.session_state.inflight_question = None
+    st.session_state.assistant_typing_since = None
+
+
+def submit_question(q: str) -> None:
+    """Cached answers are shown at once; anything else runs on the worker pool."""
+    st.session_state.conversation_history.append(prerender({"role": "user", "content": q, "timestamp": now_hhmm()}))
+    try:
+        outcome = start_answer(q, k)
+    except Exception as e:
+        outcome = error_result(str(e))
+    if isinstance(outcome, AnswerJob):
+        st.session_state.answer_job = outcome
+        st.session_state.inflight_question = q
+        st.session_state.assistant_typing_since = now_hhmm()
+    else:
+        finish_answer(outcome)
+    st.rerun()
+
+
+@st.fragment(run_every=PROGRESS_POLL_S)
+def live_progress() -> None:
+    """
+    Reruns on its own (not the whole page) while the job runs:
+    - each finished agent with its latency
+    - the writer's answer as tokens arrive (the verified answer replaces it when done)
+    - Cancel
+    """
+    job = st.session_state.get("answer_job")
+    if job is None:
+        return
+    steps, text, result = job.snapshot()
+    if result is not None:
+        finish_answer(result)
+        st.rerun()
+
     started = st.session_state.assistant_typing_since or "--:--"
+    elapsed = time.monotonic() - job.started
+    chips = "".join(
+        f'<span class="agent-step">{"⚠️" if e.get("error") else "✅"} {safe_html(e.get("agent"))}'
+        + (f' · {float(e["ms"]):.0f} ms' if e.get("ms") is not None else "")
+        + "</span>"
+        for e in steps
+    )
     st.markdown(
         html_block(
             f"""
             <div class="typing-box">
-                <span>Preparing a verified answer • {safe_html(started)}</span>
+                <span>Preparing a verified answer • {safe_html(started)} • {elapsed:.1f}s</span>
                 <span class="typing-dots"><span></span><span></span><span></span></span>
             </div>
+            <div class="agent-steps">{chips}</div>
             """
         ),
         unsafe_allow_html=True,
     )
+    if text:
+        st.markdown(
+            html_block(
+                f"""
+                <div class="message-ai-wrap">
+                    <div class="ai-content">{safe_html(text)}</div>
+                </div>
+                """
+            ),
+            unsafe_allow_html=True,
+        )
+    if st.button("Cancel", key="cancel_answer", type="secondary"):
+        job.cancel()
+        finish_answer(error_result("Cancelled by user", status="CANCELLED"))
+        st.rerun()
+
+
+live_progress()
 
 # ==================== INPUT AREA ====================
 
@@ -613,26 +867,10 @@ queued = st.session_state.pop("pending_question", None)
 if queued and not st.session_state.inflight_question:
     q = str(queued).strip()
     if q:
-        st.session_state.conversation_history.append({"role": "user", "content": q, "timestamp": now_hhmm()})
-        st.session_state.inflight_question = q
-        st.session_state.assistant_typing_since = now_hhmm()
-        st.rerun()
+        submit_question(q)
 
 # Main chat input
 if prompt := st.chat_input("Type your question here...", key="chat_input"):
     q = prompt.strip()
     if q and not st.session_state.inflight_question:
-        st.session_state.conversation_history.append({"role": "user", "content": q, "timestamp": now_hhmm()})
-        st.session_state.inflight_question = q
-        st.session_state.assistant_typing_since = now_hhmm()
-        st.rerun()
-
-# Process inflight question (runs after rerun to show typing UI)
-if st.session_state.inflight_question:
-    with st.spinner("Processing HR knowledge base..."):
-        result = run_question(st.session_state.inflight_question, k=k)
-
-    st.session_state.conversation_history.append({"role": "assistant", "content": result, "timestamp": now_hhmm()})
-    st.session_state.inflight_question = None
-    st.session_state.assistant_typing_since = None
-    st.rerun()
+        submit_question(q)
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+# Probes run from the repo root so `agents` / `retrieval` resolve
+ROOT = Path(__file__).resolve().parents[1]
+BUDGET_PATH = ROOT / "eval" / "import_budget.json"
+
+# Runs in a fresh interpreter: wall time of `code` + which heavy modules it pulled in
+_PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+exec(compile({code!r}, "<bench>", "exec"))
+ms = (time.perf_counter() - t0) * 1000
+loaded = [m for m in {lazy!r} if m in sys.modules]
+print(json.dumps({{"ms": ms, "loaded": loaded}}))
+"""
+
+
+def _probe(code: str, lazy: List[str]) -> Dict[str, Any]:
+    out = subprocess.run(
+        [sys.executable, "-c", _PROBE.format(code=code, lazy=lazy)],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def _importtime_rows(code: str) -> List[Tuple[int, str, float]]:
+    """(depth, module, cumulative ms) rows from `python -X importtime`."""
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or line.count("|") != 2:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not cumulative.strip().isdigit():
+            continue  # header row
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((depth, name.strip(), int(cumulative) / 1000))
+    return rows
+
+
+def _importtime_top(code: str, n: int = 8) -> List[Tuple[str, float]]:
+    """Slowest imports caused by `code` (top level + one level down), interpreter startup excluded."""
+    startup = {name for _, name, _ in _importtime_rows("pass")}
+    rows = [(name, ms) for depth, name, ms in _importtime_rows(code) if depth <= 1 and name not in startup]
+    return sorted(rows, key=lambda r: -r[1])[:n]
+
+
+def run(budget_path: Path = BUDGET_PATH, runs: int | None = None, verbose: bool = False) -> int:
+    """
+    Startup benchmark with a tracked budget (eval/import_budget.json):
+    - median wall time per target over N fresh interpreters vs budget_ms
+    - heavy modules listed in "lazy" must not be imported by the target
+    Returns a process exit code (1 if any target is over budget).
+    """
+    budget = json.loads(budget_path.read_text(encoding="utf-8"))
+    runs = runs or int(budget.get("runs", 5))
+
+    failures = 0
+    for target in budget["targets"]:
+        lazy = target.get("lazy", [])
+        samples = [_probe(target["code"], lazy) for _ in range(runs)]
+        median_ms = statistics.median(s["ms"] for s in samples)
+        loaded = sorted({m for s in samples for m in s["loaded"]})
+
+        ok = median_ms <= target["budget_ms"] and not loaded
+        failures += 0 if ok else 1
+        print(
+            f"{'✅' if ok else '❌'} {target['name']}: {median_ms:.0f} ms "
+            f"(budget {target['budget_ms']} ms, median of {runs})"
+            + (f" | eagerly imported: {', '.join(loaded)}" if loaded else "")
+        )
+
+        if verbose or not ok:
+            for name, ms in _importtime_top(target["code"]):
+                print(f"     {ms:8.1f} ms  {name}")
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import-time / startup budget check.")
+    parser.add_argument("--budget", type=Path, default=BUDGET_PATH)
+    parser.add_argument("--runs", type=int, default=None)
+    parser.add_argument("-v", "--verbose", action="store_true", help="show top imports for every target")
+    args = parser.parse_args()
+    sys.exit(run(args.budget, args.runs, args.verbose))
@@ -0,0 +1,213 @@
+"""
+Retrieval benchmark, independent of the writer/verifier:
+- gold doc_name (optionally pages) per question in eval/retrieval_gold.json
+- recall@k, MRR and nDCG@k for one Retriever.search of the question ("search")
+  and for the planner fan-out + merge used by the workflow ("evidence")
+- latency percentiles: query embedding, Chroma query, search, evidence
+- several configurations side by side (collection / chunking, k, expansions)
+
+  python eval/bench_retrieval.py
+  python eval/bench_retrieval.py --config "name=k6" --config "name=k4,k=4,expansions=0"
+  python eval/bench_retrieval.py --config "name=c1000" --config "name=c600,persist_dir=storage/chroma_c600"
+
+Config keys: name, persist_dir, collection, k, expansions (0/1), embed_model.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from agents.planner import plan_queries  # noqa: E402
+from agents.research import merge_evidence  # noqa: E402
+from eval.run_eval import _latency_stats  # noqa: E402
+from retrieval.retriever import COLLECTION_NAME, PERSIST_DIR, Retriever  # noqa: E402
+
+GOLD_PATH = ROOT / "eval" / "retrieval_gold.json"
+REPORT_PATH = ROOT / "eval" / "retrieval_report.json"
+
+_METRICS = ("recall", "mrr", "ndcg")
+
+
+def parse_config(spec: str) -> Dict[str, Any]:
+    """'name=x,k=4,expansions=0' -> config dict with defaults filled in."""
+    config: Dict[str, Any] = {
+        "name": "default",
+        "persist_dir": PERSIST_DIR,
+        "collection": COLLECTION_NAME,
+        "k": 6,
+        "expansions": True,
+        "embed_model": None,
+    }
+    for part in (spec or "").split(","):
+        if not part.strip():
+            continue
+        key, _, value = part.partition("=")
+        key, value = key.strip(), value.strip()
+        if key not in config:
+            raise ValueError(f"Unknown config key: {key!r} (expected one of {', '.join(config)})")
+        if key == "k":
+            config[key] = int(value)
+        elif key == "expansions":
+            config[key] = value.lower() not in ("0", "false", "no", "off")
+        else:
+            config[key] = value
+    return config
+
+
+def _matches(hit: Dict[str, Any], gold: Dict[str, Any]) -> bool:
+    md = hit.get("metadata") or {}
+    if md.get("doc_name") != gold["doc_name"]:
+        return False
+    pages = gold.get("pages")
+    return not pages or md.get("page") in pages
+
+
+def score(hits: List[Dict[str, Any]], gold: List[Dict[str, Any]], k: int) -> Dict[str, float]:
+    """
+    recall@k: share of gold items hit in the top k
+    MRR:      1 / rank of the first relevant hit (0 if none in the top k)
+    nDCG@k:   each gold item counts once (first hit that matches it), ideal = all gold items on top
+    """
+    found: set[int] = set()
+    dcg, first_rank = 0.0, 0
+    for rank, hit in enumerate(hits[:k], start=1):
+        matched = [i for i, g in enumerate(gold) if _matches(hit, g)]
+        if not matched:
+            continue
+        first_rank = first_rank or rank
+        new = [i for i in matched if i not in found]
+        if new:
+            found.add(new[0])
+            dcg += 1.0 / math.log2(rank + 1)
+    ideal = sum(1.0 / math.log2(r + 1) for r in range(1, min(k, len(gold)) + 1))
+    return {
+        "recall": len(found) / len(gold) if gold else 0.0,
+        "mrr": 1.0 / first_rank if first_rank else 0.0,
+        "ndcg": dcg / ideal if ideal else 0.0,
+    }
+
+
+def _evidence(retriever: Retriever, question: str, k: int, expansions: bool) -> List[Dict[str, Any]]:
+    """agents.research.retrieve_evidence on this config's retriever (expansions=False: the question only)."""
+    queries = plan_queries(question) if expansions else [question]
+    merged: List[Dict[str, Any]] = []
+    for q in queries:
+        merged = merge_evidence(merged, retriever.search(q, k=max(k, 6)))
+    return merged[:k]
+
+
+def _timed(fn, *args, **kwargs) -> tuple[Any, float]:
+    t0 = time.perf_counter()
+    out = fn(*args, **kwargs)
+    return out, (time.perf_counter() - t0) * 1000
+
+
+def bench_config(config: Dict[str, Any], gold_set: List[Dict[str, Any]], repeat: int = 1) -> Dict[str, Any]:
+    retriever = Retriever(
+        persist_dir=config["persist_dir"],
+        collection_name=config["collection"],
+        embed_model=config["embed_model"],
+    )
+    k = config["k"]
+    lat: Dict[str, List[float]] = {"embed": [], "query": [], "search": [], "evidence": []}
+    rows = []
+
+    for item in gold_set:
+        question, gold = item["question"], item["gold"]
+        for i in range(max(1, repeat)):
+            emb, ms = _timed(retriever.embed, question)
+            lat["embed"].append(ms)
+            _, ms = _timed(retriever.search, question, k=k, embedding=emb)
+            lat["query"].append(ms)
+            hits, ms = _timed(retriever.search, question, k=k)
+            lat["search"].append(ms)
+            evidence, ms = _timed(_evidence, retriever, question, k, config["expansions"])
+            lat["evidence"].append(ms)
+            if i == 0:
+                rows.append({
+                    "id": item["id"],
+                    "search": score(hits, gold, k),
+                    "evidence": score(evidence, gold, k),
+                    "top_docs": [(h.get("metadata") or {}).get("doc_name") for h in evidence],
+                })
+
+    def mean(path: str, metric: str) -> float:
+        return round(sum(r[path][metric] for r in rows) / len(rows), 4) if rows else 0.0
+
+    return {
+        "config": config,
+        "chunks": retriever.collection.count(),
+        "metrics": {path: {m: mean(path, m) for m in _METRICS} for path in ("search", "evidence")},
+        "latency_ms": {name: _latency_stats(values) for name, values in lat.items()},
+        "results": rows,
+    }
+
+
+def _print_comparison(reports: List[Dict[str, Any]]) -> None:
+    names = [r["config"]["name"] for r in reports]
+    width = max(12, *(len(n) for n in names)) + 2
+
+    def row(label: str, values: List[float], fmt: str, lower_is_better: bool = False, tolerance: float = 1e-9) -> None:
+        # ⚠ marks a change for the worse vs the first config (beyond tolerance, relative for latency)
+        cells = [f"{v:{fmt}}".rjust(width) for v in values]
+        deltas = []
+        for v in values[1:]:
+            d = v - values[0]
+            if lower_is_better:
+                worse = d > tolerance * abs(values[0])
+            else:
+                worse = d < -tolerance
+            deltas.append(f"{d:+{fmt}}{' ⚠' if worse else ''}".rjust(width))
+        print(f"{label:<22}" + "".join(cells) + "".join(deltas))
+
+    print(f"{'':<22}" + "".join(n.rjust(width) for n in names) + "".join(f"Δ {n}".rjust(width) for n in names[1:]))
+    print(f"{'k':<22}" + "".join(str(r["config"]["k"]).rjust(width) for r in reports))
+    for path in ("search", "evidence"):
+        for m in _METRICS:
+            row(f"{path} {m}" + ("@k" if m != "mrr" else ""), [r["metrics"][path][m] for r in reports], ".3f")
+    for name in ("embed", "query", "search", "evidence"):
+        for p in ("p50", "p90", "p99"):
+            row(f"{name} {p} ms", [r["latency_ms"][name][p] for r in reports], ".1f", lower_is_better=True, tolerance=0.1)
+
+
+def run(
+    configs: List[Dict[str, Any]],
+    gold_path: Path = GOLD_PATH,
+    repeat: int = 1,
+    report_path: Path = REPORT_PATH,
+) -> List[Dict[str, Any]]:
+    # Every timed embedding must hit the API: no query-embedding cache (read by Retriever())
+    os.environ["EMBED_CACHE_MAX"] = "0"
+    gold_set = json.loads(gold_path.read_text(encoding="utf-8"))
+    reports = [bench_config(c, gold_set, repeat) for c in configs]
+
+    _print_comparison(reports)
+    for report in reports:
+        misses = [r["id"] for r in report["results"] if r["evidence"]["recall"] < 1.0]
+        if misses:
+            print(f"[{report['config']['name']}] incomplete recall: {', '.join(misses)}")
+
+    report_path.write_text(json.dumps(reports, indent=2), encoding="utf-8")
+    print(f"Report saved to: {report_path}")
+    return reports
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Retrieval quality + latency benchmark.")
+    parser.add_argument("--config", action="append", default=None, help="key=value,... (repeat to compare)")
+    parser.add_argument("--gold", type=Path, default=GOLD_PATH)
+    parser.add_argument("--repeat", type=int, default=1, help="timed runs per question")
+    parser.add_argument("--out", type=Path, default=REPORT_PATH)
+    args = parser.parse_args()
+    run([parse_config(s) for s in (args.config or [""])], args.gold, args.repeat, args.out)
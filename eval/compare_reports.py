@@ -0,0 +1,222 @@
+"""
+Performance regression gate: candidate eval report vs a stored baseline
+(both written by eval/run_eval.py).
+
+Per question (paired by id) it compares:
+- latency: end-to-end and per agent node (trace "ms"; the revision is "writer.revise"), median
+- total tokens per question, mean
+- revise rate and pass rate
+with bootstrap confidence intervals. A metric regresses when the whole CI is worse
+than its threshold (so noise alone never fails the gate); exit code 1 on any regression.
+
+  python eval/run_eval.py && cp eval/report.json eval/baseline_report.json   # once
+  python eval/run_eval.py && python eval/compare_reports.py eval/report.json
+  python eval/compare_reports.py cand.json --baseline base.json --latency-pct 15 --out eval/compare.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import statistics
+import sys
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+BASELINE_PATH = ROOT / "eval" / "baseline_report.json"
+
+
+def node_key(entry: Dict[str, Any]) -> str:
+    """Latency bucket of one trace entry (shared with run_eval's summary): revise passes are "writer.revise"."""
+    agent = str(entry.get("agent") or entry.get("name"))
+    # Revision runs under the writer span; its entries carry the revision mode
+    return f"{agent}.revise" if agent == "writer" and "mode" in entry else agent
+
+
+def question_metrics(row: Dict[str, Any]) -> Dict[str, float]:
+    """Flat per-question metrics of one report row ("latency:<node>" = summed ms of that node)."""
+    trace = row.get("trace") or []
+    out: Dict[str, float] = {}
+    if row.get("ms") is not None:
+        out["latency:question"] = float(row["ms"])
+    for t in trace:
+        if t.get("ms") is not None:
+            key = f"latency:{node_key(t)}"
+            out[key] = out.get(key, 0.0) + float(t["ms"])
+    out["tokens"] = float(
+        row["total_tokens"] if row.get("total_tokens") is not None
+        else sum(int(t.get("total_tokens") or 0) for t in trace)
+    )
+    revisions = max([int(t.get("revisions") or 0) for t in trace if t.get("agent") == "deliverer"] or [0])
+    out["revise_rate"] = 1.0 if revisions or any(node_key(t) == "writer.revise" for t in trace) else 0.0
+    out["pass_rate"] = 1.0 if row.get("ok") else 0.0
+    return out
+
+
+def bootstrap_ci(
+    base: List[float],
+    cand: List[float],
+    stat: Callable[[List[float]], float],
+    relative: bool,
+    n_boot: int,
+    confidence: float,
+    rng: random.Random,
+) -> Dict[str, float]:
+    """Paired bootstrap over questions of stat(cand) - stat(base) (relative: / stat(base))."""
+
+    def delta(b: List[float], c: List[float]) -> float:
+        sb, sc = stat(b), stat(c)
+        if relative:
+            return (sc - sb) / sb if sb else 0.0
+        return sc - sb
+
+    n = len(base)
+    samples = []
+    for _ in range(n_boot):
+        idx = [rng.randrange(n) for _ in range(n)]
+        samples.append(delta([base[i] for i in idx], [cand[i] for i in idx]))
+    samples.sort()
+    alpha = (1.0 - confidence) / 2
+    return {
+        "base": stat(base),
+        "cand": stat(cand),
+        "delta": delta(base, cand),
+        "lo": samples[int(alpha * (n_boot - 1))],
+        "hi": samples[int((1 - alpha) * (n_boot - 1))],
+    }
+
+
+def _load_rows(path: Path) -> Dict[str, Dict[str, Any]]:
+    report = json.loads(path.read_text(encoding="utf-8"))
+    return {row["id"]: row for row in report.get("results") or []}
+
+
+def compare(
+    baseline: Path,
+    candidate: Path,
+    latency_pct: float = 10.0,
+    tokens_pct: float = 5.0,
+    revise_rate: float = 0.05,
+    pass_rate: float = 0.02,
+    latency_min_ms: float = 5.0,
+    n_boot: int = 2000,
+    confidence: float = 0.95,
+    seed: int = 0,
+    min_samples: int = 3,
+) -> Dict[str, Any]:
+    """
+    Thresholds: latency / tokens are relative increases (%), revise rate is an absolute
+    increase and pass rate an absolute drop. A latency change must also exceed
+    latency_min_ms (sub-millisecond nodes are all noise in relative terms). Metrics
+    with fewer than min_samples paired questions are reported but not gated.
+    """
+    base_rows, cand_rows = _load_rows(baseline), _load_rows(candidate)
+    ids = [i for i in base_rows if i in cand_rows]
+    if not ids:
+        raise ValueError(f"No common question ids between {baseline} and {candidate}")
+
+    base_m = {i: question_metrics(base_rows[i]) for i in ids}
+    cand_m = {i: question_metrics(cand_rows[i]) for i in ids}
+    names = sorted({k for m in list(base_m.values()) + list(cand_m.values()) for k in m})
+
+    rng = random.Random(seed)
+    metrics = []
+    for name in names:
+        paired = [i for i in ids if name in base_m[i] and name in cand_m[i]]
+        if name.startswith("latency:"):
+            stat, relative, limit = statistics.median, True, latency_pct / 100
+        elif name == "tokens":
+            stat, relative, limit = statistics.fmean, True, tokens_pct / 100
+        elif name == "revise_rate":
+            stat, relative, limit = statistics.fmean, False, revise_rate
+        else:  # pass_rate: higher is better
+            stat, relative, limit = statistics.fmean, False, pass_rate
+
+        entry: Dict[str, Any] = {"metric": name, "n": len(paired), "relative": relative, "threshold": limit}
+        if paired:
+            ci = bootstrap_ci(
+                [base_m[i][name] for i in paired],
+                [cand_m[i][name] for i in paired],
+                stat, relative, n_boot, confidence, rng,
+            )
+            entry.update(ci)
+            gated = len(paired) >= min_samples
+            if name == "pass_rate":
+                entry["regression"] = gated and ci["hi"] < -limit
+                entry["improvement"] = gated and ci["lo"] > limit
+            else:
+                material = not name.startswith("latency:") or abs(ci["cand"] - ci["base"]) > latency_min_ms
+                entry["regression"] = gated and material and ci["lo"] > limit
+                entry["improvement"] = gated and material and ci["hi"] < -limit
+        metrics.append(entry)
+
+    return {
+        "baseline": str(baseline),
+        "candidate": str(candidate),
+        "questions": len(ids),
+        "confidence": confidence,
+        "bootstrap": n_boot,
+        "metrics": metrics,
+        "regressions": [m["metric"] for m in metrics if m.get("regression")],
+    }
+
+
+def _fmt(value: float, relative: bool) -> str:
+    return f"{value * 100:+.1f}%" if relative else f"{value:+.3f}"
+
+
+def print_comparison(result: Dict[str, Any]) -> None:
+    print(f"Baseline:  {result['baseline']}\nCandidate: {result['candidate']}")
+    print(f"{result['questions']} paired question(s), {int(result['confidence'] * 100)}% bootstrap CI\n")
+    print(f"{'metric':<26}{'n':>4}{'baseline':>12}{'candidate':>12}{'delta':>10}{'CI':>22}")
+    for m in result["metrics"]:
+        if "delta" not in m:
+            print(f"{m['metric']:<26}{m['n']:>4}   (no paired samples)")
+            continue
+        flag = "❌ regression" if m["regression"] else ("✅ better" if m["improvement"] else "")
+        ci = f"[{_fmt(m['lo'], m['relative'])}, {_fmt(m['hi'], m['relative'])}]"
+        spec = ".1f" if m["relative"] else ".3f"
+        print(
+            f"{m['metric']:<26}{m['n']:>4}{m['base']:>12{spec}}{m['cand']:>12{spec}}"
+            f"{_fmt(m['delta'], m['relative']):>10}{ci:>22}  {flag}"
+        )
+    if result["regressions"]:
+        print(f"\n❌ Regressions: {', '.join(result['regressions'])}")
+    else:
+        print("\n✅ No regressions beyond thresholds.")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare two eval reports with bootstrap CIs.")
+    parser.add_argument("candidate", type=Path)
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--latency-pct", type=float, default=10.0, help="max median latency increase per node (%%)")
+    parser.add_argument("--tokens-pct", type=float, default=5.0, help="max mean tokens/question increase (%%)")
+    parser.add_argument("--revise-rate", type=float, default=0.05, help="max absolute revise-rate increase")
+    parser.add_argument("--pass-rate", type=float, default=0.02, help="max absolute pass-rate drop")
+    parser.add_argument("--latency-min-ms", type=float, default=5.0, help="ignore latency changes below this")
+    parser.add_argument("--bootstrap", type=int, default=2000)
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", type=Path, default=None, help="write the comparison as JSON")
+    args = parser.parse_args(argv)
+
+    try:
+        result = compare(
+            args.baseline, args.candidate, args.latency_pct, args.tokens_pct,
+            args.revise_rate, args.pass_rate, args.latency_min_ms, args.bootstrap, args.confidence, args.seed,
+        )
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 2
+
+    print_comparison(result)
+    if args.out:
+        args.out.write_text(json.dumps(result, indent=2), encoding="utf-8")
+    return 1 if result["regressions"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,190 @@
+"""
+Closed-loop load generator for answer_question: sweeps concurrency levels and
+reports the throughput / latency curve (QPS, p50/p90/p99, errors, degradations).
+
+  # against the local stub (started in-process), no API cost
+  python eval/load_test.py --stub --concurrency 1,4,16,64 --requests 200
+
+  # against whatever OPENAI_BASE_URL points to (e.g. a stub in another process)
+  OPENAI_BASE_URL=http://127.0.0.1:8100/v1 OPENAI_API_KEY=stub python eval/load_test.py
+
+Single-flight, checkpoints and stored FAQ answers are turned off (every request
+does its own work); --single-flight keeps coalescing on.
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+QUESTIONS_PATH = ROOT / "eval" / "questions.json"
+
+
+def _run_level(
+    questions: List[str],
+    concurrency: int,
+    requests: int,
+    k: int,
+    deadline_s: Optional[float],
+) -> Dict[str, Any]:
+    """`requests` questions through `concurrency` looping workers."""
+    from agents.workflow import answer_question
+    from eval.run_eval import _latency_stats
+
+    counter = itertools.count()
+    lock = threading.Lock()
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    degraded = 0
+
+    def worker() -> None:
+        nonlocal degraded
+        while True:
+            i = next(counter)
+            if i >= requests:
+                return
+            t0 = time.perf_counter()
+            try:
+                result = answer_question(questions[i % len(questions)], k=k, deadline_s=deadline_s)
+                err = (result.get("verdict") or {}).get("error")
+            except Exception as e:
+                result, err = {}, f"{type(e).__name__}: {e}"
+            ms = (time.perf_counter() - t0) * 1000
+            with lock:
+                latencies.append(ms)
+                if err:
+                    key = str(err).split(":")[0][:60]
+                    errors[key] = errors.get(key, 0) + 1
+                if result.get("degradations"):
+                    degraded += 1
+
+    t_start = time.perf_counter()
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall_s = time.perf_counter() - t_start
+
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "wall_s": round(wall_s, 2),
+        "qps": round(len(latencies) / wall_s, 2) if wall_s > 0 else 0.0,
+        "latency_ms": _latency_stats(latencies),
+        "errors": sum(errors.values()),
+        "error_kinds": errors,
+        "degraded": degraded,
+    }
+
+
+def _knee(levels: List[Dict[str, Any]], min_gain: float = 1.1) -> Optional[int]:
+    """First concurrency whose QPS is < min_gain x the previous level's (throughput saturated)."""
+    for prev, cur in zip(levels, levels[1:]):
+        if cur["qps"] < prev["qps"] * min_gain:
+            return cur["concurrency"]
+    return None
+
+
+def run(
+    concurrency: List[int],
+    requests: int,
+    k: int = 6,
+    deadline_s: Optional[float] = None,
+    warmup: int = 2,
+) -> Dict[str, Any]:
+    from agents.research import get_retriever
+    from agents.workflow import answer_question, get_graph
+
+    questions = [q["question"] for q in json.loads(QUESTIONS_PATH.read_text(encoding="utf-8"))]
+
+    # Clients, Chroma and the compiled graph are built before the first timed level
+    get_retriever()
+    get_graph()
+    for q in questions[:warmup]:
+        answer_question(q, k=k)
+
+    levels = []
+    for c in concurrency:
+        level = _run_level(questions, c, requests, k, deadline_s)
+        levels.append(level)
+        lat = level["latency_ms"]
+        print(
+            f"c={c:<4} {level['qps']:>8.2f} q/s   p50 {lat['p50']:>8.0f}   p90 {lat['p90']:>8.0f}   "
+            f"p99 {lat['p99']:>8.0f} ms   errors {level['errors']:<4} degraded {level['degraded']}"
+        )
+
+    knee = _knee(levels)
+    if knee is not None:
+        print(f"Throughput saturates at concurrency ≈ {knee}")
+    return {"k": k, "deadline_s": deadline_s, "requests_per_level": requests, "levels": levels, "saturates_at": knee}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Concurrency sweep for answer_question.")
+    parser.add_argument("--concurrency", default="1,2,4,8,16,32", help="comma-separated levels")
+    parser.add_argument("--requests", type=int, default=100, help="requests per level")
+    parser.add_argument("--k", type=int, default=6)
+    parser.add_argument("--deadline", type=float, default=None, help="deadline_s per request")
+    parser.add_argument("--single-flight", action="store_true", help="keep request coalescing on")
+    parser.add_argument("--out", type=Path, default=None, help="write the curve as JSON")
+
+    stub = parser.add_argument_group("in-process stub (eval/stub_openai.py)")
+    stub.add_argument("--stub", action="store_true", help="start the stub and point the clients at it")
+    stub.add_argument("--stub-dim", type=int, default=1536)
+    stub.add_argument("--embed-latency", default="lognormal:30,0.3")
+    stub.add_argument("--chat-latency", default="lognormal:800,0.4")
+    stub.add_argument("--error-rate", type=float, default=0.0)
+    stub.add_argument("--rate-429", type=float, default=0.0)
+    stub.add_argument("--max-inflight", type=int, default=0)
+    args = parser.parse_args()
+
+    if not args.single_flight:
+        os.environ["SINGLE_FLIGHT"] = "0"
+    os.environ["WORKFLOW_CHECKPOINTS"] = "0"
+    os.environ["FAQ_ANSWERS"] = "0"
+    os.environ["EMBED_CACHE_MAX"] = "0"  # the same ~10 questions loop: measure embeddings, not cache hits
+
+    server = None
+    if args.stub:
+        from eval.stub_openai import make_stub_server
+
+        server = make_stub_server(
+            port=0,
+            dim=args.stub_dim,
+            embed_latency=args.embed_latency,
+            chat_latency=args.chat_latency,
+            error_rate=args.error_rate,
+            rate_429=args.rate_429,
+            max_inflight=args.max_inflight,
+        )
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        # Clients are created on first use, so they pick these up
+        os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{server.server_address[1]}/v1"
+        os.environ.setdefault("OPENAI_API_KEY", "stub")
+        os.environ.pop("OPENAI_CASSETTE", None)
+        print(f"[load] stub on {os.environ['OPENAI_BASE_URL']}", file=sys.stderr)
+
+    try:
+        report = run([int(c) for c in args.concurrency.split(",") if c.strip()], args.requests, args.k, args.deadline)
+    finally:
+        if server is not None:
+            server.shutdown()
+    if args.out:
+        args.out.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"Curve saved to: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
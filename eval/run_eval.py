@@ -1,26 +1,36 @@
 from __future__ import annotations
 
+import argparse
 import json
+import os
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterable, List
 
 # ✅ Ensure repo root is on PYTHONPATH (fixes: No module named 'agents')
 ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
-from agents.workflow import answer_question  # noqa: E402
+from agents.research import get_retriever  # noqa: E402
+from agents.workflow import answer_question, get_graph  # noqa: E402
+from eval.compare_reports import node_key  # noqa: E402
+from retrieval.citations import ParsedAnswer, parse_answer  # noqa: E402
 
 QUESTIONS_PATH = ROOT / "eval" / "questions.json"
 REPORT_PATH = ROOT / "eval" / "report.json"
+CHECKPOINT_PATH = ROOT / "eval" / "report.jsonl"
 
 
-def _extract_bracket_citations(text: str) -> List[str]:
-    import re
-    if not text:
-        return []
-    return [c.strip() for c in re.findall(r"\[([^\]]+)\]", text)]
+def _extract_bracket_citations(result: Dict[str, Any]) -> List[str]:
+    answer = result.get("answer") or ""
+    parsed = result.get("parsed_answer")
+    if not isinstance(parsed, ParsedAnswer) or parsed.text != answer:
+        parsed = parse_answer(answer)
+    return [g.inner.strip() for g in parsed.groups]
 
 
 def _is_not_found(result: Dict[str, Any]) -> bool:
@@ -40,64 +50,230 @@ def _allowed_citations_from_evidence(result: Dict[str, Any]) -> set[str]:
     return allowed
 
 
-def run(company_name: str = "KosovoTech LLC", k: int = 6) -> None:
-    questions = json.loads(QUESTIONS_PATH.read_text(encoding="utf-8"))
-    rows = []
-    passed = 0
+def _percentile(values: List[float], p: float) -> float:
+    """Linear-interpolated percentile (p in 0..100)."""
+    if not values:
+        return 0.0
+    xs = sorted(values)
+    pos = (len(xs) - 1) * p / 100.0
+    lo = int(pos)
+    hi = min(lo + 1, len(xs) - 1)
+    return xs[lo] + (xs[hi] - xs[lo]) * (pos - lo)
 
-    for q in questions:
-        qid = q["id"]
-        question = q["question"]
-        expect_found = bool(q["expect_found"])
 
-        result = answer_question(question, k=k, company_name=company_name)
+def _latency_stats(values: List[float]) -> Dict[str, Any]:
+    return {
+        "n": len(values),
+        "p50": round(_percentile(values, 50), 1),
+        "p90": round(_percentile(values, 90), 1),
+        "p99": round(_percentile(values, 99), 1),
+        "max": round(max(values), 1) if values else 0.0,
+    }
+
+
+def _evaluate(q: Dict[str, Any], result: Dict[str, Any], ms: float, company_name: str, k: int) -> Dict[str, Any]:
+    expect_found = bool(q["expect_found"])
+    not_found = _is_not_found(result)
+    verdict = (result.get("verdict") or {}).get("status", "UNKNOWN")
+    deliverable = result.get("deliverable") or {}
+    trace = result.get("trace") or []
+
+    # citation sanity check: answer citations must be subset of evidence citations
+    answer_cites = _extract_bracket_citations(result)
+    allowed = _allowed_citations_from_evidence(result)
+    out_of_set = [c for c in answer_cites if c not in allowed] if allowed else []
+
+    ok_found_logic = (expect_found and not not_found) or ((not expect_found) and not_found)
+    ok_verdict = (str(verdict).upper() == "PASS")
+    ok_cites = (len(out_of_set) == 0) if not not_found else True  # not-found doesn't require cites
+
+    return {
+        "id": q["id"],
+        "company_name": company_name,
+        "k": k,
+        "expect_found": expect_found,
+        "not_found": not_found,
+        "verdict": verdict,
+        "ok": ok_found_logic and ok_verdict and ok_cites,
+        "out_of_set_citations": out_of_set,
+        "sources_count": len(deliverable.get("sources") or []),
+        "ms": round(ms, 1),
+        "total_tokens": sum(int(t.get("total_tokens") or 0) for t in trace),
+        "trace": trace,
+    }
+
+
+def _load_checkpoint(path: Path, company_name: str, k: int) -> Dict[str, Dict[str, Any]]:
+    """Finished rows of an earlier (possibly crashed) run with the same settings, by id."""
+    done: Dict[str, Dict[str, Any]] = {}
+    if not path.exists():
+        return done
+    for line in path.read_text(encoding="utf-8").splitlines():
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError:
+            continue  # torn last line from a crash
+        if row.get("company_name") == company_name and row.get("k") == k:
+            done[row["id"]] = row
+    return done
+
+
+def _summarize(rows: List[Dict[str, Any]], ran: int, wall_s: float, workers: int) -> Dict[str, Any]:
+    """
+    Per-node latency percentiles (from trace "ms"), tokens per question and throughput.
+    Revision passes are their own "writer.revise" node (same keys as compare_reports).
+    """
+    by_node: Dict[str, List[float]] = {}
+    for row in rows:
+        for t in row.get("trace") or []:
+            if t.get("ms") is not None:
+                by_node.setdefault(node_key(t), []).append(float(t["ms"]))
+
+    tokens = [float(row.get("total_tokens") or 0) for row in rows]
+    return {
+        "latency_ms": {
+            "question": _latency_stats([float(row["ms"]) for row in rows if row.get("ms") is not None]),
+            "nodes": {node: _latency_stats(ms) for node, ms in sorted(by_node.items())},
+        },
+        "tokens": {
+            "total": int(sum(tokens)),
+            "per_question_mean": round(sum(tokens) / len(tokens), 1) if tokens else 0.0,
+            "per_question_p50": round(_percentile(tokens, 50), 1),
+        },
+        "throughput": {
+            "workers": workers,
+            "ran": ran,
+            "resumed": len(rows) - ran,
+            "wall_s": round(wall_s, 2),
+            "qps": round(ran / wall_s, 3) if wall_s > 0 else 0.0,
+        },
+    }
+
+
+def _print_row(row: Dict[str, Any]) -> None:
+    print(
+        f"{row['id']} | {'OK' if row['ok'] else 'FAIL'} | expect_found={row['expect_found']} "
+        f"| not_found={row['not_found']} | verdict={row['verdict']} | {row['ms']:.0f} ms"
+    )
+    if row["out_of_set_citations"]:
+        print(f"   ⚠ citations not in evidence: {row['out_of_set_citations']}")
+
+
+def run(
+    company_name: str = "KosovoTech LLC",
+    k: int = 6,
+    workers: int = 1,
+    checkpoint_path: Path | None = CHECKPOINT_PATH,
+    fresh: bool = False,
+    questions: Iterable[Dict[str, Any]] | None = None,
+    report_path: Path = REPORT_PATH,
+) -> Dict[str, Any]:
+    """
+    Runs the eval set and writes report.json.
+    - workers > 1 answers questions concurrently (one shared retriever / OpenAI pool)
+    - every finished row is appended to checkpoint_path (JSONL) as it completes;
+      a rerun with the same company/k skips ids already there (fresh=True starts over)
+    - the summary aggregates p50/p90/p99 per agent node, tokens per question and QPS
+    """
+    questions = list(questions if questions is not None else json.loads(QUESTIONS_PATH.read_text(encoding="utf-8")))
+
+    if checkpoint_path is not None and fresh and checkpoint_path.exists():
+        checkpoint_path.unlink()
+    done = _load_checkpoint(checkpoint_path, company_name, k) if checkpoint_path is not None else {}
+    todo = [q for q in questions if q["id"] not in done]
+    if done:
+        print(f"Resuming: {len(questions) - len(todo)} finished question(s) read from {checkpoint_path}")
+
+    ids = {q["id"] for q in questions}
+    rows: Dict[str, Dict[str, Any]] = {qid: row for qid, row in done.items() if qid in ids}
+    lock = threading.Lock()
 
-        not_found = _is_not_found(result)
-        verdict = (result.get("verdict") or {}).get("status", "UNKNOWN")
-        deliverable = result.get("deliverable") or {}
-        trace = result.get("trace") or []
+    def answer(q: Dict[str, Any]) -> Dict[str, Any]:
+        t0 = time.perf_counter()
+        result = answer_question(q["question"], k=k, company_name=company_name)
+        return _evaluate(q, result, (time.perf_counter() - t0) * 1000, company_name, k)
 
-        # citation sanity check: answer citations must be subset of evidence citations
-        answer_cites = _extract_bracket_citations(result.get("answer") or "")
-        allowed = _allowed_citations_from_evidence(result)
-        out_of_set = [c for c in answer_cites if c not in allowed] if allowed else []
+    def record(row: Dict[str, Any]) -> None:
+        with lock:
+            rows[row["id"]] = row
+            _print_row(row)
+            if checkpoint_path is not None:
+                with checkpoint_path.open("a", encoding="utf-8") as f:
+                    f.write(json.dumps(row, ensure_ascii=False) + "\n")
 
-        ok_found_logic = (expect_found and not not_found) or ((not expect_found) and not_found)
-        ok_verdict = (str(verdict).upper() == "PASS")
-        ok_cites = (len(out_of_set) == 0) if not not_found else True  # not-found doesn't require cites
+    if todo:
+        # Open the shared Chroma/OpenAI clients and compile the graph before workers race for them
+        # (kept out of the timed window so QPS reflects answering only)
+        get_retriever()
+        get_graph()
 
-        ok = ok_found_logic and ok_verdict and ok_cites
-        passed += 1 if ok else 0
+    t_start = time.perf_counter()
+    if todo:
 
-        rows.append({
-            "id": qid,
-            "expect_found": expect_found,
-            "not_found": not_found,
-            "verdict": verdict,
-            "ok": ok,
-            "out_of_set_citations": out_of_set,
-            "sources_count": len(deliverable.get("sources") or []),
-            "trace": trace,
-        })
+        pool = ThreadPoolExecutor(max_workers=max(1, min(workers, len(todo))))
+        try:
+            futures = {pool.submit(answer, q): q for q in todo}
+            for fut in as_completed(futures):
+                try:
+                    record(fut.result())
+                except Exception as e:
+                    # Not checkpointed: the question is retried on the next run
+                    print(f"{futures[fut]['id']} | ERROR | {e}")
+        finally:
+            pool.shutdown(wait=True)
+    wall_s = time.perf_counter() - t_start
 
-        print(f"{qid} | {'OK' if ok else 'FAIL'} | expect_found={expect_found} | not_found={not_found} | verdict={verdict}")
-        if out_of_set:
-            print(f"   ⚠ citations not in evidence: {out_of_set}")
+    ordered = [rows[q["id"]] for q in questions if q["id"] in rows]
+    ran = sum(1 for row in ordered if row["id"] not in done)
+    passed = sum(1 for row in ordered if row["ok"])
 
     summary = {
         "company_name": company_name,
         "k": k,
-        "total": len(rows),
+        "total": len(questions),
+        "answered": len(ordered),
         "passed": passed,
-        "failed": len(rows) - passed,
-        "results": rows,
+        "failed": len(questions) - passed,
+        **_summarize(ordered, ran, wall_s, workers),
+        "results": ordered,
     }
-    REPORT_PATH.write_text(json.dumps(summary, indent=2), encoding="utf-8")
+    report_path.write_text(json.dumps(summary, indent=2), encoding="utf-8")
 
     print("\n=== EVAL SUMMARY ===")
-    print(f"Passed: {passed}/{len(rows)}")
-    print(f"Report saved to: {REPORT_PATH}")
+    print(f"Passed: {passed}/{len(questions)}")
+    tp = summary["throughput"]
+    print(f"Ran {tp['ran']} question(s) in {tp['wall_s']} s with {workers} worker(s): {tp['qps']} q/s")
+    print(f"Tokens/question: {summary['tokens']['per_question_mean']} (total {summary['tokens']['total']})")
+    print("Latency ms (p50 / p90 / p99):")
+    lat = summary["latency_ms"]
+    for name, st in [("question", lat["question"]), *lat["nodes"].items()]:
+        print(f"  {name:<12} {st['p50']:>8} {st['p90']:>8} {st['p99']:>8}   (n={st['n']})")
+    print(f"Report saved to: {report_path}")
+    return summary
 
 
 if __name__ == "__main__":
-    run()
+    parser = argparse.ArgumentParser(description="Run the eval set against the workflow.")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("EVAL_WORKERS", "1")))
+    parser.add_argument("--k", type=int, default=6)
+    parser.add_argument("--company", default="KosovoTech LLC")
+    parser.add_argument("--checkpoint", type=Path, default=CHECKPOINT_PATH, help="JSONL of finished rows")
+    parser.add_argument("--fresh", action="store_true", help="ignore the checkpoint and re-run every question")
+    parser.add_argument(
+        "--cassette",
+        choices=["record", "replay", "auto"],
+        default=None,
+        help="record/replay OpenAI calls (OPENAI_CASSETTE, see retrieval/cassette.py)",
+    )
+    parser.add_argument("--cassette-latency", default=None, help='replay latency: ms or "recorded"')
+    args = parser.parse_args()
+    # The eval measures the pipeline: FAQ questions are not served from the warm-up store,
+    # and repeated questions / expansions are not served from the query-embedding cache
+    os.environ["FAQ_ANSWERS"] = "0"
+    os.environ["EMBED_CACHE_MAX"] = "0"
+    # Clients are created on first use, so the env is read in time
+    if args.cassette:
+        os.environ["OPENAI_CASSETTE"] = args.cassette
+    if args.cassette_latency is not None:
+        os.environ["CASSETTE_LATENCY"] = args.cassette_latency
+    run(args.company, args.k, args.workers, args.checkpoint, args.fresh)
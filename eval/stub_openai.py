@@ -0,0 +1,310 @@
+"""
+Local OpenAI-compatible stub for load and soak tests (stdlib only):
+
+  POST /v1/embeddings         deterministic hashed bag-of-words vectors (--dim)
+  POST /v1/chat/completions   deterministic cited answer built from the prompt's
+                              "EXCERPT n [citation]" headers (NOT_FOUND without excerpts);
+                              "stream": true answers with SSE chunks (latency spread over them)
+  GET  /stats                 request counts per endpoint / status
+
+Latency is drawn per request from a distribution spec:
+  fixed:MS | uniform:LO,HI | lognormal:MEDIAN,SIGMA | exp:MEAN   (milliseconds)
+and failures are injected with --error-rate (500) and --rate-429 (429 + Retry-After);
+--max-inflight answers 429 above N concurrent requests, like a real rate limit.
+
+Point the app at it (the OpenAI clients read OPENAI_BASE_URL):
+  python eval/stub_openai.py --port 8100 --chat-latency lognormal:800,0.4
+  OPENAI_BASE_URL=http://127.0.0.1:8100/v1 OPENAI_API_KEY=stub python eval/load_test.py
+
+Stub vectors only rank sensibly against a collection ingested through the stub too
+(same --dim as the collection, e.g. 1536 for text-embedding-3-small).
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import math
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional
+
+NOT_FOUND = "Not found in provided sources."
+
+# Same header format as agents.research.format_evidence
+_EXCERPT_RE = re.compile(r"^EXCERPT \d+ (\[[^\n]+\])\n(.*?)(?=\n\n---\n\n|\Z)", re.M | re.S)
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """Latency spec -> sampler returning seconds."""
+    kind, _, args = (spec or "fixed:0").partition(":")
+    vals = [float(v) for v in args.split(",") if v.strip()] or [0.0]
+    kind = kind.strip().lower()
+    if kind == "fixed":
+        return lambda rng: vals[0] / 1000
+    if kind == "uniform":
+        lo, hi = vals[0], vals[1] if len(vals) > 1 else vals[0]
+        return lambda rng: rng.uniform(lo, hi) / 1000
+    if kind == "lognormal":
+        median, sigma = vals[0], vals[1] if len(vals) > 1 else 0.5
+        return lambda rng: rng.lognormvariate(math.log(max(median, 1e-3)), sigma) / 1000
+    if kind == "exp":
+        return lambda rng: rng.expovariate(1.0 / max(vals[0], 1e-3)) / 1000
+    raise ValueError(f"Unknown latency distribution: {spec!r}")
+
+
+def embed_text(text: str, dim: int) -> List[float]:
+    """Hashed bag-of-words, L2-normalized: the same text always gets the same vector."""
+    v = [0.0] * dim
+    for w in _WORD_RE.findall((text or "").lower()):
+        h = int(hashlib.md5(w.encode("utf-8")).hexdigest(), 16)
+        v[h % dim] += 1.0 if (h >> 64) & 1 else -1.0
+    norm = math.sqrt(sum(x * x for x in v)) or 1.0
+    return [x / norm for x in v]
+
+
+def cited_answer(prompt: str) -> str:
+    """
+    Deterministic grounded answer: one paragraph per leading excerpt, reusing the
+    excerpt's own words and ending with its exact citation. Paragraph-revision
+    prompts ("PARAGRAPH TO FIX") get a single paragraph back.
+    """
+    excerpts = _EXCERPT_RE.findall(prompt or "")
+    if not excerpts:
+        return NOT_FOUND
+    n = 1 if "PARAGRAPH TO FIX" in prompt else 2
+    paragraphs = []
+    for citation, text in excerpts[:n]:
+        words = " ".join(text.split()).split(" ")[:30]
+        paragraphs.append(f"{' '.join(words).rstrip('.,;:')} {citation}.")
+    return "\n\n".join(paragraphs)
+
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class StubState:
+    def __init__(
+        self,
+        dim: int,
+        embed_latency: str,
+        chat_latency: str,
+        error_rate: float,
+        rate_429: float,
+        max_inflight: int,
+        seed: int,
+    ):
+        self.dim = dim
+        self.embed_latency = parse_latency(embed_latency)
+        self.chat_latency = parse_latency(chat_latency)
+        self.error_rate = error_rate
+        self.rate_429 = rate_429
+        self.max_inflight = max_inflight
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._inflight = 0
+        self.counts: Dict[str, int] = {}
+
+    def admit(self) -> Optional[int]:
+        """None = serve; otherwise the status code to fail the request with."""
+        with self._lock:
+            if self.max_inflight and self._inflight >= self.max_inflight:
+                return 429
+            r = self._rng.random()
+            if r < self.rate_429:
+                return 429
+            if r < self.rate_429 + self.error_rate:
+                return 500
+            self._inflight += 1
+            return None
+
+    def release(self) -> None:
+        with self._lock:
+            self._inflight -= 1
+
+    def sample(self, sampler: Callable[[random.Random], float]) -> float:
+        with self._lock:
+            return sampler(self._rng)
+
+    def count(self, key: str) -> None:
+        with self._lock:
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    state: StubState  # set by make_stub_server
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+    def log_message(self, fmt: str, *args: Any) -> None:
+        pass  # hundreds of QPS: stats instead of access logs
+
+    def _send_json(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        if self.path == "/stats":
+            self._send_json(200, {"counts": dict(self.state.counts)})
+        else:
+            self._send_json(404, {"error": {"message": "Not found."}})
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            return self._send_json(400, {"error": {"message": "Invalid JSON.", "type": "invalid_request_error"}})
+
+        path = self.path.rstrip("/")
+        if path.endswith("/embeddings"):
+            endpoint, sampler, handler = "embeddings", self.state.embed_latency, self._embeddings
+        elif path.endswith("/chat/completions"):
+            endpoint, sampler, handler = "chat", self.state.chat_latency, self._chat
+        else:
+            return self._send_json(404, {"error": {"message": "Not found."}})
+
+        failure = self.state.admit()
+        if failure is not None:
+            self.state.count(f"{endpoint}:{failure}")
+            if failure == 429:
+                return self._send_json(
+                    429,
+                    {"error": {"message": "Rate limit reached (stub).", "type": "rate_limit_error"}},
+                    headers={"Retry-After": "0.1"},
+                )
+            return self._send_json(500, {"error": {"message": "Injected server error (stub).", "type": "server_error"}})
+
+        try:
+            latency = self.state.sample(sampler)
+            payload = handler(body)
+            if endpoint == "chat" and body.get("stream"):
+                # ~30% before the first token, the rest spread over the chunks
+                time.sleep(latency * 0.3)
+                include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+                self._send_stream(payload, latency * 0.7, include_usage)
+            else:
+                time.sleep(latency)
+                self._send_json(200, payload)
+        finally:
+            self.state.release()
+        self.state.count(f"{endpoint}:200")
+
+    def _send_stream(self, payload: Dict[str, Any], spread_s: float, include_usage: bool) -> None:
+        content = payload["choices"][0]["message"]["content"]
+        pieces = re.findall(r"\s*\S+\s*", content) or [content]
+        base = {"object": "chat.completion.chunk", **{k: payload[k] for k in ("id", "created", "model")}}
+        chunks = [
+            {**base, "choices": [{"index": 0, "delta": {"content": p}, "finish_reason": None}]}
+            for p in pieces
+        ]
+        chunks.append({**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+        if include_usage:
+            chunks.append({**base, "choices": [], "usage": payload["usage"]})
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")  # no Content-Length: the stream ends with the connection
+        self.end_headers()
+        self.close_connection = True
+        for chunk in chunks:
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+            time.sleep(spread_s / len(chunks))
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def _embeddings(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        inputs = body.get("input")
+        inputs = inputs if isinstance(inputs, list) else [inputs]
+        tokens = sum(_tokens(str(x)) for x in inputs)
+        return {
+            "object": "list",
+            "model": body.get("model", "stub-embedding"),
+            "data": [
+                {"object": "embedding", "index": i, "embedding": embed_text(str(x), self.state.dim)}
+                for i, x in enumerate(inputs)
+            ],
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        }
+
+    def _chat(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        messages = body.get("messages") or []
+        prompt = str((messages[-1] or {}).get("content", "")) if messages else ""
+        content = cited_answer(prompt)
+        prompt_tokens = sum(_tokens(str(m.get("content", ""))) for m in messages)
+        completion_tokens = _tokens(content)
+        return {
+            "id": "chatcmpl-stub-" + hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:12],
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub-chat"),
+            "choices": [
+                {"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}
+            ],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+
+def make_stub_server(
+    host: str = "127.0.0.1",
+    port: int = 8100,
+    dim: int = 1536,
+    embed_latency: str = "fixed:0",
+    chat_latency: str = "fixed:0",
+    error_rate: float = 0.0,
+    rate_429: float = 0.0,
+    max_inflight: int = 0,
+    seed: int = 0,
+) -> ThreadingHTTPServer:
+    state = StubState(dim, embed_latency, chat_latency, error_rate, rate_429, max_inflight, seed)
+    handler = type("Handler", (StubHandler,), {"state": state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stub for load tests.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--dim", type=int, default=1536, help="embedding size (match the collection)")
+    parser.add_argument("--embed-latency", default="lognormal:30,0.3")
+    parser.add_argument("--chat-latency", default="lognormal:800,0.4")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction answered 500")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="fraction answered 429")
+    parser.add_argument("--max-inflight", type=int, default=0, help="429 above N concurrent requests (0 = off)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = make_stub_server(
+        args.host, args.port, args.dim, args.embed_latency, args.chat_latency,
+        args.error_rate, args.rate_429, args.max_inflight, args.seed,
+    )
+    print(f"[stub] OpenAI-compatible stub on http://{args.host}:{args.port}/v1", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
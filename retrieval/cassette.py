@@ -0,0 +1,287 @@
+"""
+Record/replay cassettes for the OpenAI calls on the answer path (embeddings + chat):
+
+  OPENAI_CASSETTE=record   call OpenAI and append request-hash -> response to the cassette
+  OPENAI_CASSETTE=replay   serve responses from the cassette only (no network, no API key);
+                           a request that was never recorded raises CassetteMiss
+  OPENAI_CASSETTE=auto     replay what is recorded, record the rest
+  OPENAI_CASSETTE_PATH     cassette file (JSONL, default eval/cassettes/openai.jsonl)
+  CASSETTE_LATENCY         replay latency: 0 (default), a fixed number of ms, or
+                           "recorded" (the latency observed while recording)
+
+Replay still honours with_options(timeout=...): an injected latency longer than the
+timeout raises openai.APITimeoutError after `timeout` seconds, like the real client.
+The request hash covers the model and the full input (texts / messages, temperature),
+so a replayed run is deterministic as long as the pipeline builds the same prompts.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_CASSETTE_PATH = ROOT / "eval" / "cassettes" / "openai.jsonl"
+
+_MODES = ("record", "replay", "auto")
+
+# A streamed chat request shares the cassette entry of the same request without streaming
+_STREAM_ARGS = ("stream", "stream_options")
+
+
+class CassetteMiss(KeyError):
+    """Replay mode got a request that is not in the cassette."""
+
+
+def cassette_mode() -> Optional[str]:
+    mode = os.getenv("OPENAI_CASSETTE", "").strip().lower()
+    return mode if mode in _MODES else None
+
+
+def _request_key(kind: str, request: Dict[str, Any]) -> str:
+    payload = json.dumps({"kind": kind, **request}, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _usage(resp: Any) -> Dict[str, int]:
+    usage = getattr(resp, "usage", None)
+    return {
+        k: int(getattr(usage, k, 0) or 0)
+        for k in ("prompt_tokens", "completion_tokens", "total_tokens")
+    }
+
+
+def _dump(kind: str, resp: Any) -> Dict[str, Any]:
+    """The parts of an OpenAI response the pipeline reads."""
+    if kind == "embeddings":
+        return {"data": [{"embedding": list(d.embedding)} for d in resp.data], "usage": _usage(resp)}
+    return {
+        "choices": [{"message": {"content": c.message.content}} for c in resp.choices],
+        "usage": _usage(resp),
+    }
+
+
+def _stream_chunks(response: Dict[str, Any]) -> List[Any]:
+    """A recorded chat response as stream chunks: one per word, then a usage-only chunk."""
+    content = ((response.get("choices") or [{}])[0].get("message") or {}).get("content") or ""
+    chunks = [
+        _load({"choices": [{"delta": {"content": piece}}], "usage": None})
+        for piece in re.findall(r"\s*\S+\s*", content) or [content]
+    ]
+    chunks.append(_load({"choices": [], "usage": response.get("usage")}))
+    return chunks
+
+
+def _streamed_dump(text: str, usage: Any) -> Dict[str, Any]:
+    return {"choices": [{"message": {"content": text}}], "usage": _usage(SimpleNamespace(usage=usage))}
+
+
+def _load(value: Any) -> Any:
+    """JSON -> attribute access (resp.data[0].embedding, resp.choices[0].message.content)."""
+    if isinstance(value, dict):
+        return SimpleNamespace(**{k: _load(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return [_load(v) for v in value]
+    return value
+
+
+class Cassette:
+    """Append-only JSONL of {"key", "kind", "model", "ms", "response"}; later lines win."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: Optional[Dict[str, Dict[str, Any]]] = None
+
+    def _index(self) -> Dict[str, Dict[str, Any]]:
+        if self._entries is None:
+            entries: Dict[str, Dict[str, Any]] = {}
+            if self.path.exists():
+                for line in self.path.read_text(encoding="utf-8").splitlines():
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # torn line from an interrupted recording
+                    entries[entry["key"]] = entry
+            self._entries = entries
+        return self._entries
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._index().get(key)
+
+    def put(self, key: str, kind: str, model: str, ms: float, response: Dict[str, Any]) -> None:
+        entry = {"key": key, "kind": kind, "model": model, "ms": round(ms, 1), "response": response}
+        with self._lock:
+            self._index()[key] = entry
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._index())
+
+
+_CASSETTES: Dict[str, Cassette] = {}
+_CASSETTES_LOCK = threading.Lock()
+
+
+def get_cassette(path: Optional[Path] = None) -> Cassette:
+    path = Path(path or os.getenv("OPENAI_CASSETTE_PATH") or DEFAULT_CASSETTE_PATH)
+    with _CASSETTES_LOCK:
+        cassette = _CASSETTES.get(str(path))
+        if cassette is None:
+            cassette = _CASSETTES[str(path)] = Cassette(path)
+        return cassette
+
+
+def _replay_delay(entry: Dict[str, Any]) -> float:
+    """Seconds to sleep before serving a replayed response."""
+    setting = os.getenv("CASSETTE_LATENCY", "0").strip().lower()
+    if setting == "recorded":
+        return float(entry.get("ms") or 0.0) / 1000
+    try:
+        return max(0.0, float(setting)) / 1000
+    except ValueError:
+        return 0.0
+
+
+def _timeout_error() -> Exception:
+    import httpx
+    from openai import APITimeoutError
+
+    return APITimeoutError(request=httpx.Request("POST", "https://cassette.invalid/"))
+
+
+class _Endpoint:
+    """Stands in for client.embeddings / client.chat.completions."""
+
+    def __init__(self, owner: "CassetteClient", kind: str):
+        self._owner = owner
+        self._kind = kind
+
+    def _inner_endpoint(self) -> Any:
+        inner = self._owner._inner
+        if inner is None:
+            raise CassetteMiss(f"OPENAI_CASSETTE=replay: no client to record a missing {self._kind} request")
+        return inner.embeddings if self._kind == "embeddings" else inner.chat.completions
+
+    def _lookup(self, request: Dict[str, Any]) -> tuple[str, Optional[Dict[str, Any]]]:
+        key = _request_key(self._kind, {k: v for k, v in request.items() if k not in _STREAM_ARGS})
+        entry = None if self._owner.mode == "record" else self._owner.cassette.get(key)
+        if entry is None and self._owner.mode == "replay":
+            raise CassetteMiss(f"{self._kind} request {key[:12]} not in {self._owner.cassette.path}")
+        return key, entry
+
+    def create(self, **request: Any) -> Any:
+        key, entry = self._lookup(request)
+        if entry is not None:
+            delay, timeout = _replay_delay(entry), self._owner.timeout
+            if timeout is not None and delay > timeout:
+                time.sleep(timeout)
+                raise _timeout_error()
+            time.sleep(delay)
+            if request.get("stream"):
+                return iter(_stream_chunks(entry["response"]))
+            return _load(entry["response"])
+
+        t0 = time.perf_counter()
+        resp = self._inner_endpoint().create(**request)
+        if request.get("stream"):
+            return self._record_stream(key, request, t0, resp)
+        self._owner.record(key, self._kind, request, t0, resp)
+        return resp
+
+    def _record_stream(self, key: str, request: Dict[str, Any], t0: float, stream: Any) -> Iterator[Any]:
+        """Passes the chunks through and records the assembled response once the stream ends."""
+        parts, usage = [], None
+        for chunk in stream:
+            usage = getattr(chunk, "usage", None) or usage
+            for choice in getattr(chunk, "choices", None) or []:
+                parts.append(getattr(choice.delta, "content", None) or "")
+            yield chunk
+        ms = (time.perf_counter() - t0) * 1000
+        self._owner.cassette.put(key, self._kind, str(request.get("model")), ms, _streamed_dump("".join(parts), usage))
+
+
+class _AsyncEndpoint(_Endpoint):
+    async def create(self, **request: Any) -> Any:
+        key, entry = self._lookup(request)
+        if entry is not None:
+            delay, timeout = _replay_delay(entry), self._owner.timeout
+            if timeout is not None and delay > timeout:
+                await asyncio.sleep(timeout)
+                raise _timeout_error()
+            await asyncio.sleep(delay)
+            if request.get("stream"):
+                return self._replay_stream(entry["response"])
+            return _load(entry["response"])
+
+        t0 = time.perf_counter()
+        resp = await self._inner_endpoint().create(**request)
+        if request.get("stream"):
+            return self._arecord_stream(key, request, t0, resp)
+        self._owner.record(key, self._kind, request, t0, resp)
+        return resp
+
+    async def _replay_stream(self, response: Dict[str, Any]) -> AsyncIterator[Any]:
+        for chunk in _stream_chunks(response):
+            yield chunk
+
+    async def _arecord_stream(self, key: str, request: Dict[str, Any], t0: float, stream: Any) -> AsyncIterator[Any]:
+        parts, usage = [], None
+        async for chunk in stream:
+            usage = getattr(chunk, "usage", None) or usage
+            for choice in getattr(chunk, "choices", None) or []:
+                parts.append(getattr(choice.delta, "content", None) or "")
+            yield chunk
+        ms = (time.perf_counter() - t0) * 1000
+        self._owner.cassette.put(key, self._kind, str(request.get("model")), ms, _streamed_dump("".join(parts), usage))
+
+
+class CassetteClient:
+    """
+    Drop-in for OpenAI / AsyncOpenAI on the answer path (embeddings.create,
+    chat.completions.create, with_options). inner=None is a replay-only client.
+    """
+
+    def __init__(
+        self,
+        inner: Any,
+        cassette: Cassette,
+        mode: str,
+        asynchronous: bool = False,
+        timeout: Optional[float] = None,
+    ):
+        self._inner = inner
+        self.cassette = cassette
+        self.mode = mode
+        self.asynchronous = asynchronous
+        self.timeout = timeout
+        endpoint = _AsyncEndpoint if asynchronous else _Endpoint
+        self.embeddings = endpoint(self, "embeddings")
+        self.chat = SimpleNamespace(completions=endpoint(self, "chat"))
+
+    def record(self, key: str, kind: str, request: Dict[str, Any], t0: float, resp: Any) -> None:
+        ms = (time.perf_counter() - t0) * 1000
+        self.cassette.put(key, kind, str(request.get("model")), ms, _dump(kind, resp))
+
+    def with_options(self, **options: Any) -> "CassetteClient":
+        inner = self._inner.with_options(**options) if self._inner is not None else None
+        timeout = options.get("timeout", self.timeout)
+        return CassetteClient(
+            inner,
+            self.cassette,
+            self.mode,
+            self.asynchronous,
+            float(timeout) if isinstance(timeout, (int, float)) else self.timeout,
+        )
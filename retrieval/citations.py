@@ -1,6 +1,14 @@
 from __future__ import annotations
+import re
 from dataclasses import dataclass
-from typing import Optional
+from typing import List, Optional, Tuple
+
+
+# Compiled once, shared by every stage (workflow, verifier, deliverer, UI, eval)
+_BRACKET_RE = re.compile(r"\[([^\]]+)\]")
+_PARAGRAPH_SEP_RE = re.compile(r"\n\s*\n")
+_MULTI_CITE_SPLIT_RE = re.compile(r"\s*[;,]\s*")
+_PAGE_RE = re.compile(r"^p\.?\s*(\d+)$", re.IGNORECASE)
 
 
 @dataclass(frozen=True)
@@ -14,3 +22,154 @@ class Citation:
         if self.page is not None:
             return f"[{self.doc_name} | p.{self.page} | {self.chunk_id}]"
         return f"[{self.doc_name} | {self.chunk_id}]"
+
+    @classmethod
+    def parse(cls, inner: str) -> "Citation":
+        """
+        Parses one citation (without brackets): "Doc | p.3 | chunk" / "Doc | chunk" / "chunk".
+        The chunk id is always the last '|' segment (stable across formatting).
+        """
+        segments = [s.strip() for s in (inner or "").split("|")]
+        chunk_id = segments[-1] if segments else ""
+        doc_name = segments[0] if len(segments) > 1 else ""
+        page = None
+        for seg in segments[1:-1]:
+            m = _PAGE_RE.match(seg)
+            if m:
+                page = int(m.group(1))
+        return cls(doc_name=doc_name, chunk_id=chunk_id, page=page)
+
+
+@dataclass(frozen=True)
+class CitationGroup:
+    """One [ ... ] occurrence in the text; may hold several ';'/','-separated citations."""
+    start: int
+    end: int
+    inner: str
+    pieces: Tuple[str, ...]
+    citations: Tuple[Citation, ...]
+
+    @property
+    def raw(self) -> str:
+        return f"[{self.inner}]"
+
+
+@dataclass(frozen=True)
+class Paragraph:
+    index: int
+    start: int
+    end: int
+    text: str
+    groups: Tuple[CitationGroup, ...]
+
+    @property
+    def has_citation(self) -> bool:
+        return bool(self.groups)
+
+    def chunk_ids(self) -> List[str]:
+        return [c.chunk_id for g in self.groups for c in g.citations if c.chunk_id]
+
+
+@dataclass(frozen=True)
+class ParsedAnswer:
+    """
+    An answer tokenized once into paragraphs, text spans and citations.
+    Stored in workflow state so downstream stages don't re-scan the text.
+    """
+    text: str
+    paragraphs: Tuple[Paragraph, ...]
+    groups: Tuple[CitationGroup, ...]
+
+    def chunk_ids(self) -> List[str]:
+        return [c.chunk_id for g in self.groups for c in g.citations if c.chunk_id]
+
+    def sources(self, split: bool = True) -> List[str]:
+        """
+        Unique citations preserving order.
+        split=True  -> one entry per citation ("A | x; B | y" gives two)
+        split=False -> one entry per bracket group
+        """
+        seen = set()
+        out = []
+        for g in self.groups:
+            for s in (g.pieces if split else (g.inner.strip(),)):
+                if s and s not in seen:
+                    seen.add(s)
+                    out.append(s)
+        return out
+
+    def spans(self) -> List[str]:
+        """Text between citations, in order."""
+        out = []
+        pos = 0
+        for g in self.groups:
+            out.append(self.text[pos:g.start])
+            pos = g.end
+        out.append(self.text[pos:])
+        return out
+
+    def without_citations(self, collapse_whitespace: bool = False) -> str:
+        """Text with every [ ... ] removed (optionally collapsed onto one line)."""
+        if not collapse_whitespace:
+            return "".join(self.spans()).strip()
+        cleaned = re.sub(r"\s+", " ", " ".join(s.strip() for s in self.spans())).strip()
+        return re.sub(r"\s+([.,;:!?])", r"\1", cleaned)
+
+
+def _split_multi_cites(inner: str) -> Tuple[str, ...]:
+    """
+    Supports multiple citations inside one bracket, separated by ';' or ','.
+    Example:
+      "A | x; B | y" -> ("A | x", "B | y")
+    """
+    return tuple(p.strip() for p in _MULTI_CITE_SPLIT_RE.split((inner or "").strip()) if p.strip())
+
+
+def parse_answer(text: str) -> ParsedAnswer:
+    """
+    Single pass over the text: paragraphs are blank-line separated (empty ones skipped),
+    each [ ... ] becomes a CitationGroup and is attached to the paragraph containing it.
+    """
+    text = text or ""
+
+    groups = []
+    for m in _BRACKET_RE.finditer(text):
+        pieces = _split_multi_cites(m.group(1))
+        groups.append(
+            CitationGroup(
+                start=m.start(),
+                end=m.end(),
+                inner=m.group(1),
+                pieces=pieces,
+                citations=tuple(Citation.parse(p) for p in pieces),
+            )
+        )
+
+    bounds = []
+    pos = 0
+    for sep in _PARAGRAPH_SEP_RE.finditer(text):
+        bounds.append((pos, sep.start()))
+        pos = sep.end()
+    bounds.append((pos, len(text)))
+
+    paragraphs = []
+    gi = 0
+    for start, end in bounds:
+        chunk = text[start:end]
+        if not chunk.strip():
+            continue
+        lead = len(chunk) - len(chunk.lstrip())
+        start, end = start + lead, start + len(chunk.rstrip())
+
+        while gi < len(groups) and groups[gi].start < start:
+            gi += 1
+        own = []
+        while gi < len(groups) and groups[gi].end <= end:
+            own.append(groups[gi])
+            gi += 1
+
+        paragraphs.append(
+            Paragraph(index=len(paragraphs), start=start, end=end, text=text[start:end], groups=tuple(own))
+        )
+
+    return ParsedAnswer(text=text, paragraphs=tuple(paragraphs), groups=tuple(groups))
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import threading
+from typing import TYPE_CHECKING
+
+from dotenv import load_dotenv
+
+if TYPE_CHECKING:  # openai is imported on first use (~1 s), not at startup
+    from openai import AsyncOpenAI, OpenAI
+
+load_dotenv()
+
+_LOCK = threading.Lock()
+_OPENAI: OpenAI | None = None
+
+
+def _with_cassette(make_client, asynchronous: bool):
+    """Client for OPENAI_CASSETTE (record/replay/auto, see retrieval/cassette.py); replay never builds a real one."""
+    from retrieval.cassette import CassetteClient, cassette_mode, get_cassette
+
+    mode = cassette_mode()
+    if mode is None:
+        return make_client()
+    inner = None if mode == "replay" else make_client()
+    return CassetteClient(inner, get_cassette(), mode, asynchronous=asynchronous)
+
+
+def get_openai() -> OpenAI:
+    """
+    Process-wide OpenAI client.
+    One client = one HTTP connection pool, shared by retrieval and the writer
+    (and safe to use from worker threads).
+    """
+    global _OPENAI
+    if _OPENAI is None:
+        with _LOCK:
+            if _OPENAI is None:
+                def make_client():
+                    from openai import OpenAI
+
+                    return OpenAI()
+
+                _OPENAI = _with_cassette(make_client, asynchronous=False)
+    return _OPENAI
+
+
+_ASYNC_OPENAI: AsyncOpenAI | None = None
+
+
+def get_async_openai() -> AsyncOpenAI:
+    """Process-wide AsyncOpenAI client for the async workflow (one pool for all in-flight questions)."""
+    global _ASYNC_OPENAI
+    if _ASYNC_OPENAI is None:
+        with _LOCK:
+            if _ASYNC_OPENAI is None:
+                def make_client():
+                    from openai import AsyncOpenAI
+
+                    return AsyncOpenAI()
+
+                _ASYNC_OPENAI = _with_cassette(make_client, asynchronous=True)
+    return _ASYNC_OPENAI
+
+
+def api_timeout_error() -> type:
+    """
+    openai.APITimeoutError, resolved lazily so callers can write
+    `except api_timeout_error():` without importing openai at module load
+    (an except clause is only evaluated when an exception is being matched).
+    """
+    from openai import APITimeoutError
+
+    return APITimeoutError
@@ -12,6 +12,8 @@ from dotenv import load_dotenv
 from openai import OpenAI
 from pypdf import PdfReader
 
+from retrieval.versions import gc, next_version, publish, versioned_name
+
 load_dotenv()
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
@@ -129,14 +131,16 @@ def ingest(
 
     client = chromadb.PersistentClient(path=persist_dir)
 
-    log.info("Resetting Chroma collection...")
-    try:
-        client.delete_collection(collection_name)
-        log.info("Deleted existing collection.")
-    except Exception:
-        log.info("No existing collection to delete (ok).")
+    # Blue/green: build a new versioned collection while readers keep serving the
+    # published one; it only goes live (alias swap) once the build is complete
+    target = versioned_name(collection_name, next_version(client, persist_dir, collection_name))
+    log.info(f"Building {target} (current version keeps serving)...")
 
-    collection = client.get_or_create_collection(name=collection_name)
+    # Ingest stamp = collection version (Retriever.version() puts it into cache keys)
+    collection = client.create_collection(
+        name=target,
+        metadata={"ingested_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())},
+    )
     log.info("Collection ready. Starting scan...")
 
     oai = OpenAI()
@@ -148,6 +152,13 @@ def ingest(
     total_chunks = 0
     total_files = 0
 
+    def publish_version() -> None:
+        publish(persist_dir, collection_name, target)
+        log.info(f"Published {collection_name} -> {target}")
+        deleted = gc(client, persist_dir, collection_name)
+        if deleted:
+            log.info(f"Garbage-collected old versions: {', '.join(deleted)}")
+
     def flush() -> None:
         if not buf_docs:
             return
@@ -194,6 +205,7 @@ def ingest(
                             if total_chunks >= max_total_chunks:
                                 log.warning(f"Reached MAX_TOTAL_CHUNKS={max_total_chunks}. Stopping early.")
                                 flush()
+                                publish_version()
                                 log.info("=== INGEST END (EARLY STOP) ===")
                                 return
 
@@ -216,6 +228,7 @@ def ingest(
                         if total_chunks >= max_total_chunks:
                             log.warning(f"Reached MAX_TOTAL_CHUNKS={max_total_chunks}. Stopping early.")
                             flush()
+                            publish_version()
                             log.info("=== INGEST END (EARLY STOP) ===")
                             return
 
@@ -228,5 +241,6 @@ def ingest(
                 continue
 
     flush()
+    publish_version()
     log.info(f"[OK] Done. Files processed: {total_files}. Total chunks: {total_chunks}.")
     log.info(f"=== INGEST END in {time.time() - overall_t0:.1f}s ===")
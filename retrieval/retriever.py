@@ -1,18 +1,24 @@
 from __future__ import annotations
 
+import asyncio
 import os
-from typing import Any, Dict, List, Optional
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
 
-import chromadb
 from dotenv import load_dotenv
-from openai import OpenAI
 
 from retrieval.citations import Citation
+from retrieval.clients import get_async_openai, get_openai
+from retrieval.versions import alias_path, read_alias
 
 load_dotenv()
 
 PERSIST_DIR = "storage/chroma"
 COLLECTION_NAME = "hr_docs"
+HOLIDAYS_DOC = "KOS_Law_03-L-064_Official_Holidays_EN.pdf"
 
 
 class Retriever:
@@ -22,23 +28,124 @@ class Retriever:
         collection_name: str = COLLECTION_NAME,
         embed_model: Optional[str] = None,
     ):
+        import chromadb  # heavy (~1 s); only paid when a Retriever is actually built
+
         self.client = chromadb.PersistentClient(path=persist_dir)
-        self.collection = self.client.get_or_create_collection(name=collection_name)
+        self.persist_dir = persist_dir
+        self.collection_name = collection_name
+        # Blue/green (retrieval/versions.py): the alias file names the current versioned
+        # collection; it is re-checked at most every ALIAS_POLL_S, so a published re-ingest
+        # or a rollback is served without a restart. No alias = the plain collection.
+        self._alias_poll_s = float(os.getenv("ALIAS_POLL_S", "1.0"))
+        self._alias_mtime: Optional[int] = None
+        self._alias_checked = time.monotonic()
+        self._collection = None
+        self._follow_alias()
+        if self._collection is None:
+            self._collection = self.client.get_or_create_collection(name=collection_name)
         self.embed_model = embed_model or os.getenv("EMBED_MODEL", "text-embedding-3-small")
-        self.oai = OpenAI()
+        self.oai = get_openai()
+        # Query embeddings are a pure function of (model, text): repeated questions skip the API
+        self._emb_cache: "OrderedDict[Tuple[str, str], List[float]]" = OrderedDict()
+        self._emb_cache_max = int(os.getenv("EMBED_CACHE_MAX", "1024"))
+        self._emb_lock = threading.Lock()
+
+    @property
+    def collection(self):
+        """The collection currently published under collection_name."""
+        now = time.monotonic()
+        if now - self._alias_checked >= self._alias_poll_s:
+            self._alias_checked = now
+            self._follow_alias()
+        return self._collection
+
+    def _follow_alias(self) -> None:
+        try:
+            mtime = alias_path(self.persist_dir, self.collection_name).stat().st_mtime_ns
+        except OSError:
+            return
+        if mtime == self._alias_mtime:
+            return
+        target = (read_alias(self.persist_dir, self.collection_name) or {}).get("current")
+        if target and (self._collection is None or target != self._collection.name):
+            try:
+                self._collection = self.client.get_collection(name=target)
+            except Exception:
+                # Published name not openable (yet): keep serving the current one, retry next poll
+                return
+        self._alias_mtime = mtime
+
+    def version(self) -> str:
+        """
+        Identity of the indexed corpus: collection id + ingest stamp.
+        Both change on every re-ingest, so caches keyed by it never serve stale answers.
+        """
+        meta = self.collection.metadata or {}
+        return f"{self.collection.id}:{meta.get('ingested_at', '')}"
+
+    def warm(self) -> int:
+        """
+        Load the collection's HNSW index into memory with one local query (a stored
+        chunk vector, no API call); otherwise the first user query pays for it.
+        Returns the chunk count.
+        """
+        count = self.collection.count()
+        if count:
+            got = self.collection.get(limit=1, include=["embeddings"])
+            vectors = got.get("embeddings")
+            if vectors is not None and len(vectors):
+                self.collection.query(query_embeddings=[list(vectors[0])], n_results=1, include=[])
+        return count
+
+    def _cached_embedding(self, query: str) -> Optional[List[float]]:
+        with self._emb_lock:
+            emb = self._emb_cache.get((self.embed_model, query))
+            if emb is not None:
+                self._emb_cache.move_to_end((self.embed_model, query))
+            return emb
+
+    def _remember_embedding(self, query: str, emb: List[float]) -> List[float]:
+        with self._emb_lock:
+            self._emb_cache[(self.embed_model, query)] = emb
+            while len(self._emb_cache) > max(0, self._emb_cache_max):
+                self._emb_cache.popitem(last=False)
+        return emb
+
+    def cached_embedding(self, query: str) -> Optional[List[float]]:
+        """Query embedding if it is already in the cache (no API call), else None."""
+        return self._cached_embedding((query or "").strip())
 
-    def _embed_query(self, query: str) -> List[float]:
-        resp = self.oai.embeddings.create(model=self.embed_model, input=query)
-        return resp.data[0].embedding
+    def embed(self, query: str, timeout: Optional[float] = None) -> List[float]:
+        """Query embedding (reusable across searches / turns via search(..., embedding=...))."""
+        return self._embed_query((query or "").strip(), timeout)
 
-    def search(self, query: str, k: int = 6) -> List[Dict[str, Any]]:
-        import re
+    async def aembed(self, query: str, timeout: Optional[float] = None) -> List[float]:
+        return await self._aembed_query((query or "").strip(), timeout)
 
+    def _embed_query(self, query: str, timeout: Optional[float] = None) -> List[float]:
+        cached = self._cached_embedding(query)
+        if cached is not None:
+            return cached
+        # A per-call timeout disables client retries: the caller's deadline is the budget
+        client = self.oai if timeout is None else self.oai.with_options(timeout=timeout, max_retries=0)
+        resp = client.embeddings.create(model=self.embed_model, input=query)
+        return self._remember_embedding(query, resp.data[0].embedding)
+
+    async def _aembed_query(self, query: str, timeout: Optional[float] = None) -> List[float]:
+        cached = self._cached_embedding(query)
+        if cached is not None:
+            return cached
+        client = get_async_openai()
+        if timeout is not None:
+            client = client.with_options(timeout=timeout, max_retries=0)
+        resp = await client.embeddings.create(model=self.embed_model, input=query)
+        return self._remember_embedding(query, resp.data[0].embedding)
+
+    @staticmethod
+    def _plan_query(query: str, k: int) -> Tuple[str, bool, int]:
         q_text = (query or "").strip()
         q_lower = q_text.lower()
 
-        HOLIDAYS_DOC = "KOS_Law_03-L-064_Official_Holidays_EN.pdf"
-
         wants_holidays_law = (
             bool(re.search(r"03\s*-\s*l\s*-\s*064", q_lower))
             or "law 03-l-064" in q_lower
@@ -48,13 +155,13 @@ class Retriever:
 
         # Pull a bit more if it’s a “list” style question so we actually fetch the table/list chunk
         n_results = max(k, 12) if wants_holidays_law else k
+        return q_text, wants_holidays_law, n_results
 
-        q_emb = self._embed_query(q_text)
-
+    def _query_collection(self, q_emb: List[float], n_results: int, holidays_only: bool = False) -> Dict[str, Any]:
         # Try a targeted retrieval from the exact doc if requested
-        if wants_holidays_law:
+        if holidays_only:
             try:
-                res = self.collection.query(
+                return self.collection.query(
                     query_embeddings=[q_emb],
                     n_results=n_results,
                     include=["documents", "metadatas", "distances"],
@@ -62,29 +169,16 @@ class Retriever:
                 )
             except TypeError:
                 # in case your chroma version doesn’t accept `where` here
-                res = self.collection.query(
-                    query_embeddings=[q_emb],
-                    n_results=n_results,
-                    include=["documents", "metadatas", "distances"],
-                )
+                pass
 
-            # Fallback: if for any reason nothing comes back, do normal retrieval but with query expanded
-            docs_try = res.get("documents", [[]])[0]
-            if not docs_try:
-                q2 = q_text + " Law 03-L-064 Official Holidays"
-                q_emb2 = self._embed_query(q2)
-                res = self.collection.query(
-                    query_embeddings=[q_emb2],
-                    n_results=n_results,
-                    include=["documents", "metadatas", "distances"],
-                )
-        else:
-            res = self.collection.query(
-                query_embeddings=[q_emb],
-                n_results=n_results,
-                include=["documents", "metadatas", "distances"],
-            )
+        return self.collection.query(
+            query_embeddings=[q_emb],
+            n_results=n_results,
+            include=["documents", "metadatas", "distances"],
+        )
 
+    @staticmethod
+    def _to_results(res: Dict[str, Any], k: int) -> List[Dict[str, Any]]:
         docs = res.get("documents", [[]])[0]
         metas = res.get("metadatas", [[]])[0]
         dists = res.get("distances", [[]])[0]
@@ -110,3 +204,81 @@ class Retriever:
 
         # Keep the UI slider meaning consistent: return only top-k to the rest of the pipeline.
         return out[:k]
+
+    def search(
+        self,
+        query: str,
+        k: int = 6,
+        timeout: Optional[float] = None,
+        embedding: Optional[List[float]] = None,
+    ) -> List[Dict[str, Any]]:
+        q_text, wants_holidays_law, n_results = self._plan_query(query, k)
+
+        q_emb = embedding if embedding is not None else self._embed_query(q_text, timeout)
+        res = self._query_collection(q_emb, n_results, holidays_only=wants_holidays_law)
+
+        # Fallback: if for any reason nothing comes back, do normal retrieval but with query expanded
+        if wants_holidays_law and not res.get("documents", [[]])[0]:
+            q_emb2 = self._embed_query(q_text + " Law 03-L-064 Official Holidays", timeout)
+            res = self._query_collection(q_emb2, n_results)
+
+        return self._to_results(res, k)
+
+    async def asearch(
+        self,
+        query: str,
+        k: int = 6,
+        timeout: Optional[float] = None,
+        embedding: Optional[List[float]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Async search: embedding via the async OpenAI client; the Chroma query
+        (local, no async client) runs in a worker thread so the event loop stays free.
+        """
+        q_text, wants_holidays_law, n_results = self._plan_query(query, k)
+
+        q_emb = embedding if embedding is not None else await self._aembed_query(q_text, timeout)
+        res = await asyncio.to_thread(self._query_collection, q_emb, n_results, wants_holidays_law)
+
+        if wants_holidays_law and not res.get("documents", [[]])[0]:
+            q_emb2 = await self._aembed_query(q_text + " Law 03-L-064 Official Holidays", timeout)
+            res = await asyncio.to_thread(self._query_collection, q_emb2, n_results)
+
+        return self._to_results(res, k)
+
+    def _space(self) -> str:
+        meta = self.collection.metadata or {}
+        if meta.get("hnsw:space"):
+            return str(meta["hnsw:space"])
+        config = getattr(self.collection, "configuration_json", None) or {}
+        return str(((config.get("hnsw") or {}).get("space")) or "l2")
+
+    def rescore(self, hits: List[Dict[str, Any]], q_emb: List[float]) -> List[Dict[str, Any]]:
+        """
+        Re-rank already retrieved hits against a new query embedding without another
+        search: stored chunk embeddings come from Chroma (local), distances use the
+        collection's space so they compare with fresh search results. Hits whose
+        chunk is no longer in the collection are dropped.
+        """
+        ids = [str((h.get("metadata") or {}).get("chunk_id")) for h in hits if (h.get("metadata") or {}).get("chunk_id")]
+        if not ids:
+            return []
+        got = self.collection.get(ids=ids, include=["embeddings"])
+        vectors = dict(zip(got.get("ids") or [], got.get("embeddings") if got.get("embeddings") is not None else []))
+
+        space = self._space()
+        out = []
+        for h in hits:
+            vec = vectors.get(str((h.get("metadata") or {}).get("chunk_id")))
+            if vec is None:
+                continue
+            dot = sum(a * b for a, b in zip(q_emb, vec))
+            if space == "ip":
+                dist = 1.0 - dot
+            elif space == "cosine":
+                norm = (sum(a * a for a in q_emb) ** 0.5) * (sum(b * b for b in vec) ** 0.5)
+                dist = 1.0 - (dot / norm if norm else 0.0)
+            else:  # l2 (Chroma default): squared euclidean
+                dist = sum((a - b) ** 2 for a, b in zip(q_emb, vec))
+            out.append({**h, "distance": float(dist)})
+        return out
@@ -0,0 +1,193 @@
+"""
+Blue/green collection versions:
+- every ingest builds a new collection "<name>__v<n>" while readers keep serving the current one
+- publishing = atomically replacing the alias file "<persist_dir>/<name>.alias.json"
+  (write + rename); Retrievers opened by the logical name watch it and switch over
+- rollback re-publishes an earlier version that still exists (no re-ingest)
+- gc deletes versions that are neither current nor within COLLECTION_GC_GRACE_S of being
+  retired (failed / unpublished builds count from their ingest stamp); the unversioned
+  "<name>" collection of installs from before versioning is retired by the first publish
+
+  python -m retrieval.versions list
+  python -m retrieval.versions rollback [--to N]
+  python -m retrieval.versions gc [--grace-s 0]
+"""
+
+from __future__ import annotations
+
+import argparse
+import calendar
+import json
+import os
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+PERSIST_DIR = "storage/chroma"
+COLLECTION_NAME = "hr_docs"
+
+
+def _now() -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+
+
+def _age_s(stamp: Optional[str]) -> float:
+    """Seconds since an ISO stamp written by _now() (inf if missing / unparsable)."""
+    try:
+        return time.time() - calendar.timegm(time.strptime(str(stamp), "%Y-%m-%dT%H:%M:%SZ"))
+    except ValueError:
+        return float("inf")
+
+
+def alias_path(persist_dir: str, name: str) -> Path:
+    return Path(persist_dir) / f"{name}.alias.json"
+
+
+def versioned_name(name: str, version: int) -> str:
+    return f"{name}__v{version}"
+
+
+def parse_version(name: str, collection: str) -> Optional[int]:
+    m = re.fullmatch(re.escape(name) + r"__v(\d+)", collection or "")
+    return int(m.group(1)) if m else None
+
+
+def read_alias(persist_dir: str, name: str) -> Optional[Dict[str, Any]]:
+    """Current alias ({"current": collection, "history": [...]}) or None (not versioned yet)."""
+    try:
+        return json.loads(alias_path(persist_dir, name).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def _write_alias(persist_dir: str, name: str, alias: Dict[str, Any]) -> None:
+    # Write + rename: a reader sees the old pointer or the new one, never half a file
+    path = alias_path(persist_dir, name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(alias, indent=2), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def list_versions(client: Any, name: str) -> List[int]:
+    """Version numbers of the "<name>__v<n>" collections that exist, ascending."""
+    versions = []
+    for c in client.list_collections():
+        v = parse_version(name, getattr(c, "name", c))
+        if v is not None:
+            versions.append(v)
+    return sorted(versions)
+
+
+def next_version(client: Any, persist_dir: str, name: str) -> int:
+    # Also counts published versions already garbage-collected: numbers are never reused
+    alias = read_alias(persist_dir, name) or {}
+    seen = list_versions(client, name) + [
+        v for v in (parse_version(name, h.get("collection", "")) for h in alias.get("history") or []) if v is not None
+    ]
+    return max(seen, default=0) + 1
+
+
+def publish(persist_dir: str, name: str, collection: str) -> Dict[str, Any]:
+    """Point the alias at `collection`; the previous current version is marked retired (rollback target)."""
+    alias = read_alias(persist_dir, name) or {"name": name, "history": []}
+    now = _now()
+    history = [h for h in alias.get("history") or [] if h.get("collection") != collection]
+    for h in history:
+        if h.get("collection") == alias.get("current") and not h.get("retired_at"):
+            h["retired_at"] = now
+    history.insert(0, {"collection": collection, "published_at": now, "retired_at": None})
+    alias = {"name": name, "current": collection, "published_at": now, "history": history}
+    _write_alias(persist_dir, name, alias)
+    return alias
+
+
+def rollback(client: Any, persist_dir: str, name: str, to: Optional[int] = None) -> Dict[str, Any]:
+    """Re-publish version `to` (default: the most recently retired one that still exists)."""
+    alias = read_alias(persist_dir, name)
+    if not alias:
+        raise ValueError(f"No alias for {name!r} in {persist_dir}: nothing to roll back")
+    existing = set(list_versions(client, name))
+    if to is None:
+        candidates = [
+            h["collection"] for h in alias.get("history") or []
+            if h.get("collection") != alias.get("current") and parse_version(name, h.get("collection", "")) in existing
+        ]
+        if not candidates:
+            raise ValueError(f"No earlier version of {name!r} is left to roll back to")
+        target = candidates[0]
+    else:
+        if to not in existing:
+            raise ValueError(f"{versioned_name(name, to)} does not exist (versions: {sorted(existing)})")
+        target = versioned_name(name, to)
+    return publish(persist_dir, name, target)
+
+
+def gc(client: Any, persist_dir: str, name: str, grace_s: Optional[float] = None) -> List[str]:
+    """
+    Delete old versions (default grace: COLLECTION_GC_GRACE_S, 1 day). The current
+    version is always kept; readers have long switched once the grace period is over.
+    The legacy unversioned collection goes the same way, counted from the first publish.
+    Returns the deleted collection names.
+    """
+    grace_s = float(os.getenv("COLLECTION_GC_GRACE_S", "86400")) if grace_s is None else grace_s
+    alias = read_alias(persist_dir, name) or {}
+    retired = {h.get("collection"): h.get("retired_at") or h.get("published_at") for h in alias.get("history") or []}
+
+    deleted = []
+    for v in list_versions(client, name):
+        collection = versioned_name(name, v)
+        if collection == alias.get("current"):
+            continue
+        if collection in retired:
+            age = _age_s(retired[collection])
+        else:  # never published (failed or in-progress build): age of its ingest stamp
+            age = _age_s((client.get_collection(collection).metadata or {}).get("ingested_at"))
+        if age >= grace_s:
+            client.delete_collection(collection)
+            deleted.append(collection)
+
+    if alias.get("current") and name in {getattr(c, "name", c) for c in client.list_collections()}:
+        stamps = [h["published_at"] for h in alias.get("history") or [] if h.get("published_at")]
+        first_published = min(stamps, default=None)
+        if _age_s(first_published) >= grace_s:
+            client.delete_collection(name)
+            deleted.append(name)
+    return deleted
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Blue/green versions of the Chroma collection.")
+    parser.add_argument("command", choices=["list", "rollback", "gc"])
+    parser.add_argument("--persist-dir", default=PERSIST_DIR)
+    parser.add_argument("--name", default=COLLECTION_NAME)
+    parser.add_argument("--to", type=int, default=None, help="rollback: version number")
+    parser.add_argument("--grace-s", type=float, default=None, help="gc: override COLLECTION_GC_GRACE_S")
+    args = parser.parse_args(argv)
+
+    import chromadb
+
+    client = chromadb.PersistentClient(path=args.persist_dir)
+    try:
+        if args.command == "rollback":
+            alias = rollback(client, args.persist_dir, args.name, args.to)
+            print(f"✅ {args.name} -> {alias['current']}")
+        elif args.command == "gc":
+            deleted = gc(client, args.persist_dir, args.name, args.grace_s)
+            print(f"Deleted: {', '.join(deleted) if deleted else 'nothing'}")
+        else:
+            alias = read_alias(args.persist_dir, args.name) or {}
+            for v in list_versions(client, args.name):
+                collection = versioned_name(args.name, v)
+                count = client.get_collection(collection).count()
+                print(f"{'*' if collection == alias.get('current') else ' '} {collection:<24}{count:>8} chunks")
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
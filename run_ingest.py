@@ -1,4 +1,9 @@
+import json
+
+from agents.faq import warm_up
 from retrieval.ingest import ingest
 
 if __name__ == "__main__":
     ingest()
+    # New collection version: precompute the FAQ answers now, not on the first user's click
+    print(json.dumps(warm_up(), indent=2))
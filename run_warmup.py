@@ -0,0 +1,6 @@
+import json
+
+from agents.faq import warm_up
+
+if __name__ == "__main__":
+    print(json.dumps(warm_up(), indent=2))
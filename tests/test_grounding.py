@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from agents.grounding import EvidenceIndex, check_grounding  # noqa: E402
+from retrieval.citations import parse_answer  # noqa: E402
+
+LABOUR_LAW = {
+    "text": "Full working time is forty hours per week. Working hours may not exceed the weekly limit.",
+    "metadata": {
+        "doc_name": "KOS_Law_03-L-212_Labour_EN.pdf",
+        "chunk_id": "KOS_Law_03-L-212_Labour_EN_p012_chunk_0000",
+        "page": 12,
+    },
+}
+CITE = "[KOS_Law_03-L-212_Labour_EN.pdf | p.12 | KOS_Law_03-L-212_Labour_EN_p012_chunk_0000]"
+
+
+def test_law_number_from_cited_doc_name_is_supported():
+    answer = f"Under Law 03-L-212, full working time is forty hours per week {CITE}."
+    issues, stats = check_grounding(parse_answer(answer), EvidenceIndex([LABOUR_LAW]))
+    assert issues == []
+    assert stats["unsupported"] == 0
+
+
+def test_number_in_neither_chunk_nor_doc_name_is_flagged():
+    answer = f"Under Law 03-L-212, full working time is 48 hours per week {CITE}."
+    issues, _ = check_grounding(parse_answer(answer), EvidenceIndex([LABOUR_LAW]))
+    assert len(issues) == 1
+    assert "['48']" in issues[0]["message"]